@@ -0,0 +1,15 @@
+"""
+BillSmith benchmarks.
+
+Standalone scripts that seed a throwaway database from a synthetic corpus
+and time the app in-process. Run them as modules from the repository
+root, e.g.:
+    python -m benchmarks.load                  # Every router under load
+    python -m benchmarks.extraction            # Text extraction + heuristics, offline
+    python -m benchmarks.category_performance  # One analytics view as bills grow
+    python -m benchmarks.startup               # Import and boot time of an API replica
+    python -m benchmarks.corpus --bills 1000000 --database bench-1m.db
+
+load, extraction and startup compare P50/P95/P99 with baselines.json and exit 1 on
+a regression (see report.py).
+"""
@@ -0,0 +1,65 @@
+"""
+Category performance benchmark.
+
+Times GET /api/v1/analytics/categories/performance as the bills table grows,
+reporting P50/P95 per size. Bills are bulk-inserted into a throwaway SQLite
+database (or DATABASE_URL if set) from the synthetic corpus (corpus.py).
+
+Usage (from the repository root):
+    python -m benchmarks.category_performance
+    python -m benchmarks.category_performance --sizes 10000 100000 250000 --runs 30
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from .corpus import BillCorpus, category_ids, seed_bills
+from .report import percentile
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Category performance endpoint benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 250_000])
+    parser.add_argument("--runs", type=int, default=20, help="Timed requests per size")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="billsmith-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/bench.db")
+    os.environ.setdefault("QUERY_BUDGET_MODE", "off")
+    os.environ.setdefault("ANALYTICS_CACHE_SIZE", "0")  # Measure the query, not the cache
+
+    # Imported after DATABASE_URL is set
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+    from src.backend.database import create_db_and_tables, engine
+    from src.backend.main import app
+
+    create_db_and_tables()
+    client = TestClient(app)  # No lifespan: the job executor isn't needed
+    url = "/api/v1/analytics/categories/performance"
+
+    print(f"{'bills':>10} {'P50 ms':>9} {'P95 ms':>9} {'categories':>11}")
+    seeded = 0
+    with Session(engine) as session:
+        corpus = BillCorpus(category_ids(session), max(args.sizes), args.seed)
+        for size in sorted(args.sizes):
+            seed_bills(session, corpus, seeded, size)
+            seeded = size
+
+            client.get(url)  # Warm the page cache
+            samples = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                response = client.get(url)
+                samples.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+            print(f"{size:>10} {statistics.median(samples):>9.1f} {percentile(samples, 0.95):>9.1f} "
+                  f"{len(response.json()['categories']):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Synthetic bill corpus.
+
+Generates realistic, reproducible `Bill` rows: accounts with a vendor, a
+default category and a monthly statement, each billed every month for
+five years. Amounts follow the category's tariff (usage x rate, fixed
+rent or plan prices), with seasonal swings for energy, taxes and yearly
+increases. Bill N is a pure function of (seed, N), so any prefix
+of the corpus is identical between runs and machines; dates are relative
+to the day of generation, as the analytics windows are.
+
+Bills are bulk-inserted through the ORM table so the search index,
+spending rollups and cache generation triggers all fire, as they would in
+production.
+
+Pre-build a reusable database (from the repository root):
+    python -m benchmarks.corpus --bills 1000000 --database bench-1m.db
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Sequence
+
+BATCH_ROWS = 10_000
+HISTORY_MONTHS = 60
+STANDARD_SIZES = (10_000, 100_000, 1_000_000)
+TAX_RATE = Decimal("0.06")
+
+REGIONS = (
+    "Cascade", "Summit", "Lakeside", "Riverbend", "Pinecrest", "Harbor", "Prairie", "Redwood",
+    "Bayview", "Granite", "Maple", "Sierra", "Coastal", "Valley", "Northgate", "Silverton",
+    "Ridgeway", "Brookfield", "Meadow", "Fairview",
+)
+
+# Default category -> vendor name suffixes, usage unit, monthly usage range,
+# rate per unit (or plan prices), fixed charge, seasonal swing, account share
+TARIFFS = {
+    "Electricity": {"vendors": ("Power & Light", "Electric Co-op"), "unit": "kWh", "usage": (250, 1400),
+                    "rate": Decimal("0.14"), "fixed": Decimal("12.00"), "swing": 0.35, "share": 0.2},
+    "Water": {"vendors": ("Water District", "Municipal Utilities"), "unit": "gallons", "usage": (2000, 9000),
+              "rate": Decimal("0.006"), "fixed": Decimal("18.50"), "swing": 0.2, "share": 0.15},
+    "Gas": {"vendors": ("Natural Gas", "Gas Service"), "unit": "therms", "usage": (15, 120),
+            "rate": Decimal("1.25"), "fixed": Decimal("10.00"), "swing": -0.6, "share": 0.15},
+    "Rent": {"vendors": ("Property Management", "Apartments"), "plans": (950, 1400, 1850, 2400),
+             "share": 0.1},
+    "Internet": {"vendors": ("Fiber", "Broadband"), "unit": "GB", "usage": (150, 900),
+                 "plans": (49.99, 64.99, 79.99, 89.99), "share": 0.2},
+    "Phone": {"vendors": ("Wireless", "Mobile"), "unit": "minutes", "usage": (200, 1500),
+              "plans": (35.00, 55.00, 70.00), "share": 0.2},
+}
+
+# Terms that match real vendors and invoice numbers in any corpus size
+SEARCH_TERMS = ["cascade power", "summit water", "inv 00042", "inv 0012", "harbor", "lakeside fiber"]
+
+CENT = Decimal("0.01")
+
+
+def _months_before(day: date, months: int) -> date:
+    """First day of the month `months` before `day`'s month"""
+    index = day.year * 12 + day.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class BillCorpus:
+    """Deterministic bill rows; `total` sizes the account list behind `vendors`"""
+
+    def __init__(self, category_ids: Dict[str, int], total: int, seed: int = 42,
+                 documents: Sequence[str] = ()):
+        self.category_ids = category_ids
+        self.seed = seed
+        self.documents = list(documents)  # Bill files to point at, e.g. for downloads
+        self.account_count = max(1, math.ceil(total / HISTORY_MONTHS))
+        self.today = date.today()
+        self.now = datetime.utcnow()
+        self._accounts: Dict[int, Dict] = {}
+
+    @property
+    def vendors(self) -> List[str]:
+        return sorted({self.account(number)["vendor"] for number in range(self.account_count)})
+
+    def account(self, number: int) -> Dict:
+        """Vendor, category and tariff of one account (a household's utility)"""
+        if number not in self._accounts:
+            rng = random.Random(f"{self.seed}:account:{number}")
+            names = list(TARIFFS)
+            category = rng.choices(names, weights=[TARIFFS[name]["share"] for name in names])[0]
+            tariff = TARIFFS[category]
+            self._accounts[number] = {
+                "category": category,
+                "tariff": tariff,
+                "vendor": f"{rng.choice(REGIONS)} {rng.choice(tariff['vendors'])}",
+                "account_number": f"{rng.randint(100, 999)}-{number:07d}",
+                "usage": rng.uniform(*tariff["usage"]) if "usage" in tariff else None,
+                "plan": Decimal(str(rng.choice(tariff["plans"]))) if "plans" in tariff else None,
+                "statement_day": rng.randint(1, 28),
+            }
+        return self._accounts[number]
+
+    def bill(self, number: int) -> Dict:
+        """Bill `number`: account number // 60, billed `number % 60 + 1` months ago"""
+        account = self.account(number // HISTORY_MONTHS)
+        tariff = account["tariff"]
+        rng = random.Random(f"{self.seed}:bill:{number}")
+        months_ago = number % HISTORY_MONTHS + 1
+
+        billing_start = _months_before(self.today, months_ago)
+        billing_end = _months_before(self.today, months_ago - 1) - timedelta(days=1)
+        created_at = min(
+            datetime.combine(billing_end, datetime.min.time())
+            + timedelta(days=account["statement_day"] % 5 + 1, seconds=rng.randint(0, 86_399)),
+            self.now,
+        )
+
+        usage = None
+        if account["usage"] is not None:
+            season = math.cos(2 * math.pi * (billing_start.month - 7) / 12)  # 1 in July, -1 in January
+            usage = account["usage"] * (1 + tariff.get("swing", 0) * season) * rng.uniform(0.85, 1.15)
+        if account["plan"] is not None:
+            # Plans go up a few percent a year
+            subtotal = account["plan"] * Decimal(str(1.03 ** ((HISTORY_MONTHS - months_ago) // 12)))
+        else:
+            subtotal = tariff["fixed"] + Decimal(str(usage)) * tariff["rate"]
+        subtotal = subtotal.quantize(CENT)
+        tax_total = (subtotal * TAX_RATE).quantize(CENT) if account["category"] != "Rent" else None
+
+        needs_review = rng.random() < 0.05
+        return {
+            "category_id": self.category_ids[account["category"]],
+            "vendor": account["vendor"],
+            "invoice_number": f"INV-{number:08d}",
+            "account_number": account["account_number"],
+            "billing_start": billing_start,
+            "billing_end": billing_end,
+            "due_date": billing_end + timedelta(days=21),
+            "amount_due": subtotal + (tax_total or 0),
+            "usage_qty": Decimal(str(round(usage, 3))) if usage is not None else None,
+            "usage_unit": tariff.get("unit") if usage is not None else None,
+            "tax_total": tax_total,
+            "file_path": (self.documents[number % len(self.documents)] if self.documents
+                          else f"/bench/{number}.pdf"),
+            "needs_review": needs_review,
+            "confidence_score": round(rng.uniform(0.55, 0.89) if needs_review else rng.uniform(0.9, 0.99), 3),
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+    def rows(self, start: int, stop: int) -> Iterator[Dict]:
+        for number in range(start, stop):
+            yield self.bill(number)
+
+
+def seed_bills(session, corpus: BillCorpus, start: int, stop: int) -> None:
+    """Bulk insert bills numbered [start, stop)"""
+    from sqlalchemy import insert
+    from src.backend.models import Bill
+
+    for offset in range(start, stop, BATCH_ROWS):
+        session.execute(insert(Bill), list(corpus.rows(offset, min(offset + BATCH_ROWS, stop))))
+    session.commit()
+
+
+def category_ids(session) -> Dict[str, int]:
+    """Default categories by name (created if missing)"""
+    from sqlmodel import select
+    from src.backend.database import init_default_categories
+    from src.backend.models import Category
+
+    init_default_categories()
+    return {category.name: category.id for category in session.exec(select(Category)).all()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic bill database")
+    parser.add_argument("--bills", type=int, default=STANDARD_SIZES[1])
+    parser.add_argument("--database", required=True, help="SQLite file to create or extend")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.database)}"
+
+    # Imported after DATABASE_URL is set
+    from sqlmodel import Session, func, select
+    from src.backend.database import create_db_and_tables, engine
+    from src.backend.models import Bill
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        existing = session.exec(select(func.count(Bill.id))).one()
+        corpus = BillCorpus(category_ids(session), args.bills, args.seed)
+        started = time.perf_counter()
+        seed_bills(session, corpus, existing, args.bills)
+    print(f"✅ {args.database}: {args.bills} bills ({max(args.bills - existing, 0)} new, "
+          f"{len(corpus.vendors)} vendors) in {time.perf_counter() - started:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
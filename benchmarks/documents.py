@@ -0,0 +1,216 @@
+"""
+Synthetic bill documents.
+
+Writes a reproducible corpus of bill files for benchmarking the extraction
+path offline, without real customer bills or gpt-4o:
+- text_pdf: one-page statement with a text layer
+- multipage_pdf: statement plus usage history and terms pages, with the
+  repeated header/footer lines real bills carry
+- scanned_pdf: rendered pages without a text layer (OCR'd)
+- photo_png / photo_jpg: a slightly rotated, blurred phone photo (OCR'd)
+
+Each document comes with the field values printed on it, taken from the
+bill corpus (corpus.py), so extraction accuracy can be scored as well as
+timed. Text PDFs are written directly (Helvetica, no extra dependency);
+pages and photos are rendered with Pillow.
+"""
+
+import os
+import random
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Sequence
+
+from .corpus import HISTORY_MONTHS, TARIFFS, BillCorpus
+
+KINDS = ("text_pdf", "multipage_pdf", "scanned_pdf", "photo_png", "photo_jpg")
+OCR_KINDS = ("scanned_pdf", "photo_png", "photo_jpg")
+# Share of the corpus per kind, in tenths
+KIND_MIX = ("text_pdf",) * 4 + ("multipage_pdf",) * 2 + ("scanned_pdf",) * 2 + ("photo_png", "photo_jpg")
+FILE_TYPES = {"text_pdf": "pdf", "multipage_pdf": "pdf", "scanned_pdf": "pdf", "photo_png": "png", "photo_jpg": "jpg"}
+
+RENDER_DPI = 150
+PAGE_SIZE = (int(8.5 * RENDER_DPI), 11 * RENDER_DPI)
+FONT_SIZE = 26  # ~12.5 pt at RENDER_DPI
+STATED_FIELDS = ("vendor", "account_number", "invoice_number", "billing_start", "billing_end",
+                 "due_date", "amount_due", "tax_total")
+
+
+@dataclass
+class SyntheticDocument:
+    """A generated bill file and the field values printed on it"""
+    path: str
+    kind: str
+    file_type: str
+    pages: int
+    truth: Dict[str, Any]
+
+
+# ===== CONTENT =====
+
+def _us_date(value: date) -> str:
+    return value.strftime("%m/%d/%Y")
+
+
+def statement_lines(bill: Dict[str, Any], rng: random.Random) -> List[str]:
+    """First page: the fields the pipeline extracts"""
+    lines = [
+        bill["vendor"],
+        f"{rng.randint(100, 9999)} {rng.choice(['Main', 'Oak', 'Market', 'Center'])} Street  -  "
+        f"Customer Service 1-800-555-{rng.randint(1000, 9999)}",
+        "",
+        "STATEMENT",
+        f"Account Number: {bill['account_number']}",
+        f"Invoice Number: {bill['invoice_number']}",
+        f"Service Period: {_us_date(bill['billing_start'])} - {_us_date(bill['billing_end'])}",
+    ]
+    if bill["usage_qty"] is not None:
+        lines.append(f"Usage this period: {bill['usage_qty']:.0f} {bill['usage_unit']}")
+    subtotal = bill["amount_due"] - (bill["tax_total"] or 0)
+    lines += ["", "Charges", f"Service charges  ${subtotal:,.2f}"]
+    if bill["tax_total"] is not None:
+        lines.append(f"Taxes: ${bill['tax_total']:,.2f}")
+    lines += [
+        f"Amount Due: ${bill['amount_due']:,.2f}",
+        f"Payment Due Date: {bill['due_date'].strftime('%B %d, %Y')}",
+        "",
+        "Thank you for your business. Pay online, by phone or by mail.",
+    ]
+    return lines
+
+
+def detail_pages(bill: Dict[str, Any], count: int, rng: random.Random) -> List[List[str]]:
+    """Usage history and terms pages that follow the statement"""
+    pages = []
+    for number in range(count):
+        if number % 2 == 0:
+            lines = ["Usage history", "Month        Usage        Charges"]
+            for month in range(12):
+                lines.append(f"{(month + number) % 12 + 1:02d}/{bill['billing_start'].year}    "
+                             f"{rng.randint(100, 1500):>6} {bill['usage_unit'] or 'units'}    "
+                             f"{rng.uniform(20, 400):>8.2f}")
+        else:
+            lines = ["Terms and conditions"] + [
+                "Payments received after the stated date may be subject to a late fee of 1.5% per month.",
+                "Questions about this statement? Contact customer service within 30 days.",
+                "Service may be interrupted for accounts more than 60 days past due.",
+                "Budget billing and paperless statements are available online.",
+            ] * 2
+        pages.append(lines)
+    return pages
+
+
+def _with_frame(pages: List[List[str]], vendor: str, account_number: str) -> List[List[str]]:
+    """Header and footer repeated on every page"""
+    return [
+        [f"{vendor}  -  Account {account_number}", ""] + lines
+        + ["", f"Page {number} of {len(pages)}  -  {vendor.lower().replace(' ', '')}.example.com"]
+        for number, lines in enumerate(pages, start=1)
+    ]
+
+
+# ===== WRITERS =====
+
+def _pdf_text(line: str) -> str:
+    line = line.encode("latin-1", "replace").decode("latin-1")
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: str, pages: List[List[str]]) -> None:
+    """Minimal PDF with a Helvetica text layer, one page per list of lines"""
+    objects = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = "BT /F1 11 Tf 14 TL 56 770 Td " + " ".join(f"({_pdf_text(line)}) '" for line in lines) + " ET"
+        content = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(f"{len(objects)} 0 R")
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    body = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    body += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as handle:
+        handle.write(body)
+
+
+def _font():
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", FONT_SIZE)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def render_page(lines: List[str]):
+    """A page of text as a grayscale image at RENDER_DPI"""
+    from PIL import Image, ImageDraw
+    image = Image.new("L", PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(image)
+    font = _font()
+    top = RENDER_DPI // 2
+    for number, line in enumerate(lines):
+        draw.text((RENDER_DPI * 3 // 4, top + number * FONT_SIZE * 3 // 2), line, fill=0, font=font)
+    return image
+
+
+def write_scanned_pdf(path: str, pages: List[List[str]]) -> None:
+    """Image-only PDF, as a scanner produces"""
+    images = [render_page(lines) for lines in pages]
+    images[0].save(path, "PDF", resolution=RENDER_DPI, save_all=True, append_images=images[1:])
+
+
+def write_photo(path: str, lines: List[str], rng: random.Random) -> None:
+    """Slightly rotated, soft phone photo of a one-page bill"""
+    from PIL import ImageFilter
+    image = render_page(lines).rotate(rng.uniform(-2, 2), expand=True, fillcolor=235)
+    image = image.filter(ImageFilter.GaussianBlur(0.6))
+    if path.endswith(".jpg"):
+        image.save(path, "JPEG", quality=80)
+    else:
+        image.save(path, "PNG")
+
+
+# ===== CORPUS =====
+
+def build_documents(directory: str, count: int, seed: int = 42, kinds: Sequence[str] = KINDS) -> List[SyntheticDocument]:
+    """Write `count` documents of the given kinds into `directory`"""
+    os.makedirs(directory, exist_ok=True)
+    mix = [kind for kind in KIND_MIX if kind in kinds] or list(kinds)
+    # Category ids stand in as names: documents print the name
+    bills = BillCorpus({name: name for name in TARIFFS}, count * HISTORY_MONTHS, seed)
+
+    documents = []
+    for index in range(count):
+        kind = mix[index % len(mix)]
+        rng = random.Random(f"{seed}:document:{index}")
+        # A different account and month for every document
+        bill = bills.bill(index * HISTORY_MONTHS + rng.randrange(HISTORY_MONTHS))
+        statement = statement_lines(bill, rng)
+        pages = [statement]
+        if kind == "multipage_pdf":
+            pages += detail_pages(bill, rng.randint(3, 7), rng)
+        if kind != "photo_png" and kind != "photo_jpg":
+            pages = _with_frame(pages, bill["vendor"], bill["account_number"])
+
+        path = os.path.join(directory, f"bill-{index:05d}-{kind}.{FILE_TYPES[kind]}")
+        if kind in ("text_pdf", "multipage_pdf"):
+            write_text_pdf(path, pages)
+        elif kind == "scanned_pdf":
+            write_scanned_pdf(path, pages)
+        else:
+            write_photo(path, pages[0], rng)
+
+        truth = {name: bill[name] for name in STATED_FIELDS if bill[name] is not None}
+        truth["category"] = bill["category_id"]
+        documents.append(SyntheticDocument(path, kind, FILE_TYPES[kind], len(pages), truth))
+    return documents
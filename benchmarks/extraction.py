@@ -0,0 +1,117 @@
+"""
+Offline extraction benchmark.
+
+Times the extraction path that runs before any gpt-4o call: page-parallel
+text extraction with OCR fallback (extraction.py) and the heuristic field
+grab (heuristics.py), over a synthetic document corpus (documents.py).
+Reports P50/P95/P99 per document kind plus the share of printed fields
+the heuristics recovered and of bills confident enough to skip the model,
+and compares latency with the stored baseline.
+
+Vendors and their account numbers are known to the matcher, as for
+recurring bills. OCR'd kinds are skipped with a warning when Tesseract
+isn't installed.
+
+Usage (from the repository root):
+    python -m benchmarks.extraction
+    python -m benchmarks.extraction --documents 200 --save-baseline
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from .documents import KINDS, OCR_KINDS, build_documents
+from .report import DEFAULT_TOLERANCE, check_baseline, save_baseline, summarize
+
+
+def ocr_available() -> bool:
+    try:
+        import pytesseract  # noqa: F401
+    except ImportError:
+        return False
+    return shutil.which("tesseract") is not None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline extraction benchmark")
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    from src.backend.extraction import read_document_text
+    from src.backend.heuristics import VendorMatcher, VendorProfile, extract_fields
+
+    kinds = args.kinds
+    if not ocr_available() and set(kinds) & set(OCR_KINDS):
+        print(f"⚠️ Tesseract not installed; skipping {', '.join(kind for kind in kinds if kind in OCR_KINDS)}")
+        kinds = [kind for kind in kinds if kind not in OCR_KINDS]
+    if not kinds:
+        sys.exit(1)
+
+    directory = tempfile.mkdtemp(prefix="billsmith-documents-")
+    started = time.perf_counter()
+    documents = build_documents(directory, args.documents, args.seed, kinds)
+    print(f"{len(documents)} documents ({', '.join(kinds)}) written to {directory} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    profiles: Dict[str, VendorProfile] = {}
+    for document in documents:
+        profile = profiles.setdefault(
+            document.truth["vendor"], VendorProfile(document.truth["vendor"], document.truth["category"])
+        )
+        profile.account_numbers.add(document.truth["account_number"])
+    matcher = VendorMatcher(list(profiles.values()))
+    # Start the page pool (multi-page PDFs only) before timing
+    warmup = max(documents, key=lambda document: document.pages)
+    read_document_text(warmup.path, warmup.file_type)
+
+    samples: Dict[str, List[float]] = defaultdict(list)
+    recovered: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+    confident: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+    pages = 0
+    started = time.perf_counter()
+    for document in documents:
+        document_started = time.perf_counter()
+        text = read_document_text(document.path, document.file_type)
+        fields_started = time.perf_counter()
+        result = extract_fields(text, matcher)
+        finished = time.perf_counter()
+
+        samples[document.kind].append((finished - document_started) * 1000)
+        samples["heuristic field grab"].append((finished - fields_started) * 1000)
+        pages += document.pages
+        recovered[document.kind][0] += sum(result.fields.get(name) == value for name, value in document.truth.items())
+        recovered[document.kind][1] += len(document.truth)
+        confident[document.kind][0] += result.is_confident()
+        confident[document.kind][1] += 1
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(documents)} documents, {pages} pages in {elapsed:.1f}s ({pages / elapsed:.1f} pages/s)")
+    print(f"{'kind':<16} {'fields recovered':>17} {'skip gpt-4o':>12}")
+    for kind in kinds:
+        if confident[kind][1]:
+            print(f"{kind:<16} {recovered[kind][0] / recovered[kind][1]:>17.1%} "
+                  f"{confident[kind][0] / confident[kind][1]:>12.1%}")
+
+    scenario = f"extraction {args.documents} documents ({', '.join(kinds)})"
+    summary = summarize(samples)
+    if args.save_baseline:
+        save_baseline(scenario, summary)
+        return
+    failures = check_baseline(scenario, summary, args.tolerance, heading="document kind")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+API load benchmark.
+
+Drives every router in-process (httpx over ASGI, one event loop, like a
+single uvicorn worker) against a synthetic bill corpus (corpus.py) at a
+fixed concurrency: bill listings, filters, searches, single bills, file
+downloads, corrections and uploads; categories; jobs and extraction
+stats; every analytics view; and job update WebSockets (time to the first
+snapshot). Reads dominate the mix, as in a dashboard session.
+
+It reports throughput, P50/P95/P99 per route and event-loop lag (how late
+a 10 ms timer fires while the load runs; a handler blocking the loop
+delays every other request on the worker). Latencies are compared with
+the baseline stored for the same scenario and with the PRD targets
+(page loads P95 < 300 ms, search P95 <= 150 ms); any regression exits 1.
+Rare routes need more --requests before their tail is compared.
+
+Usage (from the repository root):
+    python -m benchmarks.load
+    python -m benchmarks.load --bills 100000 --concurrency 32 --requests 5000
+    python -m benchmarks.load --database bench-1m.db  # Built by benchmarks.corpus
+    python -m benchmarks.load --bills 10000 --save-baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from .corpus import SEARCH_TERMS, BillCorpus, category_ids, seed_bills
+from .report import DEFAULT_TOLERANCE, check_baseline, save_baseline, summarize
+
+LAG_PROBE_SECONDS = 0.01
+UPLOAD_DOCUMENTS = 20
+
+# PRD targets on localhost: (routes, P95 ceiling in ms)
+PAGE_LOAD_TARGET_MS = 300
+SEARCH_TARGET_MS = 150
+
+# Route label -> share of requests
+ROUTE_WEIGHTS = {
+    "GET /bills": 10,
+    "GET /bills?category_id": 4,
+    "GET /bills?search": 8,
+    "GET /bills/{id}": 8,
+    "GET /bills/{id}/file": 2,
+    "PATCH /bills/{id}": 2,
+    "POST /bills/upload": 1,
+    "GET /categories": 4,
+    "GET /categories/{id}": 2,
+    "PATCH /categories/{id}": 1,
+    "GET /jobs": 2,
+    "GET /jobs/{id}": 1,
+    "GET /jobs/extraction-stats": 1,
+    "GET /analytics/dashboard": 6,
+    "GET /analytics/spending/summary": 3,
+    "GET /analytics/trends/monthly": 3,
+    "GET /analytics/categories/performance": 3,
+    "GET /analytics/cache-stats": 1,
+    "WS /ws/jobs": 1,
+    "GET /health": 1,
+}
+
+# (label, method, url, request options)
+Request = Tuple[str, str, str, Dict]
+
+
+class Workload:
+    """Builds the request mix from the seeded corpus"""
+
+    def __init__(self, rng: random.Random, bill_count: int, categories: List[int],
+                 documents: List[str], job_ids: List[str], weights: Dict[str, int] = ROUTE_WEIGHTS):
+        self.rng = rng
+        self.weights = weights
+        self.bill_count = bill_count
+        self.categories = categories
+        self.documents = documents
+        self.job_ids = job_ids
+
+    def request(self, label: str) -> Request:
+        rng = self.rng
+        bill_id = rng.randint(1, self.bill_count)
+        category_id = rng.choice(self.categories)
+        if label == "GET /bills":
+            return label, "GET", "/api/v1/bills?limit=20", {}
+        if label == "GET /bills?category_id":
+            return label, "GET", f"/api/v1/bills?limit=20&category_id={category_id}", {}
+        if label == "GET /bills?search":
+            return label, "GET", "/api/v1/bills", {"params": {"limit": 20, "search": rng.choice(SEARCH_TERMS)}}
+        if label == "GET /bills/{id}":
+            return label, "GET", f"/api/v1/bills/{bill_id}", {}
+        if label == "GET /bills/{id}/file":
+            return label, "GET", f"/api/v1/bills/{bill_id}/file", {}
+        if label == "PATCH /bills/{id}":
+            return label, "PATCH", f"/api/v1/bills/{bill_id}", {"json": {"needs_review": rng.random() < 0.5}}
+        if label == "POST /bills/upload":
+            # Mostly re-uploads: the duplicate check answers from the pending job
+            path = rng.choice(self.documents)
+            with open(path, "rb") as handle:
+                upload = (os.path.basename(path), handle.read(), "application/pdf")
+            return label, "POST", "/api/v1/bills/upload", {"files": {"files": upload}}
+        if label == "GET /categories":
+            return label, "GET", "/api/v1/categories", {}
+        if label == "GET /categories/{id}":
+            return label, "GET", f"/api/v1/categories/{category_id}", {}
+        if label == "PATCH /categories/{id}":
+            return label, "PATCH", f"/api/v1/categories/{category_id}", {"json": {"color_hex": f"#{rng.randrange(1 << 24):06X}"}}
+        if label == "GET /jobs":
+            return label, "GET", "/api/v1/jobs", {}
+        if label == "GET /jobs/{id}":
+            return label, "GET", f"/api/v1/jobs/{rng.choice(self.job_ids)}", {}
+        if label == "GET /jobs/extraction-stats":
+            return label, "GET", "/api/v1/jobs/extraction-stats", {}
+        if label == "GET /analytics/dashboard":
+            return label, "GET", f"/api/v1/analytics/dashboard/{category_id}", {}
+        if label == "GET /analytics/spending/summary":
+            return label, "GET", "/api/v1/analytics/spending/summary", {}
+        if label == "GET /analytics/trends/monthly":
+            return label, "GET", f"/api/v1/analytics/trends/monthly?months={rng.choice([6, 12, 24])}", {}
+        if label == "GET /analytics/categories/performance":
+            return label, "GET", "/api/v1/analytics/categories/performance", {}
+        if label == "GET /analytics/cache-stats":
+            return label, "GET", "/api/v1/analytics/cache-stats", {}
+        if label == "WS /ws/jobs":
+            return label, "WS", "/ws/jobs", {"query": f"job_id={rng.choice(self.job_ids)}"}
+        return label, "GET", "/health", {}
+
+    def requests(self, total: int) -> List[Request]:
+        labels = self.rng.choices(list(self.weights), weights=list(self.weights.values()), k=total)
+        return [self.request(label) for label in labels]
+
+
+async def first_websocket_message(app, path: str, query: str) -> Dict:
+    """Open a WebSocket over ASGI, wait for its first message, disconnect"""
+    sent: asyncio.Queue = asyncio.Queue()
+    closing = asyncio.Event()
+    connected = False
+
+    async def receive():
+        nonlocal connected
+        if not connected:
+            connected = True
+            return {"type": "websocket.connect"}
+        await closing.wait()
+        return {"type": "websocket.disconnect", "code": 1000}
+
+    scope = {
+        "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": query.encode(), "headers": [], "subprotocols": [],
+        "server": ("bench", 80), "client": ("bench", 50000),
+    }
+    session = asyncio.create_task(app(scope, receive, sent.put))
+    try:
+        accepted = await sent.get()
+        if accepted["type"] != "websocket.accept":
+            raise RuntimeError(f"WebSocket refused: {accepted}")
+        message = await sent.get()
+        return json.loads(message.get("text") or message.get("bytes"))
+    finally:
+        closing.set()
+        await session
+
+
+async def drive(app, requests: List[Request], concurrency: int) -> Dict[str, List[float]]:
+    import httpx
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    queue: asyncio.Queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+
+    running = True
+
+    async def monitor_loop():
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(LAG_PROBE_SECONDS)
+            latencies["event loop lag"].append((time.perf_counter() - started - LAG_PROBE_SECONDS) * 1000)
+
+    monitor = asyncio.create_task(monitor_loop())
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                label, method, url, options = queue.get_nowait()
+                started = time.perf_counter()
+                if method == "WS":
+                    await first_websocket_message(app, url, options["query"])
+                else:
+                    response = await client.request(method, url, **options)
+                    response.raise_for_status()
+                latencies[label].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        latencies["total"] = [time.perf_counter() - started]
+    running = False
+    await monitor
+    return latencies
+
+
+async def upload_documents(app, documents: List[str]) -> List[str]:
+    """Queue one extraction job per document; returns the job ids"""
+    import httpx
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        files = []
+        for path in documents:
+            with open(path, "rb") as handle:
+                files.append(("files", (os.path.basename(path), handle.read(), "application/pdf")))
+        response = await client.post("/api/v1/bills/upload", files=files)
+        response.raise_for_status()
+        return response.json()["jobs"]
+
+
+def target_misses(summary: Dict) -> List[str]:
+    """Routes over the PRD latency targets"""
+    misses = []
+    for label, row in summary.items():
+        if label.startswith("GET /bills?search"):
+            target = SEARCH_TARGET_MS
+        elif label.startswith("GET "):
+            target = PAGE_LOAD_TARGET_MS
+        else:
+            continue
+        if row["p95"] > target:
+            misses.append(f"{label} P95 {row['p95']:.1f} ms over the {target} ms target")
+    return misses
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API load benchmark")
+    parser.add_argument("--bills", type=int, default=100_000)
+    parser.add_argument("--database", help="Existing corpus database (skips seeding)")
+    # A dashboard fires a handful of requests at once; the PRD targets are per user
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="billsmith-bench-")
+    database = os.path.abspath(args.database) if args.database else f"{workdir}/bench.db"
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{database}")
+    os.environ.setdefault("BILLS_STORAGE_PATH", f"{workdir}/Bills")
+    os.environ.setdefault("QUERY_BUDGET_MODE", "off")
+    os.environ.setdefault("ANALYTICS_CACHE_SIZE", "0")  # Measure the queries, not the cache
+
+    # Imported after DATABASE_URL is set
+    from sqlmodel import Session, func, select
+    from src.backend.database import create_db_and_tables, engine
+    from src.backend.main import app
+    from src.backend.models import Bill
+    from .documents import build_documents
+
+    create_db_and_tables()
+    documents = [document.path for document in build_documents(f"{workdir}/documents", UPLOAD_DOCUMENTS,
+                                                               args.seed, kinds=("text_pdf",))]
+    with Session(engine) as session:
+        categories = category_ids(session)
+        if not args.database:
+            seed_bills(session, BillCorpus(categories, args.bills, args.seed, documents), 0, args.bills)
+        bill_count = session.exec(select(func.count(Bill.id))).one()
+
+    weights = dict(ROUTE_WEIGHTS)
+    if args.database:
+        del weights["GET /bills/{id}/file"]  # Its bills point at no real files
+
+    rng = random.Random(args.seed)
+    job_ids = asyncio.run(upload_documents(app, documents[:UPLOAD_DOCUMENTS // 2]))
+    workload = Workload(rng, bill_count, list(categories.values()), documents, job_ids, weights)
+    latencies = asyncio.run(drive(app, workload.requests(args.requests), args.concurrency))
+    elapsed = latencies.pop("total")[0]
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {bill_count} bills: "
+          f"{args.requests / elapsed:.0f} req/s")
+    scenario = f"load {bill_count} bills, concurrency {args.concurrency}"
+    summary = summarize(latencies)
+    if args.save_baseline:
+        save_baseline(scenario, summary)
+        return
+    failures = check_baseline(scenario, summary, args.tolerance) + target_misses(summary)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Latency reports and stored baselines.
+
+Benchmarks collect samples (milliseconds) per label, print P50/P95/P99 and
+compare them with the baseline recorded for the same scenario in
+benchmarks/baselines.json. A label regresses when its P50, P95 or P99 exceeds
+the baseline by more than the tolerance (a share, plus an absolute floor
+so sub-millisecond routes don't flap), counting only quantiles with enough
+samples behind them; the benchmark then exits non-zero.
+
+Baselines are machine-specific: record them on the machine that runs the
+comparison (`--save-baseline`) and commit the file.
+"""
+
+import json
+import math
+import os
+import statistics
+from typing import Dict, List, Optional
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_TOLERANCE = 0.5
+TOLERANCE_FLOOR_MS = 10.0
+# Quantile -> samples needed before it is compared (a P99 of 20 samples is the max)
+COMPARED_QUANTILES = {"p50": 20, "p95": 50, "p99": 100}
+
+Samples = Dict[str, List[float]]
+Summary = Dict[str, Dict[str, float]]
+
+
+def percentile(samples: List[float], share: float) -> float:
+    """Nearest-rank percentile: the smallest sample with at least `share`
+    of the samples at or below it (also used by checkers/openai_query.py)"""
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(share * len(ordered)) - 1))]
+
+
+def summarize(samples: Samples) -> Summary:
+    """P50/P95/P99 and count per label"""
+    return {
+        label: {
+            "count": len(values),
+            "p50": round(statistics.median(values), 2),
+            "p95": round(percentile(values, 0.95), 2),
+            "p99": round(percentile(values, 0.99), 2),
+        }
+        for label, values in sorted(samples.items())
+        if values
+    }
+
+
+def print_summary(summary: Summary, baseline: Optional[Summary] = None, heading: str = "route") -> None:
+    print(f"{heading:<40} {'count':>6} {'P50 ms':>9} {'P95 ms':>9} {'P99 ms':>9} {'base P95':>9}")
+    for label, row in summary.items():
+        base = f"{baseline[label]['p95']:>9.1f}" if baseline and label in baseline else f"{'-':>9}"
+        print(f"{label:<40} {row['count']:>6} {row['p50']:>9.1f} {row['p95']:>9.1f} {row['p99']:>9.1f} {base}")
+
+
+def load_baselines(path: str = BASELINES_PATH) -> Dict[str, Summary]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_baseline(scenario: str, summary: Summary, path: str = BASELINES_PATH) -> None:
+    baselines = load_baselines(path)
+    baselines[scenario] = summary
+    with open(path, "w") as handle:
+        json.dump(baselines, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+    print(f"✅ Baseline saved for {scenario}")
+
+
+def regressions(summary: Summary, baseline: Summary, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Labels whose tail latency grew past the tolerance"""
+    found = []
+    for label, row in summary.items():
+        base = baseline.get(label)
+        if not base:
+            continue
+        for quantile, min_samples in COMPARED_QUANTILES.items():
+            if row["count"] < min_samples:
+                continue
+            allowed = base[quantile] * (1 + tolerance) + TOLERANCE_FLOOR_MS
+            if row[quantile] > allowed:
+                found.append(f"{label} {quantile.upper()} {row[quantile]:.1f} ms > {allowed:.1f} ms "
+                             f"(baseline {base[quantile]:.1f} ms)")
+    return found
+
+
+def check_baseline(scenario: str, summary: Summary, tolerance: float = DEFAULT_TOLERANCE,
+                   heading: str = "route") -> List[str]:
+    """Print the summary against the stored baseline; returns the regressions"""
+    baseline = load_baselines().get(scenario)
+    print_summary(summary, baseline, heading)
+    if baseline is None:
+        print(f"⚠️ No baseline for {scenario}; record one with --save-baseline")
+        return []
+    return regressions(summary, baseline, tolerance)
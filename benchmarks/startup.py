@@ -0,0 +1,119 @@
+"""
+API start-up benchmark.
+
+Starts the API in fresh interpreters, as an autoscaled replica would, and
+times each phase: interpreter start, importing the app, and the lifespan
+start-up (schema check, event hub, job executor) until it could serve.
+Two scenarios:
+- migrated: the database is already at the current schema version (every
+  worker after the first deployment); this is the one held to the target
+- first boot: an empty database each run, so migrations are applied
+
+It also fails when the API process imports an extraction-only dependency
+(parsers, OCR, LLM client); those belong in job workers (see jobs.py).
+Readiness (process start to serving) must stay under --target-ms at P50,
+and phases are compared with the stored baseline. Bytecode is compiled by
+a first untimed run, as a deployed image ships it.
+
+Usage (from the repository root):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 40 --save-baseline
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+from .report import DEFAULT_TOLERANCE, check_baseline, save_baseline, summarize
+
+READY_TARGET_MS = 1000
+
+# Modules only job workers should load
+EXTRACTION_ONLY = (
+    "src.backend.pipeline", "src.backend.extraction", "src.backend.llm_client", "src.backend.heuristics",
+    "pdfplumber", "pypdfium2", "PIL", "pytesseract", "openai", "pandas", "celery", "httpx",
+)
+
+# Runs in the child interpreter; prints one JSON line
+PROBE = """
+import asyncio, json, sys, time
+imported_at = time.time()
+import src.backend.main as main
+imported = time.time()
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        return time.time()
+
+ready = asyncio.run(boot())
+print(json.dumps({{"started": {started!r}, "interpreter": imported_at, "imported": imported, "ready": ready,
+                  "loaded": [name for name in {modules!r} if name in sys.modules]}}))
+"""
+
+
+def start_api(database: str) -> Dict:
+    """Boot the API once in a new interpreter; returns the probe's timestamps"""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}", MIGRATE_ON_STARTUP="true")
+    probe = PROBE.format(started=time.time(), modules=EXTRACTION_ONLY)
+    result = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(scenario: str, runs: int, workdir: str) -> Tuple[Dict[str, List[float]], Set[str]]:
+    """Phase timings per label, and the extraction-only modules seen loaded"""
+    samples: Dict[str, List[float]] = defaultdict(list)
+    loaded = set()
+    migrated = f"{workdir}/migrated.db"
+    start_api(migrated)  # Compiles bytecode and migrates the shared database
+    for number in range(runs):
+        database = migrated if scenario == "migrated" else f"{workdir}/fresh-{number}.db"
+        probe = start_api(database)
+        samples[f"{scenario}: interpreter"].append((probe["interpreter"] - probe["started"]) * 1000)
+        samples[f"{scenario}: import app"].append((probe["imported"] - probe["interpreter"]) * 1000)
+        samples[f"{scenario}: lifespan start-up"].append((probe["ready"] - probe["imported"]) * 1000)
+        samples[f"{scenario}: ready"].append((probe["ready"] - probe["started"]) * 1000)
+        loaded.update(probe["loaded"])
+    return samples, loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API start-up benchmark")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--target-ms", type=float, default=READY_TARGET_MS)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="billsmith-startup-")
+    samples: Dict[str, List[float]] = {}
+    loaded = set()
+    for scenario in ("migrated", "first boot"):
+        timings, modules = run(scenario, args.runs, workdir)
+        samples.update(timings)
+        loaded |= modules
+
+    scenario = f"startup {args.runs} runs"
+    summary = summarize(samples)
+    if args.save_baseline:
+        save_baseline(scenario, summary)
+        return
+    failures = check_baseline(scenario, summary, args.tolerance, heading="phase")
+    ready = summary["migrated: ready"]["p50"]
+    if ready > args.target_ms:
+        failures.append(f"migrated: ready P50 {ready:.0f} ms over the {args.target_ms:.0f} ms target")
+    if loaded:
+        failures.append(f"API process imported extraction-only modules: {', '.join(sorted(loaded))}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,105 +1,121 @@
+"""
+Concurrent model probe.
+
+Sends chat completions to every model concurrently through the shared LLM
+client (pooled connections, rate limiting, jittered retries) and reports
+availability plus P50/P95/P99 latency per model.
+
+Usage (from the repository root):
+    python -m checkers.openai_query --requests 5
+    python -m checkers.openai_query --base-url http://127.0.0.1:8099/v1  # stub_llm_server.py
+"""
+
+import argparse
+import asyncio
 import os
-import requests
+import statistics
+from typing import Dict, List
+
 from dotenv import load_dotenv
-import time
 
-# Load environment variables
-load_dotenv()
+from benchmarks.report import percentile
+from src.backend.llm_client import LLMClient
+
+# Models to test from the documentation: (alias, what it points to)
+MODELS = [
+    ("gpt-4o", "gpt-4o-2024-08-06"),
+    ("chatgpt-4o-latest", "gpt-4o-2024-08-06"),  # Points to latest used in ChatGPT
+    ("gpt-4o-mini", "gpt-4o-mini-2024-07-18"),
+    ("o1", "o1-2024-12-17"),
+    ("o1-mini", "o1-mini-2024-09-12"),
+    ("o3-mini", "o3-mini-2025-01-31"),
+    ("o1-preview", "o1-preview-2024-09-12"),
+    ("gpt-4o-realtime-preview", "gpt-4o-realtime-preview-2024-12-17"),
+    ("gpt-4o-mini-realtime-preview", "gpt-4o-mini-realtime-preview-2024-12-17"),
+    ("gpt-4o-audio-preview", "gpt-4o-audio-preview-2024-12-17")
+]
 
-api_key = os.getenv('OPENAI_API_KEY')
-if not api_key:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
+QUERY = "Where did Marc Andreessen (pmarca) go to school?"
 
-headers = {
-    "Authorization": f"Bearer {api_key}",
-    "Content-Type": "application/json"
-}
 
-def create_messages(query, model):
+def create_messages(query: str, model: str) -> List[Dict[str, str]]:
     """Create messages based on model type"""
     messages = []
-    
+
     # Add system message for models that support it
     if not any(model.startswith(prefix) for prefix in ['o1-mini', 'o3-mini', 'o1-preview']):
         messages.append({
             "role": "system",
             "content": "You are a helpful assistant that provides accurate information about people and events."
         })
-    
-    # Add user message
-    messages.append({
-        "role": "user",
-        "content": query
-    })
-    
+
+    messages.append({"role": "user", "content": query})
     return messages
 
-def test_model(model, alias=""):
-    print(f"\nTesting model: {model}")
-    if alias:
-        print(f"(Alias: {alias})")
-    print("=" * 80)
-    
-    payload = {
+
+async def probe_model(client: LLMClient, model: str, requests: int) -> Dict:
+    """Send `requests` completions to one model and collect latencies"""
+    # Distinct prompts so request coalescing doesn't merge the probes
+    outcomes = await asyncio.gather(*(
+        client.chat(model, create_messages(f"{QUERY} (probe {i + 1})", model))
+        for i in range(requests)
+    ), return_exceptions=True)
+
+    latencies = [outcome.latency for outcome in outcomes if not isinstance(outcome, BaseException)]
+    errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+    return {
         "model": model,
-        "messages": create_messages(query, model)
+        "ok": len(latencies),
+        "errors": len(errors),
+        "last_error": str(errors[-1])[:60] if errors else "",
+        "p50": percentile(latencies, 0.50) if latencies else None,
+        "p95": percentile(latencies, 0.95) if latencies else None,
+        "p99": percentile(latencies, 0.99) if latencies else None,
+        "mean": statistics.mean(latencies) if latencies else None,
     }
 
-    response = requests.post(
-        "https://api.openai.com/v1/chat/completions",
-        headers=headers,
-        json=payload
-    )
-
-    operational = False
-    if response.status_code == 200:
-        result = response.json()
-        print("Success!")
-        print("-" * 80)
-        print(result['choices'][0]['message']['content'])
-        print("-" * 80)
-        operational = True
-    else:
-        print(f"Error: {response.status_code}")
-        print(response.text)
-    print("\n")
-    return operational
-
-# Models to test from the documentation
-models = [
-    ("gpt-4o", "gpt-4o-2024-08-06"),
-    ("chatgpt-4o-latest", "gpt-4o-2024-08-06"),  # Points to latest used in ChatGPT
-    ("gpt-4o-mini", "gpt-4o-mini-2024-07-18"),
-    ("o1", "o1-2024-12-17"),
-    ("o1-mini", "o1-mini-2024-09-12"),
-    ("o3-mini", "o3-mini-2025-01-31"),
-    ("o1-preview", "o1-preview-2024-09-12"),
-    ("gpt-4o-realtime-preview", "gpt-4o-realtime-preview-2024-12-17"),
-    ("gpt-4o-mini-realtime-preview", "gpt-4o-mini-realtime-preview-2024-12-17"),
-    ("gpt-4o-audio-preview", "gpt-4o-audio-preview-2024-12-17")
-]
 
-query = "Where did Marc Andreessen (pmarca) go to school?"
-
-print("Testing all models from documentation...")
-print("=" * 80)
-
-results = []
-for alias, points_to in models:
-    # Test the alias first
-    alias_operational = test_model(alias, "")
-    time.sleep(1)
-    # Then test what it points to
-    points_to_operational = test_model(points_to, alias)
-    time.sleep(1)
-    results.append((alias, points_to, alias_operational, points_to_operational))
-
-# Print summary table
-print("\nResults Summary:")
-print("=" * 100)
-print(f"{'Alias':<30} | {'Points To':<40} | {'Operational':<20}")
-print("-" * 100)
-for alias, points_to, alias_op, points_to_op in results:
-    status = f"Alias: {'Yes' if alias_op else 'No'}, Points To: {'Yes' if points_to_op else 'No'}"
-    print(f"{alias:<30} | {points_to:<40} | {status:<20}")
-print("=" * 100) 
\ No newline at end of file
+async def probe(models: List[str], requests: int, base_url: str, concurrency: int) -> List[Dict]:
+    client = LLMClient(base_url=base_url, max_concurrency=concurrency)
+    try:
+        return await asyncio.gather(*(probe_model(client, model, requests) for model in models))
+    finally:
+        await client.aclose()
+
+
+def print_report(results: List[Dict]) -> None:
+    def ms(value):
+        return f"{value * 1000:.0f}" if value is not None else "-"
+
+    print("\nResults Summary:")
+    print("=" * 110)
+    print(f"{'Model':<40} | {'OK':>4} | {'Err':>4} | {'P50 ms':>7} | {'P95 ms':>7} | {'P99 ms':>7} | Last error")
+    print("-" * 110)
+    for result in results:
+        print(
+            f"{result['model']:<40} | {result['ok']:>4} | {result['errors']:>4} | "
+            f"{ms(result['p50']):>7} | {ms(result['p95']):>7} | {ms(result['p99']):>7} | {result['last_error']}"
+        )
+    print("=" * 110)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Probe model availability and latency")
+    parser.add_argument("--requests", type=int, default=3, help="Requests per model")
+    parser.add_argument("--concurrency", type=int, default=16, help="Max in-flight requests overall")
+    parser.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"))
+    parser.add_argument("--models", nargs="*", help="Models to probe (default: documented aliases and targets)")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY") and "api.openai.com" in args.base_url:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+
+    models = args.models or list(dict.fromkeys(name for pair in MODELS for name in pair))
+    print(f"Probing {len(models)} models x {args.requests} requests at {args.base_url}...")
+    results = asyncio.run(probe(models, args.requests, args.base_url, args.concurrency))
+    print_report(results)
+
+
+if __name__ == "__main__":
+    main()
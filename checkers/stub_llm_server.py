@@ -0,0 +1,148 @@
+"""
+Stub OpenAI-compatible LLM server for offline runs.
+
+Answers POST /v1/chat/completions with canned bill fields, per-field
+confidences for verification prompts, or both for structured-output
+requests (one entry per "=== Document N ===" block in batches), so the
+extraction pipeline, LLM cache, LLM client and model checker can be
+exercised without network access or API keys. Responses carry OpenAI-style x-ratelimit-* headers and
+--throttle-rate answers a share of requests with 429 to exercise retries.
+GET /stats returns how many completions were served.
+
+Usage:
+    python checkers/stub_llm_server.py --port 8099 [--latency-ms 200] [--throttle-rate 0.1]
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=stub ...
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_FIELDS = {
+    "vendor": "Stub Power & Light",
+    "category": "Electricity",
+    "account_number": "1234-5678",
+    "invoice_number": "INV-0001",
+    "billing_start": "2025-05-01",
+    "billing_end": "2025-05-31",
+    "due_date": "2025-06-20",
+    "amount_due": 123.45,
+    "usage_qty": 512,
+    "usage_unit": "kWh",
+    "tax_total": 8.12,
+}
+
+_lock = threading.Lock()
+_stats = {"completions": 0, "throttled": 0}
+RATE_LIMIT_REQUESTS = 500
+RATE_LIMIT_TOKENS = 30000
+
+
+def _answer(messages, response_format=None):
+    """Canned JSON answer for a chat request"""
+    schema_name = (response_format or {}).get("json_schema", {}).get("name")
+    if schema_name:
+        user = next((m["content"] for m in messages if m["role"] == "user"), "")
+        bill = {"fields": CANNED_FIELDS, "confidence": {field: 0.97 for field in CANNED_FIELDS}}
+        if schema_name.endswith("_batch"):
+            documents = [int(n) for n in re.findall(r"=== Document (\d+) ===", user)]
+            return {"bills": [{"document": number, **bill} for number in documents]}
+        return bill
+
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    user = next((m["content"] for m in messages if m["role"] == "user"), "")
+    if "verify" in system.lower():
+        match = re.search(r"Fields: (\{.*?\})\n", user, re.S)
+        fields = json.loads(match.group(1)) if match else CANNED_FIELDS
+        return {field: 0.97 for field in fields}
+    return CANNED_FIELDS
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency_seconds = 0.0
+    throttle_rate = 0.0
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with _lock:
+                self._send(200, dict(_stats))
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if random.random() < self.throttle_rate:
+            with _lock:
+                _stats["throttled"] += 1
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                       {"retry-after": "0.2", "x-ratelimit-remaining-requests": "0"})
+            return
+        time.sleep(self.latency_seconds)
+        with _lock:
+            _stats["completions"] += 1
+
+        content = json.dumps(_answer(request.get("messages", []), request.get("response_format")))
+        prompt_tokens = sum(len(m.get("content", "")) for m in request.get("messages", [])) // 4
+        completion_tokens = len(content) // 4
+        self._send(200, {
+            "id": f"chatcmpl-stub-{_stats['completions']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }, {
+            "x-ratelimit-limit-requests": str(RATE_LIMIT_REQUESTS),
+            "x-ratelimit-remaining-requests": str(RATE_LIMIT_REQUESTS - 1),
+            "x-ratelimit-limit-tokens": str(RATE_LIMIT_TOKENS),
+            "x-ratelimit-remaining-tokens": str(RATE_LIMIT_TOKENS - prompt_tokens - completion_tokens),
+            "x-ratelimit-reset-requests": "120ms",
+        })
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Artificial latency per completion")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Share of requests answered with 429")
+    args = parser.parse_args()
+
+    StubHandler.latency_seconds = args.latency_ms / 1000
+    StubHandler.throttle_rate = args.throttle_rate
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Stub LLM server listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Analytics Response Cache
+
+Caches analytics responses keyed by route, query parameters and the day,
+versioned by a data generation counter. Database triggers bump the
+counter of the "all" scope and of the affected category on every bill or
+category write, whichever process makes it. A write therefore
+invalidates exactly the cached responses that could have changed.
+
+Responses carry an ETag derived from the same key and generation, so a
+client revalidating with If-None-Match gets a 304 without the route
+running (even after its entry was evicted).
+
+Backends (ANALYTICS_CACHE_BACKEND):
+- local (default): in-process LRU of ANALYTICS_CACHE_SIZE responses
+- redis: shared by every API worker; entries expire after
+  ANALYTICS_CACHE_TTL seconds (configure Redis maxmemory-policy
+  allkeys-lru to bound memory)
+
+Mark a GET route with @cache_response on a router created with
+route_class=CachedRoute. Routes with a category_id path or query
+parameter are versioned by that category, others by all data.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from sqlalchemy import Connection, text
+from sqlmodel import Session
+
+from .database import engine, read_engine
+from .models import CacheGeneration
+
+ANALYTICS_CACHE_BACKEND = os.getenv("ANALYTICS_CACHE_BACKEND", "local")
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", 512))
+ANALYTICS_CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", 3600))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_KEY_PREFIX = "billsmith:analytics:"
+
+# Bump "all" and the given category scopes, as SQLite expressions
+SQLITE_BUMP = """
+    INSERT INTO cache_generations (scope, generation) VALUES ('all', 1){scopes}
+    ON CONFLICT (scope) DO UPDATE SET generation = generation + 1;
+"""
+
+
+def _sqlite_bump(*categories: str) -> str:
+    return SQLITE_BUMP.format(scopes="".join(f", ('category:' || {category}, 1)" for category in categories))
+
+
+SQLITE_SETUP = [
+    f"CREATE TRIGGER cache_generation_bill_insert AFTER INSERT ON bills BEGIN {_sqlite_bump('new.category_id')} END",
+    f"""CREATE TRIGGER cache_generation_bill_update AFTER UPDATE ON bills BEGIN
+        {_sqlite_bump('old.category_id', 'new.category_id')}
+    END""",
+    f"CREATE TRIGGER cache_generation_bill_delete AFTER DELETE ON bills BEGIN {_sqlite_bump('old.category_id')} END",
+    f"CREATE TRIGGER cache_generation_category_insert AFTER INSERT ON categories BEGIN {_sqlite_bump('new.id')} END",
+    f"CREATE TRIGGER cache_generation_category_update AFTER UPDATE ON categories BEGIN {_sqlite_bump('new.id')} END",
+    f"CREATE TRIGGER cache_generation_category_delete AFTER DELETE ON categories BEGIN {_sqlite_bump('old.id')} END",
+]
+
+POSTGRES_SETUP = [
+    """CREATE FUNCTION cache_generation_bump() RETURNS TRIGGER AS $$
+    DECLARE
+        scopes TEXT[] := ARRAY['all'];
+    BEGIN
+        IF TG_TABLE_NAME = 'categories' THEN
+            scopes := scopes || ('category:' || coalesce(NEW.id, OLD.id));
+        ELSE
+            IF TG_OP <> 'INSERT' THEN
+                scopes := scopes || ('category:' || OLD.category_id);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                scopes := scopes || ('category:' || NEW.category_id);
+            END IF;
+        END IF;
+        INSERT INTO cache_generations (scope, generation)
+        SELECT DISTINCT scope, 1 FROM unnest(scopes) AS scope
+        ON CONFLICT (scope) DO UPDATE SET generation = cache_generations.generation + 1;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER cache_generation_bills AFTER INSERT OR UPDATE OR DELETE ON bills
+        FOR EACH ROW EXECUTE FUNCTION cache_generation_bump()""",
+    """CREATE TRIGGER cache_generation_categories AFTER INSERT OR UPDATE OR DELETE ON categories
+        FOR EACH ROW EXECUTE FUNCTION cache_generation_bump()""",
+]
+
+
+def create_cache_triggers(connection: Connection) -> None:
+    """Create the generation triggers if missing; a schema migration step"""
+    if engine.dialect.name == "postgresql":
+        existing = "SELECT count(*) FROM pg_trigger WHERE tgname = 'cache_generation_bills'"
+        statements = POSTGRES_SETUP
+    else:
+        existing = "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'cache_generation_bill_insert'"
+        statements = SQLITE_SETUP
+
+    if connection.execute(text(existing)).scalar():
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def current_generation(scope: str) -> int:
+    with Session(read_engine) as session:
+        row = session.get(CacheGeneration, scope)
+        return row.generation if row else 0
+
+
+# ===== BACKENDS =====
+
+class LocalCache:
+    """In-process LRU of response bodies"""
+
+    def __init__(self, max_entries: int = ANALYTICS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def set(self, key: str, body: bytes) -> None:
+        with self.lock:
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def size(self) -> int:
+        return len(self.entries)
+
+
+class RedisCache:
+    """Response bodies shared by every API worker through Redis"""
+
+    def __init__(self, url: str = REDIS_URL, ttl: int = ANALYTICS_CACHE_TTL):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.evictions = 0  # Done by Redis
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(REDIS_KEY_PREFIX + key)
+
+    def set(self, key: str, body: bytes) -> None:
+        self.client.set(REDIS_KEY_PREFIX + key, body, ex=self.ttl)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = RedisCache() if ANALYTICS_CACHE_BACKEND == "redis" else LocalCache()
+    return _backend
+
+
+# ===== RESPONSES =====
+
+class CacheStats:
+    """Outcome counts for this process"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        backend = get_backend()
+        served = self.hits + self.not_modified
+        requests = served + self.misses
+        return {
+            "backend": ANALYTICS_CACHE_BACKEND,
+            "entries": backend.size(),
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+            "misses": self.misses,
+            "evictions": backend.evictions,
+            "errors": self.errors,
+            "hit_rate": round(served / requests, 3) if requests else None,
+        }
+
+
+stats = CacheStats()
+
+
+def cache_response(endpoint: Callable) -> Callable:
+    """Serve this route through the analytics cache (apply below @router)"""
+    endpoint.cache_response = True
+    return endpoint
+
+
+def _scope(request: Request) -> str:
+    category_id = request.path_params.get("category_id") or request.query_params.get("category_id")
+    return f"category:{category_id}" if category_id else "all"
+
+
+def _etag(request: Request, generation: int) -> str:
+    # Results depend on today's date (YTD, trailing months)
+    key = "|".join([
+        request.url.path,
+        "&".join(sorted(f"{name}={value}" for name, value in request.query_params.multi_items())),
+        date.today().isoformat(),
+        str(generation),
+    ])
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+async def serve_cached(request: Request, handler: Callable) -> Response:
+    # Database and Redis calls run off the event loop
+    etag = _etag(request, await run_in_threadpool(current_generation, _scope(request)))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        stats.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    backend = get_backend()
+    try:
+        body = await run_in_threadpool(backend.get, etag)
+    except Exception as exc:
+        # A cache outage only costs the recomputation
+        print(f"⚠️ Analytics cache read failed: {exc}")
+        stats.errors += 1
+        body = None
+    if body is not None:
+        stats.hits += 1
+        return Response(body, media_type="application/json", headers={**headers, "X-Cache": "HIT"})
+
+    stats.misses += 1
+    response = await handler(request)
+    if response.status_code == 200:
+        try:
+            await run_in_threadpool(backend.set, etag, response.body)
+        except Exception as exc:
+            print(f"⚠️ Analytics cache write failed: {exc}")
+            stats.errors += 1
+        response.headers.update({**headers, "X-Cache": "MISS"})
+    return response
+
+
+class CachedRoute(APIRoute):
+    """Route class that serves @cache_response endpoints through the cache"""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not getattr(self.endpoint, "cache_response", False):
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            return await serve_cached(request, handler)
+
+        return cached_handler
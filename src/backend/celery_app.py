@@ -0,0 +1,38 @@
+"""
+Celery Application (optional)
+
+Used when JOB_EXECUTOR=celery to spread extraction across nodes. Start a
+worker with:
+
+    celery -A src.backend.celery_app worker --loglevel=info
+"""
+
+import os
+
+from celery import Celery
+
+from . import pipeline  # noqa: F401  (loaded with the worker, not on the first task)
+from .jobs import backoff_until, claim_job, run_job
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+celery_app = Celery("billsmith", broker=REDIS_URL)
+celery_app.conf.update(
+    task_serializer="json",
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+)
+
+
+@celery_app.task(name="billsmith.extract_bill")
+def extract_bill(job_id: str) -> None:
+    """Claim and run one extraction job, scheduling its retry on failure"""
+    if not claim_job(job_id):
+        # Delivered before its backoff ended: come back when it is due
+        due_at = backoff_until(job_id)
+        if due_at:
+            extract_bill.apply_async((job_id,), eta=due_at)
+        return
+    retry_at = run_job(job_id)
+    if retry_at:
+        extract_bill.apply_async((job_id,), eta=retry_at)
@@ -3,29 +3,102 @@ Database configuration and connection management
 """
 
 import os
-from sqlmodel import SQLModel, create_engine, Session, select
-from typing import Generator
+from sqlalchemy import Connection, Engine, event
+from sqlmodel import create_engine, Session, select
+from typing import Generator, List, Optional
 from .models import Category, Bill
 
 # Database URL from environment or default to SQLite
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./billsmith.db")
+# Analytics reads go through a separate read-only pool (e.g. a replica)
+ANALYTICS_DATABASE_URL = os.getenv("ANALYTICS_DATABASE_URL", DATABASE_URL)
+
+# Route handlers run in a worker thread pool; every thread may hold one
+# connection, so the thread pool is sized to the connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_THREADPOOL_SIZE = int(os.getenv("DB_THREADPOOL_SIZE", DB_POOL_SIZE + DB_MAX_OVERFLOW))
+ANALYTICS_POOL_SIZE = int(os.getenv("ANALYTICS_POOL_SIZE", 5))
+# Bulk exports hold a connection for their whole download, so they get their
+# own pool (and that many concurrent exports per process, see export.py)
+EXPORT_POOL_SIZE = int(os.getenv("EXPORT_POOL_SIZE", 2))
+
+# SQLite tuning: WAL lets readers run alongside a writer, and writers wait
+# up to the busy timeout for each other instead of failing "database is locked"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # Durable in WAL except on power loss
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 10000))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))  # Per connection
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", 256))
+
+ECHO_SQL = bool(os.getenv("DEBUG_MODE", False))
+# Let API workers apply pending schema migrations on boot (see migrations.py)
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+
+
+def _sqlite_pragmas(read_only: bool) -> List[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE_MB * 1024 * 1024}",
+        f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    else:
+        # Persistent in the database file; set by the writer side only
+        pragmas.insert(0, f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        # Enforce foreign keys as PostgreSQL does (SQLite leaves them off per connection)
+        pragmas.append("PRAGMA foreign_keys = ON")
+    return pragmas
+
+
+def _create_engine(url: str, pool_size: int, max_overflow: int, read_only: bool = False) -> Engine:
+    pool_settings = {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+    }
+    if not url.startswith("sqlite"):
+        # PostgreSQL configuration
+        connect_args = {"options": "-c default_transaction_read_only=on"} if read_only else {}
+        return create_engine(url, echo=ECHO_SQL, connect_args=connect_args, **pool_settings)
 
-# Create engine with appropriate settings
-if DATABASE_URL.startswith("sqlite"):
     # SQLite configuration
-    engine = create_engine(
-        DATABASE_URL,
+    new_engine = create_engine(
+        url,
         connect_args={"check_same_thread": False},
-        echo=bool(os.getenv("DEBUG_MODE", False))
+        echo=ECHO_SQL,
+        **pool_settings
     )
-else:
-    # PostgreSQL configuration
-    engine = create_engine(DATABASE_URL, echo=bool(os.getenv("DEBUG_MODE", False)))
+    pragmas = _sqlite_pragmas(read_only)
+
+    @event.listens_for(new_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return new_engine
+
+
+engine = _create_engine(DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW)
+read_engine = _create_engine(ANALYTICS_DATABASE_URL, ANALYTICS_POOL_SIZE, ANALYTICS_POOL_SIZE, read_only=True)
+export_engine = _create_engine(ANALYTICS_DATABASE_URL, EXPORT_POOL_SIZE, 0, read_only=True)
 
 
 def create_db_and_tables():
-    """Create database tables"""
-    SQLModel.metadata.create_all(engine)
+    """Bring the schema up to date: tables, the bill search index, spending
+    rollups and analytics cache generation triggers (see migrations.py)"""
+    from .migrations import migrate
+    from .search import detect_search_index
+
+    migrate()
+    detect_search_index()
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -34,9 +107,16 @@ def get_session() -> Generator[Session, None, None]:
         yield session
 
 
-def init_default_categories():
-    """Initialize default categories for the MVP"""
-    with Session(engine) as session:
+def get_read_session() -> Generator[Session, None, None]:
+    """Dependency for a read-only session (analytics); never waits on writers"""
+    with Session(read_engine) as session:
+        yield session
+
+
+def init_default_categories(bind: Optional[Connection] = None):
+    """Initialize default categories for the MVP (in the caller's transaction
+    when given a connection)"""
+    with Session(bind or engine) as session:
         # Check if categories already exist
         existing = session.exec(select(Category)).first()
         if existing:
@@ -64,12 +144,18 @@ def get_category_by_name(session: Session, name: str) -> Category | None:
     return session.exec(select(Category).where(Category.name == name, Category.active == True)).first()
 
 
-def get_or_create_category(session: Session, name: str, color_hex: str = "#2222FF") -> Category:
-    """Get existing category or create new one"""
+def get_or_create_category(
+    session: Session, name: str, color_hex: str = "#2222FF", commit: bool = True
+) -> Category:
+    """Get existing category or create new one (commit=False: only flushed,
+    the caller commits)"""
     category = get_category_by_name(session, name)
     if not category:
         category = Category(name=name, color_hex=color_hex)
         session.add(category)
+        if not commit:
+            session.flush()
+            return category
         session.commit()
         session.refresh(category)
     return category 
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""
+Diagnostics
+
+Opt-in tools for finding out why a request is slow, beyond what the
+aggregate metrics (metrics.py) show:
+
+- Slow-query log (SLOW_QUERY_MS > 0): any statement slower than the
+  threshold is logged with the route that ran it and its query plan
+  (EXPLAIN QUERY PLAN on SQLite, EXPLAIN on PostgreSQL). Tables the plan
+  scans in full are called out, so a filter that can't use an index (e.g.
+  extract() on created_at instead of a date range) is spotted from the log.
+- Request profiling: a sampling profiler records the stacks of a request
+  every PROFILE_INTERVAL_MS and writes them to PROFILE_DIR in collapsed
+  ("folded") format, one file per request, ready for flamegraph.pl or
+  speedscope. Requests are picked at random (PROFILE_SAMPLE_RATE, 0-1)
+  and, when PROFILE_HEADER_ENABLED=true, by sending `X-Profile: 1`. The
+  response names the file in X-Profile-File.
+
+A profile covers the request's coroutines on the event loop and its sync
+endpoint in the threadpool; concurrent calls to the same sync endpoint
+can land in each other's profile, so capture under light traffic.
+"""
+
+import inspect
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+
+from .database import engine, export_engine, read_engine
+from .metrics import route_label
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 0))  # 0 = off
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() == "true"
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_HEADER = b"x-profile"
+
+# Request being handled, for labelling slow queries
+_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("diagnostics_scope", default=None)
+
+
+def _request_label() -> str:
+    scope = _scope.get()
+    if scope is None:
+        return "outside a request"
+    return f"{scope['method']} {route_label(scope)}"
+
+
+# ===== SLOW QUERIES =====
+
+EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+FULL_SCAN = {
+    "sqlite": re.compile(r"^SCAN (?:TABLE )?(\w+)(?!.*(?:USING|VIRTUAL TABLE))"),
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+}
+
+
+def explain(conn, statement: str, parameters) -> List[str]:
+    """Query plan lines for a statement, run on the raw driver connection"""
+    prefix = EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None or not EXPLAINABLE.match(statement):
+        return []
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if conn.dialect.name != "sqlite":
+        return [row[0] for row in rows]
+    # (id, parent, _, detail): indent each step under its parent
+    depth = {0: -1}
+    lines = []
+    for step_id, parent, _, detail in rows:
+        depth[step_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[step_id] + detail)
+    return lines
+
+
+def full_scans(dialect: str, plan: List[str]) -> List[str]:
+    """Tables the plan reads in full"""
+    pattern = FULL_SCAN.get(dialect)
+    if pattern is None:
+        return []
+    return [match.group(1) for line in plan for match in [pattern.search(line.strip())] if match]
+
+
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+
+def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["slow_query_started"].pop()) * 1000
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+    try:
+        plan = [] if executemany else explain(conn, statement, parameters)
+    except Exception as exc:
+        plan = [f"(no plan: {exc})"]
+    scans = full_scans(conn.dialect.name, plan)
+    warning = f" - full scan of {', '.join(scans)}" if scans else ""
+    print(f"🐢 Slow query ({elapsed_ms:.0f} ms) from {_request_label()}{warning}:\n"
+          f"    {' '.join(statement.split())}\n" + "".join(f"    | {line}\n" for line in plan), end="")
+
+
+if SLOW_QUERY_MS > 0:
+    for _engine in (engine, read_engine, export_engine):
+        event.listen(_engine, "before_cursor_execute", _start_timer)
+        event.listen(_engine, "after_cursor_execute", _log_slow_query)
+
+
+# ===== PROFILING =====
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class RequestProfile:
+    """Samples the stacks running one request from a background thread"""
+
+    def __init__(self, scope, entry_frame, path: str):
+        self.scope = scope
+        self.entry_frame = entry_frame  # The middleware's frame on the event loop
+        self.path = path
+        self.stacks: Counter = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="request-profiler", daemon=True)
+
+    def belongs(self, leaf, endpoint_code) -> bool:
+        frame = leaf
+        while frame is not None:
+            if frame is self.entry_frame or frame.f_code is endpoint_code:
+                return True
+            frame = frame.f_back
+        return False
+
+    def sample(self) -> None:
+        endpoint = self.scope.get("endpoint")
+        endpoint_code = getattr(inspect.unwrap(endpoint), "__code__", None) if endpoint else None
+        own = threading.get_ident()
+        for thread_id, leaf in sys._current_frames().items():
+            if thread_id == own or not self.belongs(leaf, endpoint_code):
+                continue
+            stack = []
+            frame = leaf
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def run(self) -> None:
+        interval = PROFILE_INTERVAL_MS / 1000
+        while not self.stopped.wait(interval):
+            self.sample()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as handle:
+            for stack, count in self.stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+        print(f"🔬 Profile of {self.scope['method']} {self.scope['path']}: "
+              f"{sum(self.stacks.values())} samples in {self.path}")
+
+
+def _wants_profile(scope) -> bool:
+    if PROFILE_HEADER_ENABLED and dict(scope["headers"]).get(PROFILE_HEADER) == b"1":
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class DiagnosticsMiddleware:
+    """ASGI middleware labelling slow queries and profiling picked requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _scope.set(scope)
+        try:
+            if not _wants_profile(scope):
+                await self.app(scope, receive, send)
+                return
+
+            slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+            name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{scope['method']}-{slug[:80]}.folded"
+            profile = RequestProfile(scope, sys._getframe(), os.path.join(PROFILE_DIR, name))
+
+            async def send_with_header(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-file", name.encode())]
+                await send(message)
+
+            profile.thread.start()
+            try:
+                await self.app(scope, receive, send_with_header)
+            finally:
+                profile.stopped.set()
+        finally:
+            _scope.reset(token)
@@ -0,0 +1,244 @@
+"""
+Job Event Hub
+
+Publish/subscribe for real-time job updates (PRD step 9, "Notify
+Front-End"). Job workers publish status changes and per-stage / per-page
+progress; the hub in each API process fans them out to WebSocket
+subscribers (see routers/ws.py).
+
+Topics:
+- job:{job_id} - every event for one job
+- user:{user_id} - every event for the jobs a user uploaded
+
+Brokers (EVENTS_BROKER):
+- local (default): worker processes send events to the API process over a
+  multiprocessing queue handed to the pool at start-up
+- redis: every process publishes to one Redis channel that all API
+  processes listen on; needed with several API processes or Celery
+
+Every event passing through the hub also feeds the extraction stage
+metrics (see metrics.py).
+
+Each subscriber has a bounded queue. A client that falls EVENT_QUEUE_SIZE
+events behind is dropped so one slow consumer can't hold up the others.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .metrics import observe_job_event
+
+EVENTS_BROKER = os.getenv("EVENTS_BROKER", "local")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+EVENTS_CHANNEL = "billsmith:job-events"
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 100))
+
+
+def job_topic(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def user_topic(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def event_topics(event: Dict[str, Any]) -> List[str]:
+    topics = [job_topic(event["job_id"])]
+    if event.get("user_id"):
+        topics.append(user_topic(event["user_id"]))
+    return topics
+
+
+# ===== SUBSCRIBERS =====
+
+class Subscriber:
+    """One WebSocket client's topics and pending events"""
+
+    def __init__(self, topics: Iterable[str], maxsize: int = EVENT_QUEUE_SIZE):
+        self.topics: Set[str] = set(topics)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+
+class EventHub:
+    """Fans events out to the subscribers in this process"""
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+
+    def subscribe(self, topics: Iterable[str]) -> Subscriber:
+        subscriber = Subscriber(topics)
+        for topic in subscriber.topics:
+            self.subscribers.setdefault(topic, set()).add(subscriber)
+        return subscriber
+
+    def add_topic(self, subscriber: Subscriber, topic: str) -> None:
+        subscriber.topics.add(topic)
+        self.subscribers.setdefault(topic, set()).add(subscriber)
+
+    def remove_topic(self, subscriber: Subscriber, topic: str) -> None:
+        subscriber.topics.discard(topic)
+        listeners = self.subscribers.get(topic)
+        if listeners is not None:
+            listeners.discard(subscriber)
+            if not listeners:
+                del self.subscribers[topic]
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        for topic in list(subscriber.topics):
+            self.remove_topic(subscriber, topic)
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        """Deliver an event to matching subscribers (event loop thread only)"""
+        observe_job_event(event)
+        recipients = set()
+        for topic in event_topics(event):
+            recipients |= self.subscribers.get(topic, set())
+        for subscriber in recipients:
+            self.deliver(subscriber, event)
+
+    def deliver(self, subscriber: Subscriber, event: Dict[str, Any]) -> None:
+        """Queue an event for one subscriber, dropping it if it fell behind"""
+        if subscriber.dropped:
+            return
+        try:
+            subscriber.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        # Free the backlog and leave a sentinel so the sender closes the socket
+        self.unsubscribe(subscriber)
+        subscriber.dropped = True
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def dispatch_threadsafe(self, event: Dict[str, Any]) -> None:
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.dispatch, event)
+
+    def subscriber_count(self) -> int:
+        return len({subscriber for listeners in self.subscribers.values() for subscriber in listeners})
+
+
+hub = EventHub()
+
+
+# ===== PUBLISHING =====
+
+# Set in job worker processes by init_worker (local broker)
+_worker_queue: Optional[multiprocessing.Queue] = None
+_redis = None
+
+
+def init_worker(queue: Optional[multiprocessing.Queue]) -> None:
+    """Process pool initializer: route this worker's events to the API process"""
+    global _worker_queue
+    _worker_queue = queue
+
+
+def _redis_client():
+    global _redis
+    if _redis is None:
+        import redis
+        _redis = redis.Redis.from_url(REDIS_URL)
+    return _redis
+
+
+def publish(event: Dict[str, Any]) -> None:
+    """Publish an event from any process or thread; never raises"""
+    try:
+        if EVENTS_BROKER == "redis":
+            _redis_client().publish(EVENTS_CHANNEL, json.dumps(event, default=str))
+        elif _worker_queue is not None:
+            _worker_queue.put_nowait(event)
+        else:
+            hub.dispatch_threadsafe(event)
+    except Exception as exc:
+        print(f"⚠️ Failed to publish job event: {exc}")
+
+
+def publish_job_event(job_id: str, user_id: Optional[str], event: str, **detail: Any) -> None:
+    """Publish a job status change or progress update"""
+    publish({
+        "event": event,
+        "job_id": job_id,
+        "user_id": user_id,
+        "at": datetime.utcnow().isoformat(),
+        **{name: value.isoformat() if isinstance(value, datetime) else value for name, value in detail.items()},
+    })
+
+
+# ===== API PROCESS =====
+
+_relay_queue: Optional[multiprocessing.Queue] = None
+_relay_thread: Optional[threading.Thread] = None
+_listener: Optional[asyncio.Task] = None
+
+
+def worker_queue() -> Optional[multiprocessing.Queue]:
+    """Queue job worker processes publish to (local broker only)"""
+    global _relay_queue
+    if EVENTS_BROKER != "local":
+        return None
+    if _relay_queue is None:
+        _relay_queue = multiprocessing.get_context("spawn").Queue()
+    return _relay_queue
+
+
+def _relay_worker_events(queue: multiprocessing.Queue) -> None:
+    while True:
+        event = queue.get()
+        if event is None:
+            return
+        hub.dispatch_threadsafe(event)
+
+
+async def _listen_redis() -> None:
+    import redis.asyncio as aioredis
+
+    client = aioredis.Redis.from_url(REDIS_URL)
+    pubsub = client.pubsub()
+    await pubsub.subscribe(EVENTS_CHANNEL)
+    try:
+        async for message in pubsub.listen():
+            if message["type"] == "message":
+                hub.dispatch(json.loads(message["data"]))
+    finally:
+        await pubsub.unsubscribe(EVENTS_CHANNEL)
+        await client.close()
+
+
+async def start_events() -> None:
+    """Bind the hub to the running loop and start receiving worker events"""
+    global _relay_thread, _listener
+    hub.bind(asyncio.get_running_loop())
+    if EVENTS_BROKER == "redis":
+        _listener = asyncio.create_task(_listen_redis())
+    else:
+        _relay_thread = threading.Thread(
+            target=_relay_worker_events, args=(worker_queue(),), name="job-events", daemon=True
+        )
+        _relay_thread.start()
+    print(f"✅ Job events started ({EVENTS_BROKER})")
+
+
+async def stop_events() -> None:
+    global _relay_thread, _listener
+    if _listener is not None:
+        _listener.cancel()
+        _listener = None
+    if _relay_thread is not None:
+        _relay_queue.put(None)
+        _relay_thread.join(timeout=5)
+        _relay_thread = None
@@ -0,0 +1,234 @@
+"""
+Bill Export
+
+Bulk export of bills for accountants as NDJSON, CSV or Parquet. Rows are
+read with a server-side cursor in batches of EXPORT_BATCH_SIZE and
+encoded straight from the database rows, without ORM objects or response
+models, so memory stays flat however many bills match.
+
+An export holds its connection for the whole download, so exports read
+from their own read-only pool (EXPORT_POOL_SIZE) rather than the
+analytics one. A process runs at most that many at once; further exports
+get a 503 before their response starts. The connection is returned when
+the download ends or the client goes away.
+
+Parquet needs pyarrow (optional); each batch becomes one row group.
+"""
+
+import csv
+import io
+import json
+import os
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Iterator, List, Sequence
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlmodel import select
+
+from .database import EXPORT_POOL_SIZE, export_engine
+from .models import Bill, Category
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+MAX_EXPORT_BATCH_SIZE = 10000
+
+# Exported columns, in file order
+COLUMNS = [
+    Bill.id,
+    Bill.vendor,
+    Category.name.label("category"),
+    Bill.category_id,
+    Bill.invoice_number,
+    Bill.account_number,
+    Bill.billing_start,
+    Bill.billing_end,
+    Bill.due_date,
+    Bill.amount_due,
+    Bill.tax_total,
+    Bill.usage_qty,
+    Bill.usage_unit,
+    Bill.needs_review,
+    Bill.confidence_score,
+    Bill.created_at,
+    Bill.updated_at,
+]
+COLUMN_NAMES = [column.key for column in COLUMNS]
+
+FORMATS = {
+    # format -> (media type, file extension)
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+# ===== ENCODERS =====
+
+def _json_value(value: Any) -> Any:
+    # Amounts stay exact, as in the API's JSON
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Unexpected {type(value).__name__} in export")
+
+
+def encode_ndjson(batches: Iterator[Sequence]) -> Iterator[bytes]:
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(COLUMN_NAMES, row)), default=_json_value, separators=(",", ":")) + "\n"
+            for row in rows
+        ).encode()
+
+
+def encode_csv(batches: Iterator[Sequence]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMN_NAMES)
+    for rows in batches:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, (date, datetime)) else value for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _Chunks(io.RawIOBase):
+    """Write-only file collecting what pyarrow writes until it is drained"""
+
+    def __init__(self):
+        self.pending = bytearray()
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.pending += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = bytes(self.pending)
+        self.pending.clear()
+        return data
+
+
+def _parquet_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.int64()),
+        ("vendor", pa.string()),
+        ("category", pa.string()),
+        ("category_id", pa.int64()),
+        ("invoice_number", pa.string()),
+        ("account_number", pa.string()),
+        ("billing_start", pa.date32()),
+        ("billing_end", pa.date32()),
+        ("due_date", pa.date32()),
+        ("amount_due", pa.decimal128(10, 2)),
+        ("tax_total", pa.decimal128(10, 2)),
+        ("usage_qty", pa.decimal128(10, 3)),
+        ("usage_unit", pa.string()),
+        ("needs_review", pa.bool_()),
+        ("confidence_score", pa.float64()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])
+
+
+def encode_parquet(batches: Iterator[Sequence]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    sink = _Chunks()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            ))
+            yield sink.drain()
+    yield sink.drain()  # Footer
+
+
+ENCODERS = {"ndjson": encode_ndjson, "csv": encode_csv, "parquet": encode_parquet}
+
+
+def check_format(export_format: str) -> None:
+    """Reject a format this server can't write, before the response starts"""
+    if export_format != "parquet":
+        return
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export needs pyarrow on the server; use ndjson or csv"
+        )
+
+
+# ===== STREAMING =====
+
+_export_slots = threading.BoundedSemaphore(EXPORT_POOL_SIZE)
+
+
+def _batches(query: Select, batch_size: int) -> Iterator[List]:
+    with export_engine.connect() as connection:
+        # Server-side cursor (PostgreSQL); SQLite steps its cursor lazily anyway
+        result = connection.execution_options(stream_results=True, max_row_buffer=batch_size).execute(query)
+        for rows in result.partitions(batch_size):
+            yield rows
+
+
+async def stream_export(query: Select, export_format: str, batch_size: int) -> AsyncIterator[bytes]:
+    """Encoded chunks of the export, one per batch of rows"""
+    chunks = ENCODERS[export_format](_batches(query, batch_size))
+    try:
+        # Database reads and encoding run off the event loop
+        while (chunk := await run_in_threadpool(next, chunks, None)) is not None:
+            yield chunk
+    finally:
+        # Also on disconnect: closes the cursor and returns the connection
+        chunks.close()
+
+
+class ExportResponse(StreamingResponse):
+    """Streamed export holding one of the process's export slots until it ends"""
+
+    def __init__(self, content: AsyncIterator[bytes], **kwargs: Any):
+        if not _export_slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many exports running, try again shortly",
+                headers={"Retry-After": "30"}
+            )
+        super().__init__(content, **kwargs)
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Starlette drops the stream on disconnect without closing it
+            await self.body_iterator.aclose()
+            _export_slots.release()
+
+
+def export_query(filters: List[Any]) -> Select:
+    """Export columns for the bills matching the filters, newest first"""
+    query = select(*COLUMNS).join(Category, Category.id == Bill.category_id)
+    for condition in filters:
+        query = query.where(condition)
+    return query.order_by(Bill.created_at.desc(), Bill.id.desc())
@@ -0,0 +1,154 @@
+"""
+Document Text Extraction
+
+Page-parallel text extraction for bill files. PDF pages are parsed with
+pdfplumber across a process pool and only sparse pages (fewer than
+OCR_MIN_CHARS characters) go through Tesseract. Pages are yielded as soon
+as they finish, so field extraction can start on text-rich pages while a
+scanned page is still being OCR'd.
+
+PAGE_WORKERS (default: one per CPU) bounds the pages parsed at once on
+the machine. The local job executor hands its workers one shared
+semaphore with that many slots: a job worker submits a page to its page
+pool only while it holds a slot, waiting for one only when none of its
+own pages are in flight. A lone multi-page bill spreads over every CPU;
+under load, jobs split the slots instead of oversubscribing. Celery
+workers don't share slots, so there set PAGE_WORKERS to each worker's
+share of the node. Single-page PDFs (and PAGE_WORKERS=1) are parsed in
+the job worker from the one open file.
+"""
+
+import multiprocessing
+import os
+import time
+import threading
+from multiprocessing import util
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Set
+
+PAGE_WORKERS = int(os.getenv("PAGE_WORKERS", os.cpu_count() or 2))
+OCR_MIN_CHARS = 100  # Pages with less extracted text are OCR'd
+OCR_RESOLUTION = int(os.getenv("OCR_RESOLUTION", 300))
+
+_page_pool: Optional[ProcessPoolExecutor] = None
+# Machine-wide page slots; replaced by the job executor's shared semaphore
+_page_slots = threading.BoundedSemaphore(PAGE_WORKERS)
+
+
+@dataclass
+class PageText:
+    """Text of one document page"""
+    number: int  # 1-based
+    page_count: int
+    text: str
+    ocr: bool
+    seconds: float = 0.0  # Parse (and OCR) time
+
+
+def _ocr_image(image) -> str:
+    import pytesseract
+    return pytesseract.image_to_string(image)
+
+
+def _page_text(page, number: int, page_count: int, started: float) -> PageText:
+    """Text of an open PDF page, OCR'ing it only when the text layer is sparse"""
+    text = page.extract_text() or ""
+    if len(text.strip()) >= OCR_MIN_CHARS:
+        return PageText(number=number, page_count=page_count, text=text, ocr=False,
+                        seconds=time.perf_counter() - started)
+    image = page.to_image(resolution=OCR_RESOLUTION).original
+    return PageText(number=number, page_count=page_count, text=_ocr_image(image), ocr=True,
+                    seconds=time.perf_counter() - started)
+
+
+def extract_pdf_page(file_path: str, number: int, page_count: int) -> PageText:
+    """Parse one PDF page (runs in the page pool)"""
+    import pdfplumber
+    started = time.perf_counter()
+    with pdfplumber.open(file_path, pages=[number]) as pdf:
+        return _page_text(pdf.pages[0], number, page_count, started)
+
+
+def extract_image(file_path: str) -> PageText:
+    """OCR a single-page image upload"""
+    from PIL import Image
+    started = time.perf_counter()
+    with Image.open(file_path) as image:
+        text = _ocr_image(image.convert("RGB"))
+    return PageText(number=1, page_count=1, text=text, ocr=True, seconds=time.perf_counter() - started)
+
+
+def set_page_slots(slots) -> None:
+    """Share page slots with the other job workers (job worker initializer)"""
+    global _page_slots
+    _page_slots = slots
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    global _page_pool
+    if _page_pool is None:
+        _page_pool = ProcessPoolExecutor(
+            # Processes start on demand; the slots bound how many are busy
+            max_workers=PAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        # Job workers join their child processes before atexit hooks run, so
+        # shut the pool down from a multiprocessing finalizer instead; it must
+        # run before the finalizers (priority 10) that stop its queue feeder
+        util.Finalize(None, _page_pool.shutdown, exitpriority=20)
+    return _page_pool
+
+
+def iter_page_text(file_path: str, file_type: str) -> Iterator[PageText]:
+    """Yield document pages in completion order (not page order)"""
+    if file_type != "pdf":
+        yield extract_image(file_path)
+        return
+
+    import pdfplumber
+    started = time.perf_counter()
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+        serial = page_count == 1 or PAGE_WORKERS == 1
+        if serial:
+            for number, page in enumerate(pdf.pages, start=1):
+                yield _page_text(page, number, page_count, started)
+                page.flush_cache()
+                started = time.perf_counter()
+    if not serial:
+        yield from _parallel_pages(file_path, page_count)
+
+
+def _parallel_pages(file_path: str, page_count: int) -> Iterator[PageText]:
+    pool = _get_page_pool()
+    slots = _page_slots
+    next_number = 1
+    pending: Set[Future] = set()
+    try:
+        while next_number <= page_count or pending:
+            # Start a page per free slot; with nothing in flight, wait for one
+            while next_number <= page_count and slots.acquire(not pending):
+                try:
+                    future = pool.submit(extract_pdf_page, file_path, next_number, page_count)
+                except BaseException:
+                    slots.release()
+                    raise
+                # Also runs when the page is cancelled
+                future.add_done_callback(lambda _: slots.release())
+                pending.add(future)
+                next_number += 1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        # Abandoned early (error or consumer stopped): drop pages not yet started
+        for future in pending:
+            future.cancel()
+
+
+def read_document_text(file_path: str, file_type: str) -> str:
+    """Full document text in page order"""
+    pages: List[PageText] = sorted(iter_page_text(file_path, file_type), key=lambda page: page.number)
+    return "\n\n".join(page.text for page in pages)
+
@@ -0,0 +1,246 @@
+"""
+Heuristic Field Extraction
+
+Compiled, vendor-aware regex extraction for the PRD's "Heuristic Field Grab"
+step. Every field comes back with a confidence; when all required fields
+clear HEURISTIC_THRESHOLD the pipeline writes the bill directly and skips
+both gpt-4o calls. Recurring bills from vendors already in the database
+usually qualify, since their name, category and account number are known.
+A known vendor name alone is not enough: it must head the bill and one of
+the vendor's account numbers must appear, so a short or generic name
+mentioned in another vendor's bill can't skip the model.
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Pattern, Set, Tuple
+
+from sqlmodel import Session, func, select
+
+from .models import Bill, Category
+
+HEURISTIC_THRESHOLD = float(os.getenv("HEURISTIC_THRESHOLD", 0.95))
+REQUIRED_FIELDS = ("vendor", "category", "amount_due")
+PROFILE_TTL_SECONDS = 60
+
+# Confidence levels
+KNOWN_VALUE_CONFIDENCE = 0.99   # Value already on file for this vendor
+LABELED_CONFIDENCE = 0.96       # Single unambiguous labeled value
+NAME_ONLY_CONFIDENCE = 0.8      # Known vendor name without its account number or outside the header
+AMBIGUOUS_CONFIDENCE = 0.6      # Several conflicting labeled values
+
+VENDOR_HEADER_CHARS = 500  # Start of the first page, where a bill names its issuer
+
+MONEY = r"\$?\s?(\d{1,3}(?:,\d{3})+\.\d{2}|\d+\.\d{2})"
+DATE = r"(\d{1,2}/\d{1,2}/\d{2,4}|\d{4}-\d{2}-\d{2}|[A-Za-z]{3,9}\.? \d{1,2},? \d{4})"
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%b %d %Y")
+
+MONEY_PATTERN = re.compile(r"\$\s?(\d{1,3}(?:,\d{3})+\.\d{2}|\d+\.\d{2})")
+DATE_PATTERN = re.compile(r"\b" + DATE + r"\b")
+
+LABELED_PATTERNS: Dict[str, Pattern] = {
+    "amount_due": re.compile(
+        r"(?:amount\s+due|total\s+due|balance\s+due|amount\s+to\s+pay)\s*[:\-]?\s*" + MONEY, re.I
+    ),
+    "due_date": re.compile(
+        r"(?:payment\s+due\s+date|due\s+date|payment\s+due|pay\s+by|due\s+by)\s*[:\-]?\s*" + DATE, re.I
+    ),
+    "account_number": re.compile(
+        r"(?:account\s+(?:number|no\.?|#)|acct\.?\s+(?:number|no\.?|#))\s*[:\-]?\s*([A-Z0-9][A-Z0-9\-]{3,29})", re.I
+    ),
+    "invoice_number": re.compile(
+        r"(?:invoice|bill|statement)\s+(?:number|no\.?|#)\s*[:\-]?\s*([A-Z0-9][A-Z0-9\-]{2,29})", re.I
+    ),
+    "tax_total": re.compile(r"(?:total\s+taxes|taxes|tax)\s*[:\-]?\s*" + MONEY, re.I),
+}
+BILLING_PERIOD_PATTERN = re.compile(
+    r"(?:billing|service|statement)\s+period\s*[:\-]?\s*(?:from\s+)?"
+    + DATE + r"\s*(?:-|–|to|through)\s*" + DATE,
+    re.I,
+)
+# Any line that may carry a bill field; pages without one are left out of prompts
+FIELD_CUE_PATTERN = re.compile(
+    r"\b(?:amount|total|balance|due|pay\s+by|account|acct|invoice|statement|billing|service\s+period"
+    r"|usage|tax(?:es)?|kwh|therms?|ccf|gallons|minutes|gb)\b",
+    re.I,
+)
+
+
+# ===== VALUE PARSING =====
+
+def parse_date(value: Any) -> Optional[date]:
+    """Parse a date in any supported bill format"""
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_money(value: Any) -> Optional[Decimal]:
+    """Parse a currency amount to cent precision"""
+    if value is None or value == "":
+        return None
+    try:
+        return Decimal(str(value).replace("$", "").replace(",", "").strip()).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None
+
+
+def grab_heuristic_fields(text: str, seed: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+    """Regex money and date candidates used to seed the model prompt.
+
+    Pass the previous result as `seed` to accumulate candidates page by page.
+    """
+    seed = seed or {"amounts": [], "dates": []}
+    amounts = list(dict.fromkeys(seed["amounts"] + MONEY_PATTERN.findall(text)))
+    dates = list(dict.fromkeys(seed["dates"] + DATE_PATTERN.findall(text)))
+    return {"amounts": amounts[:20], "dates": dates[:20]}
+
+
+# ===== VENDOR PROFILES =====
+
+@dataclass
+class VendorProfile:
+    """What we already know about a vendor from its past bills"""
+    vendor: str
+    category: str
+    account_numbers: Set[str] = field(default_factory=set)
+
+
+class VendorMatcher:
+    """Finds known vendors in bill text with one compiled pattern"""
+
+    def __init__(self, profiles: List[VendorProfile]):
+        self.profiles = {profile.vendor.lower(): profile for profile in profiles}
+        names = sorted(self.profiles, key=len, reverse=True)
+        self.pattern = re.compile(
+            r"\b(" + "|".join(re.escape(name) for name in names) + r")\b", re.I
+        ) if names else None
+
+    def match(self, text: str) -> Tuple[Optional[VendorProfile], float]:
+        """The known vendor named in the text; confident only when the name
+        heads the bill and one of its account numbers appears too"""
+        if not self.pattern:
+            return None, 0.0
+        found = list(dict.fromkeys(m.group(1).lower() for m in self.pattern.finditer(text)))
+        if not found:
+            return None, 0.0
+        profile = self.profiles[found[0]]
+        if len(found) > 1:
+            return profile, AMBIGUOUS_CONFIDENCE
+        in_header = self.pattern.search(text[:VENDOR_HEADER_CHARS]) is not None
+        known_account = any(account in text for account in profile.account_numbers)
+        if in_header and known_account:
+            return profile, KNOWN_VALUE_CONFIDENCE
+        return profile, NAME_ONLY_CONFIDENCE if in_header or known_account else AMBIGUOUS_CONFIDENCE
+
+
+_matcher_cache: Dict[str, Any] = {"matcher": None, "loaded_at": 0.0}
+
+
+def load_vendor_profiles(session: Session) -> List[VendorProfile]:
+    """Build vendor profiles from reviewed bills (latest category wins)"""
+    rows = session.exec(
+        select(Bill.vendor, Bill.account_number, Category.name, func.max(Bill.id))
+        .join(Category)
+        .where(Bill.needs_review == False)
+        .group_by(Bill.vendor, Bill.account_number, Category.name)
+        .order_by(func.max(Bill.id))
+    ).all()
+
+    profiles: Dict[str, VendorProfile] = {}
+    for vendor, account_number, category, _ in rows:
+        profile = profiles.setdefault(vendor.lower(), VendorProfile(vendor=vendor, category=category))
+        profile.category = category
+        if account_number:
+            profile.account_numbers.add(account_number)
+    return list(profiles.values())
+
+
+def get_vendor_matcher(session: Session) -> VendorMatcher:
+    """Vendor matcher rebuilt at most every PROFILE_TTL_SECONDS per process"""
+    now = time.monotonic()
+    if _matcher_cache["matcher"] is None or now - _matcher_cache["loaded_at"] > PROFILE_TTL_SECONDS:
+        _matcher_cache["matcher"] = VendorMatcher(load_vendor_profiles(session))
+        _matcher_cache["loaded_at"] = now
+    return _matcher_cache["matcher"]
+
+
+# ===== FIELD EXTRACTION =====
+
+@dataclass
+class HeuristicResult:
+    """Extracted, normalized fields with per-field confidence"""
+    fields: Dict[str, Any] = field(default_factory=dict)
+    confidence: Dict[str, float] = field(default_factory=dict)
+
+    def set(self, name: str, value: Any, confidence: float) -> None:
+        if value is not None:
+            self.fields[name] = value
+            self.confidence[name] = confidence
+
+    def is_confident(self, threshold: float = HEURISTIC_THRESHOLD) -> bool:
+        """True when every required field clears the threshold"""
+        return all(self.confidence.get(name, 0.0) >= threshold for name in REQUIRED_FIELDS)
+
+    def accepted(self, threshold: float = HEURISTIC_THRESHOLD) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """Fields that clear the threshold; weaker optional fields are dropped"""
+        names = [name for name, score in self.confidence.items() if score >= threshold]
+        return {name: self.fields[name] for name in names}, {name: self.confidence[name] for name in names}
+
+
+def _labeled_value(text: str, name: str, parse) -> Tuple[Any, float]:
+    values = [parse(value) for value in LABELED_PATTERNS[name].findall(text)]
+    values = list(dict.fromkeys(value for value in values if value is not None))
+    if not values:
+        return None, 0.0
+    return values[0], LABELED_CONFIDENCE if len(values) == 1 else AMBIGUOUS_CONFIDENCE
+
+
+def extract_fields(text: str, matcher: Optional[VendorMatcher] = None) -> HeuristicResult:
+    """Extract bill fields from raw text with per-field confidence"""
+    result = HeuristicResult()
+
+    profile, vendor_confidence = matcher.match(text) if matcher else (None, 0.0)
+    if profile:
+        result.set("vendor", profile.vendor, vendor_confidence)
+        result.set("category", profile.category, vendor_confidence)
+
+    for name, parse in (
+        ("amount_due", parse_money),
+        ("tax_total", parse_money),
+        ("due_date", parse_date),
+        ("invoice_number", str.strip),
+    ):
+        value, confidence = _labeled_value(text, name, parse)
+        result.set(name, value, confidence)
+
+    # A known account number appearing verbatim beats the label pattern
+    known_accounts = [acct for acct in (profile.account_numbers if profile else ()) if acct in text]
+    if len(known_accounts) == 1:
+        result.set("account_number", known_accounts[0], KNOWN_VALUE_CONFIDENCE)
+    else:
+        value, confidence = _labeled_value(text, "account_number", str.strip)
+        result.set("account_number", value, confidence)
+
+    periods = {
+        (parse_date(start), parse_date(end))
+        for start, end in BILLING_PERIOD_PATTERN.findall(text)
+    }
+    periods = [(start, end) for start, end in periods if start and end and start <= end]
+    if periods:
+        confidence = LABELED_CONFIDENCE if len(periods) == 1 else AMBIGUOUS_CONFIDENCE
+        result.set("billing_start", periods[0][0], confidence)
+        result.set("billing_end", periods[0][1], confidence)
+
+    return result
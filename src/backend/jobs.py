@@ -0,0 +1,564 @@
+"""
+Extraction Job Engine
+
+The `jobs` table doubles as the queue. Executors claim queued jobs
+atomically, run the extraction pipeline and record the outcome, so several
+API processes can share one database without running a job twice.
+
+- Retries: failed attempts are re-queued with exponential backoff, up to
+  MAX_JOB_ATTEMPTS (3 per PRD) before the job is marked failed.
+- Recovery: a claimed job holds a lease that a heartbeat thread in the
+  worker renews every JOB_LEASE_SECONDS / 3 while the job runs; jobs whose
+  lease expired (worker crash, restart) are re-queued.
+- Ownership: each claim increments `attempts`, which fences the worker
+  holding it. Completion, failure and lease renewal only apply while the
+  job is still running that attempt, so a worker whose job was recovered
+  and claimed again drops its result instead of writing a second bill.
+- Cleanup: the dispatcher sweeps stored files that no bill references
+  (see storage.sweep_blobs) every BLOB_SWEEP_INTERVAL_SECONDS.
+- Backpressure: uploads are refused while the queue is deeper than
+  MAX_QUEUE_DEPTH.
+- Events: status changes and per-stage/per-page progress are published
+  to the job event hub (events.py) for WebSocket clients.
+- Batching: once BATCH_QUEUE_DEPTH jobs are waiting, the local executor
+  hands workers groups of LLM_BATCH_SIZE jobs whose small bills share one
+  model call.
+- Imports: the extraction pipeline (parsers, OCR, LLM client) is imported
+  by worker processes only, keeping it out of API start-up.
+
+Executors (JOB_EXECUTOR):
+- local (default): dispatcher thread feeding a bounded process pool
+- celery: optional, requires celery and REDIS_URL (see celery_app.py)
+"""
+
+import multiprocessing
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlmodel import Session, func, select, update
+
+from .database import engine
+from .events import init_worker, publish_job_event, worker_queue
+from .models import Bill, BillFile, Job, JobStatus
+from .storage import StoredUpload, sweep_blobs
+
+JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "local")
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 2))
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", 100))
+MAX_JOB_ATTEMPTS = int(os.getenv("MAX_JOB_ATTEMPTS", 3))
+RETRY_BASE_SECONDS = float(os.getenv("RETRY_BASE_SECONDS", 2))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 60))
+DISPATCH_INTERVAL_SECONDS = float(os.getenv("DISPATCH_INTERVAL_SECONDS", 1))
+BLOB_SWEEP_INTERVAL_SECONDS = float(os.getenv("BLOB_SWEEP_INTERVAL_SECONDS", 600))
+BATCH_QUEUE_DEPTH = int(os.getenv("BATCH_QUEUE_DEPTH", 20))
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", 4))
+
+PENDING_STATUSES = (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+
+
+# ===== QUEUE OPERATIONS =====
+
+def queue_depth(session: Session) -> int:
+    """Number of jobs waiting for or holding a worker"""
+    return session.exec(
+        select(func.count(Job.id)).where(Job.status.in_(PENDING_STATUSES))
+    ).one()
+
+
+def find_pending_job(session: Session, sha256: str) -> Optional[Job]:
+    """Get a queued or running job for the same file contents"""
+    return session.exec(
+        select(Job).where(Job.file_sha256 == sha256, Job.status.in_(PENDING_STATUSES))
+    ).first()
+
+
+def create_job(session: Session, upload: StoredUpload, bill_file: BillFile, user_id: Optional[str] = None) -> Job:
+    """Queue an extraction job for a stored file"""
+    job = Job(
+        id=upload.upload_id,
+        file_sha256=bill_file.sha256,
+        file_path=bill_file.file_path,
+        filename=upload.filename[:255],
+        user_id=user_id,
+    )
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    publish_job_event(job.id, user_id, "status", status=job.status, filename=job.filename)
+    return job
+
+
+def _claim(session: Session, job_id: str, now: datetime) -> bool:
+    # Jobs backing off after a failure wait until next_attempt_at
+    result = session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == JobStatus.QUEUED.value, Job.next_attempt_at <= now)
+        .values(
+            status=JobStatus.RUNNING.value,
+            attempts=Job.attempts + 1,
+            lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS),
+            updated_at=now,
+        )
+    )
+    return result.rowcount == 1
+
+
+def claim_jobs(limit: int) -> List[str]:
+    """Atomically claim up to `limit` due jobs, oldest first"""
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        candidates = session.exec(
+            select(Job.id)
+            .where(Job.status == JobStatus.QUEUED.value, Job.next_attempt_at <= now)
+            .order_by(Job.next_attempt_at)
+            .limit(limit)
+        ).all()
+        claimed = [job_id for job_id in candidates if _claim(session, job_id, now)]
+        session.commit()
+    return claimed
+
+
+def claim_job(job_id: str) -> bool:
+    """Atomically claim a single queued job, if it is due"""
+    with Session(engine) as session:
+        claimed = _claim(session, job_id, datetime.utcnow())
+        session.commit()
+    return claimed
+
+
+def _owned(job_id: str, attempt: int):
+    """Condition: the job is still running the given attempt"""
+    return (Job.id == job_id) & (Job.status == JobStatus.RUNNING.value) & (Job.attempts == attempt)
+
+
+def renew_lease(job_id: str, attempt: int) -> bool:
+    """Extend a running job's lease; False once the attempt lost the job"""
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        result = session.execute(
+            update(Job)
+            .where(_owned(job_id, attempt))
+            .values(lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS), updated_at=now)
+        )
+        session.commit()
+    return result.rowcount == 1
+
+
+@contextmanager
+def heartbeat(claims: Iterable[Tuple[str, int]]) -> Iterator[None]:
+    """Renew the leases of claimed (job id, attempt) pairs while the block runs.
+
+    Stages such as the LLM call (timeouts, retries, budget waits) can
+    outlast a lease, so renewal runs on its own thread, not at stage
+    boundaries.
+    """
+    claims = list(claims)
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(JOB_LEASE_SECONDS / 3):
+            for job_id, attempt in claims:
+                try:
+                    renew_lease(job_id, attempt)
+                except Exception as exc:
+                    print(f"⚠️ Lease renewal failed for job {job_id}: {exc}")
+
+    thread = threading.Thread(target=beat, name="job-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def requeue_expired_jobs() -> List[str]:
+    """Re-queue running jobs whose worker stopped renewing the lease"""
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        expired = session.exec(
+            select(Job.id, Job.user_id).where(Job.status == JobStatus.RUNNING.value, Job.lease_expires_at < now)
+        ).all()
+        requeued = []
+        for job_id, user_id in expired:
+            result = session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.RUNNING.value, Job.lease_expires_at < now)
+                .values(status=JobStatus.QUEUED.value, lease_expires_at=None, next_attempt_at=now, updated_at=now)
+            )
+            if result.rowcount == 1:
+                requeued.append((job_id, user_id))
+        session.commit()
+    for job_id, user_id in requeued:
+        publish_job_event(job_id, user_id, "status", status=JobStatus.QUEUED.value, recovered=True)
+    requeued = [job_id for job_id, _ in requeued]
+    if requeued:
+        print(f"♻️ Recovered {len(requeued)} interrupted jobs")
+    return requeued
+
+
+def detach_bill(session: Session, bill_id: int) -> None:
+    """Unlink jobs from a bill being deleted; they keep their history (caller commits)"""
+    session.execute(update(Job).where(Job.bill_id == bill_id).values(bill_id=None))
+
+
+def queued_jobs() -> List[Tuple[str, datetime]]:
+    """All jobs currently waiting in the queue, with when each is due"""
+    with Session(engine) as session:
+        return list(session.exec(
+            select(Job.id, Job.next_attempt_at).where(Job.status == JobStatus.QUEUED.value)
+        ).all())
+
+
+def backoff_until(job_id: str) -> Optional[datetime]:
+    """When a queued job backing off after a failure is due; None if it is
+    due already or no longer queued"""
+    with Session(engine) as session:
+        return session.exec(
+            select(Job.next_attempt_at)
+            .where(Job.id == job_id, Job.status == JobStatus.QUEUED.value, Job.next_attempt_at > datetime.utcnow())
+        ).first()
+
+
+def _taken_over(session: Session, job_id: str, attempt: int) -> None:
+    session.rollback()
+    print(f"⚠️ Job {job_id} attempt {attempt} lost its lease to another worker; result dropped")
+
+
+def record_failure(session: Session, job_id: str, user_id: Optional[str], attempt: int, error: str) -> Optional[datetime]:
+    """Re-queue a failed attempt with backoff, or fail the job for good.
+
+    Returns when the next attempt is due, or None if the job failed or
+    another worker has taken it over (the failure is then dropped).
+    """
+    now = datetime.utcnow()
+    error = error[:1000]
+    values = {"error": error, "lease_expires_at": None, "updated_at": now}
+    if attempt >= MAX_JOB_ATTEMPTS:
+        values["status"] = JobStatus.FAILED.value
+        retry_at = None
+    else:
+        values["status"] = JobStatus.QUEUED.value
+        retry_at = now + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+        values["next_attempt_at"] = retry_at
+    result = session.execute(update(Job).where(_owned(job_id, attempt)).values(**values))
+    if result.rowcount != 1:
+        _taken_over(session, job_id, attempt)
+        return None
+    session.commit()
+    publish_job_event(
+        job_id, user_id, "status",
+        status=values["status"], attempts=attempt, error=error, retry_at=retry_at,
+    )
+    return retry_at
+
+
+def _describe(exc: Exception) -> str:
+    return f"{type(exc).__name__}: {exc}"
+
+
+class _Claim:
+    """A job as claimed by this worker; `attempt` fences its writes"""
+
+    def __init__(self, job: Job):
+        self.job_id = job.id
+        self.user_id = job.user_id
+        self.attempt = job.attempts
+
+    def fail(self, session: Session, error: str) -> Optional[datetime]:
+        return record_failure(session, self.job_id, self.user_id, self.attempt, error)
+
+    def complete(self, session: Session, bill: Bill) -> None:
+        """Commit the bill and the job's outcome, unless the job was taken over"""
+        bill_id = bill.id
+        status = (JobStatus.NEEDS_REVIEW if bill.needs_review else JobStatus.DONE).value
+        result = session.execute(
+            update(Job)
+            .where(_owned(self.job_id, self.attempt))
+            .values(status=status, bill_id=bill_id, error=None, lease_expires_at=None, updated_at=datetime.utcnow())
+        )
+        if result.rowcount != 1:
+            # Rolls back the bill with it; the worker holding the job writes its own
+            _taken_over(session, self.job_id, self.attempt)
+            return
+        session.commit()
+        publish_job_event(self.job_id, self.user_id, "status", status=status, bill_id=bill_id)
+
+    def progress(self, stage: str, **detail) -> None:
+        """Progress callback: publish the stage (the heartbeat keeps the lease)"""
+        publish_job_event(self.job_id, self.user_id, "progress", stage=stage, **detail)
+
+
+def _start(job: Job) -> _Claim:
+    publish_job_event(job.id, job.user_id, "status", status=job.status, attempts=job.attempts)
+    return _Claim(job)
+
+
+def run_job(job_id: str) -> Optional[datetime]:
+    """Run a claimed job to completion (executes in a worker process).
+
+    Returns when the job should be retried, or None when it is finished.
+    """
+    from .pipeline import process_job
+
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        if not job or job.status != JobStatus.RUNNING.value:
+            return None
+        claim = _start(job)
+
+        with heartbeat([(claim.job_id, claim.attempt)]):
+            try:
+                bill = process_job(session, job, progress=claim.progress)
+            except Exception as exc:
+                session.rollback()
+                return claim.fail(session, _describe(exc))
+            claim.complete(session, bill)
+    return None
+
+
+def run_batch(job_ids: List[str]) -> None:
+    """Run several claimed jobs together (executes in a worker process).
+
+    Each job is parsed on its own; the ones that still need the model are
+    extracted together so small bills share one call. Jobs succeed or fail
+    individually.
+    """
+    with Session(engine) as session:
+        jobs = [job for job in (session.get(Job, job_id) for job_id in job_ids)
+                if job and job.status == JobStatus.RUNNING.value]
+        claims = {job.id: _start(job) for job in jobs}
+        with heartbeat((claim.job_id, claim.attempt) for claim in claims.values()):
+            _run_batch(session, jobs, claims)
+
+
+def _run_batch(session: Session, jobs: List[Job], claims: Dict[str, _Claim]) -> None:
+    from .pipeline import extract_documents, persist_extraction, persist_heuristic, read_document
+
+    pending = []
+    for job in jobs:
+        claim = claims[job.id]
+        try:
+            document = read_document(session, job, progress=claim.progress)
+            if document.heuristic.is_confident():
+                claim.complete(session, persist_heuristic(session, job, document))
+                continue
+        except Exception as exc:
+            session.rollback()
+            claim.fail(session, _describe(exc))
+            continue
+        pending.append((job, document))
+    if not pending:
+        return
+
+    for job, _ in pending:
+        claims[job.id].progress("llm", batch_size=len(pending))
+    try:
+        extractions = extract_documents(session, pending)
+    except Exception as exc:
+        session.rollback()
+        for job, _ in pending:
+            claims[job.id].fail(session, _describe(exc))
+        return
+
+    for job, _ in pending:
+        claim = claims[job.id]
+        try:
+            claim.progress("persist")
+            bill = persist_extraction(session, job, extractions[job.id])
+        except Exception as exc:
+            session.rollback()
+            claim.fail(session, _describe(exc))
+            continue
+        claim.complete(session, bill)
+
+
+def _init_worker(queue, page_slots) -> None:
+    """Process pool initializer: route events, share the page slots, load the
+    pipeline before the first job"""
+    from .extraction import set_page_slots
+
+    init_worker(queue)
+    set_page_slots(page_slots)
+    from . import pipeline  # noqa: F401
+
+
+def fail_attempt(job_id: str, error: str) -> None:
+    """Record an attempt that died without reporting back (e.g. worker crash)"""
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        if job and job.status == JobStatus.RUNNING.value:
+            record_failure(session, job.id, job.user_id, job.attempts, error)
+
+
+# ===== EXECUTORS =====
+
+class JobExecutor(ABC):
+    """Base executor: a background thread that recovers and dispatches jobs"""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        # Expired leases are recovered by the first tick, off the start-up path
+        self._thread = threading.Thread(target=self._loop, name="job-dispatcher", daemon=True)
+        self._thread.start()
+
+    @abstractmethod
+    def submit(self, job_id: str) -> None:
+        """Hand a queued job to the executor"""
+
+    def shutdown(self) -> None:
+        self._stopping = True
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+    def _loop(self) -> None:
+        next_sweep = time.monotonic()
+        while not self._stopping:
+            try:
+                self._tick()
+            except Exception as exc:
+                print(f"⚠️ Job dispatch failed: {exc}")
+            if time.monotonic() >= next_sweep:
+                # Files whose jobs never produced a bill
+                next_sweep = time.monotonic() + BLOB_SWEEP_INTERVAL_SECONDS
+                try:
+                    sweep_blobs()
+                except Exception as exc:
+                    print(f"⚠️ Bill file sweep failed: {exc}")
+            self._wake.wait(DISPATCH_INTERVAL_SECONDS)
+            self._wake.clear()
+
+    @abstractmethod
+    def _tick(self) -> None:
+        """One dispatcher pass: recover expired leases, dispatch due jobs"""
+
+
+class LocalExecutor(JobExecutor):
+    """Runs jobs on a local process pool, at most `workers` at a time"""
+
+    def __init__(self, workers: int = EXTRACTION_WORKERS):
+        super().__init__()
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[Future, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self._pool = self._create_pool()
+        super().start()
+
+    def submit(self, job_id: str) -> None:
+        # The job is already queued in the database; wake the dispatcher
+        self._wake.set()
+
+    def shutdown(self) -> None:
+        super().shutdown()
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        from .extraction import PAGE_WORKERS
+
+        # Spawn keeps workers free of the parent's threads and DB connections
+        context = multiprocessing.get_context("spawn")
+        # One set of page slots for every job worker (see extraction.py); new
+        # with each pool, so slots held by a crashed worker aren't lost
+        self._page_slots = context.BoundedSemaphore(PAGE_WORKERS)
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(worker_queue(), self._page_slots),
+        )
+
+    def _tick(self) -> None:
+        requeue_expired_jobs()
+        with self._lock:
+            free_slots = self.workers - len(self._inflight)
+        if free_slots <= 0 or self._stopping:
+            return
+
+        # A deep queue is worked off in groups that share model calls
+        with Session(engine) as session:
+            batch_size = LLM_BATCH_SIZE if queue_depth(session) >= BATCH_QUEUE_DEPTH else 1
+        claimed = claim_jobs(free_slots * batch_size)
+
+        for start in range(0, len(claimed), batch_size):
+            job_ids = claimed[start:start + batch_size]
+            try:
+                if len(job_ids) == 1:
+                    future = self._pool.submit(run_job, job_ids[0])
+                else:
+                    future = self._pool.submit(run_batch, job_ids)
+            except RuntimeError:
+                # Pool broken by a crashed worker; replace it and retry later
+                self._pool = self._create_pool()
+                for job_id in job_ids:
+                    fail_attempt(job_id, "Worker pool restarted")
+                continue
+            with self._lock:
+                self._inflight[future] = job_ids
+            future.add_done_callback(self._on_done)
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            job_ids = self._inflight.pop(future)
+        if not future.cancelled() and future.exception():
+            for job_id in job_ids:
+                fail_attempt(job_id, f"Worker crashed: {future.exception()}")
+        self._wake.set()
+
+
+class CeleryExecutor(JobExecutor):
+    """Sends jobs to Celery workers through Redis"""
+
+    def start(self) -> None:
+        from .celery_app import extract_bill
+
+        requeue_expired_jobs()
+        # Jobs in backoff keep their delay across restarts
+        for job_id, due_at in queued_jobs():
+            extract_bill.apply_async((job_id,), eta=due_at)
+        super().start()
+
+    def submit(self, job_id: str) -> None:
+        from .celery_app import extract_bill
+        extract_bill.delay(job_id)
+
+    def _tick(self) -> None:
+        for job_id in requeue_expired_jobs():
+            self.submit(job_id)
+
+
+_executor: Optional[JobExecutor] = None
+
+
+def get_executor() -> JobExecutor:
+    """Get the configured executor (created on first use)"""
+    global _executor
+    if _executor is None:
+        _executor = CeleryExecutor() if JOB_EXECUTOR == "celery" else LocalExecutor()
+    return _executor
+
+
+def start_executor() -> None:
+    get_executor().start()
+    print(f"✅ Job executor started ({JOB_EXECUTOR})")
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
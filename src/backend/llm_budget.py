@@ -0,0 +1,92 @@
+"""
+Shared LLM Token Budget
+
+Per-minute token bucket kept in the `llm_token_buckets` table, so every
+extraction worker process draws on one LLM_TOKENS_PER_MINUTE budget
+instead of each spending the full amount against the provider-wide limit.
+The pipeline's LLM client (llm_client.chat_sync) uses it in place of the
+in-memory llm_client.TokenBudget.
+
+Each operation is a single UPDATE that first refills the bucket for the
+time since it was last touched, so no process holds a lock while it
+waits. Database calls run in a thread, off the client's event loop.
+Refills use wall-clock time, so workers on several nodes need synced clocks.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, update
+
+from .database import engine
+from .llm_client import TokenBudget
+from .models import LLMTokenBucket
+
+
+def _at_most(value, limit):
+    return case((value > limit, limit), else_=value)
+
+
+class SharedTokenBudget(TokenBudget):
+    """Token bucket in the database, refilled continuously at tokens_per_minute"""
+
+    def __init__(self, tokens_per_minute: int, name: str = "default"):
+        self.capacity = tokens_per_minute
+        self.name = name
+
+    def _level(self, now: float):
+        """SQL expression: tokens in the bucket at `now`"""
+        elapsed = case((LLMTokenBucket.updated_at < now, now - LLMTokenBucket.updated_at), else_=0)
+        return _at_most(LLMTokenBucket.tokens + elapsed * (self.capacity / 60), float(self.capacity))
+
+    def _update(self, values: Dict[str, Any], condition=None) -> bool:
+        """Update the bucket row (created full on first use); False if `condition` didn't hold"""
+        statement = update(LLMTokenBucket).where(LLMTokenBucket.name == self.name)
+        if condition is not None:
+            statement = statement.where(condition)
+        statement = statement.values(**values).execution_options(synchronize_session=False)
+        with Session(engine) as session:
+            if session.execute(statement).rowcount == 1:
+                session.commit()
+                return True
+            if session.get(LLMTokenBucket, self.name) is not None:
+                return False
+            session.add(LLMTokenBucket(name=self.name, tokens=self.capacity, updated_at=time.time()))
+            try:
+                session.commit()
+            except IntegrityError:
+                session.rollback()  # Another process created it first
+        return self._update(values, condition)
+
+    def _take(self, tokens: int) -> Optional[float]:
+        """Take tokens if the bucket holds them; otherwise the seconds until it will"""
+        now = time.time()
+        level = self._level(now)
+        if self._update({"tokens": level - tokens, "updated_at": now}, level >= tokens):
+            return None
+        with Session(engine) as session:
+            available = session.exec(select(level).where(LLMTokenBucket.name == self.name)).one()
+        return max(tokens - available, 1) * 60 / self.capacity
+
+    async def reserve(self, tokens: int) -> int:
+        tokens = min(tokens, self.capacity)
+        while True:
+            wait = await asyncio.to_thread(self._take, tokens)
+            if wait is None:
+                return tokens
+            await asyncio.sleep(wait)
+
+    async def settle(self, reserved: int, used: int) -> None:
+        """Return over-estimated tokens (or charge the shortfall)"""
+        tokens = _at_most(LLMTokenBucket.tokens + (reserved - used), float(self.capacity))
+        await asyncio.to_thread(self._update, {"tokens": tokens})
+
+    async def observe_remaining(self, remaining: Optional[int]) -> None:
+        if remaining is None:
+            return
+        now = time.time()
+        await asyncio.to_thread(self._update, {"tokens": _at_most(self._level(now), float(remaining)),
+                                               "updated_at": now})
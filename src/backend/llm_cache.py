@@ -0,0 +1,149 @@
+"""
+LLM Result Cache
+
+Persistent cache for gpt-4o responses keyed by (file content hash, model,
+prompt/schema version, call inputs). Retries, re-uploads and reprocess-all
+runs reuse earlier answers instead of paying for the same calls again.
+Entries live in the `llm_cache` table and are evicted least-recently-used
+once the cache grows past LLM_CACHE_MAX_MB.
+
+Hits, misses and evictions are counted in `llm_cache_stats`, in the same
+transaction as the lookup or eviction, so the totals cover every job
+worker; /metrics serves them as billsmith_llm_cache_events_total.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlmodel import Session, delete, func, select, update
+
+from .database import engine
+from .models import LLMCacheEntry, LLMCacheStat
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", 64))
+
+CACHE_COUNTERS = ("hits", "misses", "evictions")  # Rows of llm_cache_stats
+
+
+def cache_key(call: str, content_hash: str, model: str, prompt_version: str, inputs: Any = None) -> str:
+    """Stable key for one model call on one document"""
+    material = json.dumps(
+        [call, content_hash, model, prompt_version, inputs],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _count(session: Session, counter: str, amount: int = 1) -> None:
+    """Add to a shared cache counter (caller commits)"""
+    session.execute(
+        update(LLMCacheStat).where(LLMCacheStat.name == counter).values(value=LLMCacheStat.value + amount)
+    )
+
+
+def get_cached(key: str) -> Optional[Dict[str, Any]]:
+    """Get a cached response, marking it recently used"""
+    with Session(engine) as session:
+        entry = session.get(LLMCacheEntry, key)
+        if not entry:
+            _count(session, "misses")
+            session.commit()
+            return None
+        entry.hit_count += 1
+        entry.last_used_at = datetime.utcnow()
+        session.add(entry)
+        _count(session, "hits")
+        session.commit()
+        return json.loads(entry.response)
+
+
+def put_cached(key: str, call: str, model: str, response: Dict[str, Any]) -> None:
+    """Store a response and evict least-recently-used entries over the size cap"""
+    body = json.dumps(response, default=str)
+    with Session(engine) as session:
+        session.merge(LLMCacheEntry(
+            key=key,
+            call=call,
+            model=model,
+            response=body,
+            size_bytes=len(body),
+        ))
+        session.commit()
+        _evict(session)
+
+
+def _evict(session: Session) -> None:
+    max_bytes = int(LLM_CACHE_MAX_MB * 1024 * 1024)
+    total = session.exec(select(func.coalesce(func.sum(LLMCacheEntry.size_bytes), 0))).one()
+    if total <= max_bytes:
+        return
+
+    # Walk from least recently used until enough space is freed
+    stale_keys = []
+    for key, size in session.exec(
+        select(LLMCacheEntry.key, LLMCacheEntry.size_bytes).order_by(LLMCacheEntry.last_used_at)
+    ):
+        if total <= max_bytes:
+            break
+        stale_keys.append(key)
+        total -= size
+
+    session.execute(delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(stale_keys)))
+    _count(session, "evictions", len(stale_keys))
+    session.commit()
+
+
+def cached_call(
+    call: str,
+    content_hash: str,
+    model: str,
+    prompt_version: str,
+    inputs: Any,
+    compute: Callable[[], Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Return the cached response for a call, computing and storing it on a miss"""
+    if not LLM_CACHE_ENABLED:
+        return compute()
+
+    key = cache_key(call, content_hash, model, prompt_version, inputs)
+    cached = get_cached(key)
+    if cached is not None:
+        return cached
+
+    response = compute()
+    put_cached(key, call, model, response)
+    return response
+
+
+def cached_batch_call(
+    call: str,
+    content_hashes: List[str],
+    model: str,
+    prompt_version: str,
+    inputs: Any,
+    compute: Callable[[List[int]], List[Optional[Dict[str, Any]]]],
+) -> List[Optional[Dict[str, Any]]]:
+    """Per-document cache for a call that answers several documents at once.
+
+    `compute` receives the positions of the cache misses and returns their
+    responses in the same order (None where the model gave no answer, which
+    is not cached). Entries are shared with cached_call.
+    """
+    if not LLM_CACHE_ENABLED:
+        return compute(list(range(len(content_hashes))))
+
+    keys = [cache_key(call, content_hash, model, prompt_version, inputs) for content_hash in content_hashes]
+    responses = [get_cached(key) for key in keys]
+    missing = [position for position, response in enumerate(responses) if response is None]
+    if missing:
+        for position, response in zip(missing, compute(missing)):
+            responses[position] = response
+            if response is not None:
+                put_cached(keys[position], call, model, response)
+    return responses
+
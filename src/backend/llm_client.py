@@ -0,0 +1,283 @@
+"""
+Shared LLM Client
+
+Async OpenAI-compatible chat client shared by extraction workers and the
+model checker:
+
+- One pooled HTTP/1.1 keep-alive connection pool per process
+- Adaptive concurrency: the in-flight limit follows the provider's
+  x-ratelimit-remaining-requests header and halves on 429s
+- Per-minute token budget (token bucket), reconciled with reported usage
+  and x-ratelimit-remaining-tokens
+- The pipeline's client keeps that bucket in the database
+  (llm_budget.SharedTokenBudget), so every extraction worker draws on the
+  one LLM_TOKENS_PER_MINUTE budget; standalone clients (the model
+  checker) keep theirs in memory
+- Retries on 429/5xx/network errors with full-jitter exponential backoff,
+  honouring Retry-After
+- Request coalescing: identical concurrent requests share one HTTP call
+
+Synchronous callers (pipeline workers) use chat_sync(), which runs the
+process-wide client on a background event loop so connections and limits
+are shared across calls.
+
+LLM_MAX_CONCURRENCY is per process: with N extraction workers up to N
+times as many requests can be in flight. Each limiter still shrinks to the
+provider-wide x-ratelimit-remaining-requests it is sent.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 30000))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class LLMError(Exception):
+    """Request failed after retries or with a non-retryable status"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class ChatResult:
+    """Assistant reply with usage and timing"""
+    model: str
+    content: str
+    usage: Dict[str, int] = field(default_factory=dict)
+    latency: float = 0.0
+    attempts: int = 1
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse rate-limit durations such as '1s', '250ms' or '6m0s'"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parts = DURATION_PART.findall(value)
+        return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts) if parts else None
+
+
+def _header_int(headers: httpx.Headers, name: str) -> Optional[int]:
+    try:
+        return int(headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> int:
+    """Rough token estimate (4 characters per token) used for budgeting"""
+    prompt = sum(len(message.get("content", "")) for message in messages) // 4
+    return prompt + (max_tokens or 1000)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that shrinks on throttling and grows back on success"""
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self, remaining_requests: Optional[int]) -> None:
+        if remaining_requests is not None and remaining_requests < self.limit:
+            self.limit = max(1, remaining_requests)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+    def on_throttled(self) -> None:
+        self.limit = max(1, self.limit // 2)
+
+
+class TokenBudget:
+    """Token bucket refilled continuously at tokens_per_minute (this process only)"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    async def reserve(self, tokens: int) -> int:
+        tokens = min(tokens, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return tokens
+            await asyncio.sleep((tokens - self.tokens) * 60 / self.capacity)
+
+    async def settle(self, reserved: int, used: int) -> None:
+        """Return over-estimated tokens (or charge the shortfall)"""
+        self.tokens = min(self.capacity, self.tokens + reserved - used)
+
+    async def observe_remaining(self, remaining: Optional[int]) -> None:
+        if remaining is not None:
+            self._refill()
+            self.tokens = min(self.tokens, remaining)
+
+
+class LLMClient:
+    """Pooled, rate-limited chat completions client"""
+
+    def __init__(
+        self,
+        base_url: str = OPENAI_BASE_URL,
+        api_key: Optional[str] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_retries: int = LLM_MAX_RETRIES,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        budget: Optional[TokenBudget] = None,
+    ):
+        self.max_retries = max_retries
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self._http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.budget = budget or TokenBudget(tokens_per_minute)
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    async def chat(self, model: str, messages: List[Dict[str, str]], **params: Any) -> ChatResult:
+        """Chat completion; identical concurrent requests share one call"""
+        payload = {"model": model, "messages": messages, **params}
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        if key in self._pending:
+            return await asyncio.shield(self._pending[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await self._send(payload)
+            future.set_result(result)
+            return result
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark retrieved so lone callers don't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+    async def _send(self, payload: Dict[str, Any]) -> ChatResult:
+        reserved = await self.budget.reserve(estimate_tokens(payload["messages"], payload.get("max_tokens")))
+        used = reserved
+        started = time.perf_counter()
+        try:
+            for attempt in range(1, self.max_retries + 2):
+                retry_after = None
+                try:
+                    async with self.limiter:
+                        response = await self._http.post("/chat/completions", json=payload)
+                except httpx.TransportError as exc:
+                    error = LLMError(f"{type(exc).__name__}: {exc}")
+                else:
+                    await self.budget.observe_remaining(
+                        _header_int(response.headers, "x-ratelimit-remaining-tokens"))
+                    if response.status_code == 200:
+                        self.limiter.on_success(_header_int(response.headers, "x-ratelimit-remaining-requests"))
+                        body = response.json()
+                        used = body.get("usage", {}).get("total_tokens", reserved)
+                        return ChatResult(
+                            model=body.get("model", payload["model"]),
+                            content=body["choices"][0]["message"]["content"],
+                            usage=body.get("usage", {}),
+                            latency=time.perf_counter() - started,
+                            attempts=attempt,
+                        )
+                    error = LLMError(f"HTTP {response.status_code}: {response.text[:200]}", response.status_code)
+                    if response.status_code not in RETRYABLE_STATUS:
+                        raise error
+                    if response.status_code == 429:
+                        self.limiter.on_throttled()
+                    retry_after = _parse_duration(response.headers.get("retry-after")) or _parse_duration(
+                        response.headers.get("x-ratelimit-reset-requests")
+                    )
+
+                if attempt > self.max_retries:
+                    raise error
+                # Full jitter keeps retrying workers from stampeding together
+                backoff = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+                await asyncio.sleep(max(backoff, retry_after or 0))
+        finally:
+            await self.budget.settle(reserved, used)
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+
+# ===== SYNCHRONOUS ACCESS =====
+
+_client: Optional[LLMClient] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-client", daemon=True).start()
+    return _loop
+
+
+async def _get_client() -> LLMClient:
+    global _client
+    if _client is None:
+        from .llm_budget import SharedTokenBudget
+        _client = LLMClient(budget=SharedTokenBudget(LLM_TOKENS_PER_MINUTE))
+    return _client
+
+
+async def _chat(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> ChatResult:
+    client = await _get_client()
+    return await client.chat(model, messages, **params)
+
+
+def chat_sync(model: str, messages: List[Dict[str, str]], **params: Any) -> ChatResult:
+    """Blocking chat call through the process-wide client"""
+    future = asyncio.run_coroutine_threadsafe(_chat(model, messages, params), _background_loop())
+    return future.result()
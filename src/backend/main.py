@@ -5,14 +5,22 @@ Main application with routing, middleware, and configuration.
 """
 
 import os
+from anyio import to_thread
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 
-from .database import create_db_and_tables, init_default_categories
-from .routers import categories, bills, analytics
+from .database import DB_THREADPOOL_SIZE
+from .events import start_events, stop_events
+from .jobs import start_executor, shutdown_executor
+from . import metrics
+from .diagnostics import DiagnosticsMiddleware
+from .migrations import ensure_schema
+from .query_budget import QueryBudgetMiddleware
+from .search import detect_search_index
+from .routers import categories, bills, analytics, jobs, ws
 
 
 @asynccontextmanager
@@ -20,12 +28,19 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     print("🚀 Starting BillSmith...")
-    create_db_and_tables()
-    init_default_categories()
-    print("✅ Database initialized")
+    # Sync route handlers run here; one DB connection per thread at most
+    to_thread.current_default_thread_limiter().total_tokens = DB_THREADPOOL_SIZE
+    # Schema setup runs once per deployment, not per worker (see migrations.py)
+    ensure_schema()
+    detect_search_index()
+    print("✅ Database ready")
+    await start_events()
+    start_executor()
     yield
     # Shutdown
     print("👋 Shutting down BillSmith...")
+    shutdown_executor()
+    await stop_events()
 
 
 # Create FastAPI app
@@ -46,10 +61,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route query ceilings (see query_budget.py)
+app.add_middleware(QueryBudgetMiddleware)
+
+# Slow-query log and request profiling, both opt-in (see diagnostics.py)
+app.add_middleware(DiagnosticsMiddleware)
+
+# Latency and SQL metrics (see metrics.py); outermost, so it times everything
+app.add_middleware(metrics.MetricsMiddleware)
+
 # API routers
 app.include_router(categories.router, prefix="/api/v1", tags=["categories"])
 app.include_router(bills.router, prefix="/api/v1", tags=["bills"])
 app.include_router(analytics.router, prefix="/api/v1", tags=["analytics"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
+app.include_router(ws.router, tags=["websocket"])
 
 # Health check
 @app.get("/health")
@@ -57,6 +83,12 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "app": "BillSmith", "port": "4242"}
 
+# Prometheus scrape target
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Metrics in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Serve frontend static files
 if os.path.exists("src/frontend"):
     app.mount("/static", StaticFiles(directory="src/frontend"), name="static")
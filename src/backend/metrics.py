@@ -0,0 +1,309 @@
+"""
+Metrics
+
+Prometheus metrics served at /metrics (text exposition format):
+- billsmith_http_request_duration_seconds: latency histogram per route
+  template, method and status class, for every request
+- billsmith_sql_*: queries, rows and time per request, from engine hooks.
+  Rows are what the driver reports (rows written on SQLite; also rows
+  read on PostgreSQL)
+- billsmith_extraction_stage_seconds: parse, heuristic, llm and persist
+  durations per job, and billsmith_extraction_page_seconds per page (text
+  or OCR), from the job events workers publish (see events.py)
+- billsmith_jobs: jobs per status (queue depth), read when scraped
+- billsmith_llm_cache_events_total: LLM cache hits, misses and evictions
+  across all job workers, read from llm_cache_stats when scraped
+
+SQL accounting costs a few microseconds per statement; METRICS_SQL_SAMPLE_RATE
+(0-1, default 1) limits it to that share of requests on hot paths.
+billsmith_sql_sampled_requests_total counts the requests it covered.
+METRICS_ENABLED=false turns the middleware off.
+
+With EVENTS_BROKER=redis every API process sees every job's events, so
+read extraction metrics from one instance rather than summing them.
+"""
+
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, func
+from sqlmodel import Session, select
+
+from .database import engine, export_engine, read_engine
+from .models import Job, JobStatus, LLMCacheStat
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_SQL_SAMPLE_RATE = float(os.getenv("METRICS_SQL_SAMPLE_RATE", 1.0))
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TRACKED_JOBS = 1000  # Jobs whose current stage is remembered
+
+Labels = Tuple[str, ...]
+
+
+# ===== REGISTRY =====
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values: Dict[Labels, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> per-bucket counts (last is +Inf), sum
+        self.values: Dict[Labels, List] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for labels, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value read when scraped"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], collect: Callable[[], Dict[Labels, float]]):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            values = self.collect()
+        except Exception as exc:
+            print(f"⚠️ Metric {self.name} unavailable: {exc}")
+            return lines
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value:g}")
+        return lines
+
+
+class CollectedCounter(Gauge):
+    """Counter kept elsewhere (e.g. in the database), read when scraped"""
+    kind = "counter"
+
+
+# ===== METRICS =====
+
+def _job_counts() -> Dict[Labels, float]:
+    counts = {(status.value,): 0 for status in JobStatus}
+    with Session(read_engine) as session:
+        for status, count in session.exec(select(Job.status, func.count(Job.id)).group_by(Job.status)):
+            counts[(status,)] = count
+    return counts
+
+
+def _llm_cache_counts() -> Dict[Labels, float]:
+    with Session(read_engine) as session:
+        return {(name,): value for name, value in session.exec(select(LLMCacheStat.name, LLMCacheStat.value))}
+
+
+def _subscriber_count() -> Dict[Labels, float]:
+    from .events import hub
+    return {(): hub.subscriber_count()}
+
+
+request_duration = Histogram(
+    "billsmith_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+sql_queries = Counter("billsmith_sql_queries_total", "SQL statements run by sampled requests", ("route",))
+sql_rows = Counter("billsmith_sql_rows_total", "Rows reported by the driver for sampled requests", ("route",))
+sql_seconds = Counter("billsmith_sql_seconds_total", "Time in SQL statements for sampled requests", ("route",))
+sql_sampled = Counter("billsmith_sql_sampled_requests_total", "Requests whose SQL was counted", ("route",))
+sql_per_request = Histogram(
+    "billsmith_sql_queries_per_request", "SQL statements per sampled request", ("route",), QUERY_COUNT_BUCKETS)
+stage_seconds = Histogram(
+    "billsmith_extraction_stage_seconds", "Extraction stage duration per job", ("stage",), STAGE_BUCKETS)
+page_seconds = Histogram(
+    "billsmith_extraction_page_seconds", "Text extraction time per page", ("method",), STAGE_BUCKETS)
+jobs = Gauge("billsmith_jobs", "Extraction jobs per status", ("status",), _job_counts)
+llm_cache_events = CollectedCounter(
+    "billsmith_llm_cache_events_total", "LLM cache hits, misses and evictions", ("event",), _llm_cache_counts)
+websocket_subscribers = Gauge("billsmith_websocket_subscribers", "Connected job update sockets", (), _subscriber_count)
+
+REGISTRY = [request_duration, sql_queries, sql_rows, sql_seconds, sql_sampled, sql_per_request,
+            stage_seconds, page_seconds, jobs, llm_cache_events, websocket_subscribers]
+
+
+def render() -> str:
+    """Every metric in Prometheus text format"""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# ===== SQL =====
+
+class RequestSQL:
+    """SQL statements run while handling one sampled request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestSQL]] = ContextVar("request_sql", default=None)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    sql = _current.get()
+    if sql is None:
+        return
+    started = conn.info["metrics_started"].pop()
+    sql.queries += 1
+    sql.seconds += time.perf_counter() - started
+    if cursor.rowcount > 0:
+        sql.rows += cursor.rowcount
+
+
+for _engine in (engine, read_engine, export_engine):
+    event.listen(_engine, "before_cursor_execute", _before_execute)
+    event.listen(_engine, "after_cursor_execute", _after_execute)
+
+
+# ===== REQUESTS =====
+
+_route_paths: Dict[Any, str] = {}
+
+
+def route_label(scope) -> str:
+    """Route template (bounded cardinality), e.g. /api/v1/bills/{bill_id}"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    if not _route_paths:
+        for route in scope["app"].routes:
+            if getattr(route, "endpoint", None) is not None:
+                _route_paths[route.endpoint] = route.path
+    return _route_paths.get(endpoint, "unmatched")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency per route and sampled SQL use"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        sql = RequestSQL() if random.random() < METRICS_SQL_SAMPLE_RATE else None
+        token = _current.set(sql)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            route = route_label(scope)
+            request_duration.observe((scope["method"], route, f"{status // 100}xx"), elapsed)
+            if sql is not None:
+                sql_sampled.inc((route,))
+                sql_queries.inc((route,), sql.queries)
+                sql_rows.inc((route,), sql.rows)
+                sql_seconds.inc((route,), sql.seconds)
+                sql_per_request.observe((route,), sql.queries)
+
+
+# ===== EXTRACTION =====
+
+# job id -> (current stage, when it started by the worker's clock)
+_job_stages: "OrderedDict[str, Tuple[str, datetime]]" = OrderedDict()
+_stages_lock = threading.Lock()
+
+
+def observe_job_event(job_event: Dict[str, Any]) -> None:
+    """Turn a job's progress/status events into stage and page timings.
+
+    A stage lasts until the job's next stage or final status. Times are
+    differences of the worker's own timestamps, so clocks needn't agree.
+    """
+    if not METRICS_ENABLED:
+        return
+    kind = job_event.get("event")
+    if kind not in ("progress", "status"):
+        return
+    job_id = job_event["job_id"]
+    at = datetime.fromisoformat(job_event["at"])
+
+    if kind == "progress" and job_event.get("seconds") is not None:
+        page_seconds.observe(("ocr" if job_event.get("ocr") else "text",), job_event["seconds"])
+
+    with _stages_lock:
+        current = _job_stages.get(job_id)
+        stage = job_event.get("stage") if kind == "progress" else None
+        if current and current[0] == stage:
+            return
+        if current:
+            stage_seconds.observe((current[0],), max((at - current[1]).total_seconds(), 0.0))
+        if stage:
+            _job_stages[job_id] = (stage, at)
+            _job_stages.move_to_end(job_id)
+            while len(_job_stages) > TRACKED_JOBS:
+                _job_stages.popitem(last=False)
+        else:
+            _job_stages.pop(job_id, None)
@@ -0,0 +1,200 @@
+"""
+Schema Migrations
+
+Versioned schema changes, applied in order and recorded in
+`schema_migrations`, so a deployment sets up the database once instead of
+every API worker re-running create_all and the trigger setup on boot.
+
+Run them as a release step (from the repository root):
+    python -m src.backend.migrations            # Apply pending migrations
+    python -m src.backend.migrations --check    # Exit 1 if any are pending
+
+On start-up each worker only reads the current version (one query).
+MIGRATE_ON_STARTUP (default true, for local development) lets a worker
+apply pending migrations itself; set it to false in production so a
+worker started against an old schema refuses to serve instead. Migrating
+takes a database-wide lock (BEGIN IMMEDIATE on SQLite, an advisory lock
+on PostgreSQL), so workers racing on first boot apply each migration once.
+
+To change the schema, append a step to MIGRATIONS; never edit one that
+has shipped. Steps run inside the migration transaction on the
+connection they are given. The baseline creates every table in the
+current models, so later steps must also skip what already exists.
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Connection, insert, select, text
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import SQLModel
+
+from .database import MIGRATE_ON_STARTUP, engine, init_default_categories
+
+MIGRATION_LOCK_KEY = 4242_0001  # pg_advisory_xact_lock key
+
+CREATE_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at TIMESTAMP NOT NULL
+)
+"""
+
+
+# ===== MIGRATIONS =====
+
+def _baseline(connection: Connection) -> None:
+    """Tables, search index, rollup and cache triggers, default categories.
+
+    Every step skips what already exists, so databases created before
+    migrations (by create_all at boot) adopt this version. create_all
+    leaves the indexes of existing tables alone; 0004 brings those up to
+    date.
+    """
+    from .analytics_cache import create_cache_triggers
+    from .rollups import create_rollup_triggers
+    from .search import create_search_index
+
+    SQLModel.metadata.create_all(connection)
+    create_search_index(connection)
+    create_rollup_triggers(connection)
+    create_cache_triggers(connection)
+    init_default_categories(connection)
+
+
+def _llm_cache_stats(connection: Connection) -> None:
+    """Shared LLM cache hit/miss/eviction counters (llm_cache.py)"""
+    from .llm_cache import CACHE_COUNTERS
+    from .models import LLMCacheStat
+
+    LLMCacheStat.__table__.create(connection, checkfirst=True)
+    existing = set(connection.execute(select(LLMCacheStat.name)).scalars())
+    missing = [{"name": name, "value": 0} for name in CACHE_COUNTERS if name not in existing]
+    if missing:
+        connection.execute(insert(LLMCacheStat), missing)
+
+
+def _llm_token_buckets(connection: Connection) -> None:
+    """Token budget shared by the LLM clients of every worker (llm_client.py)"""
+    from .models import LLMTokenBucket
+
+    LLMTokenBucket.__table__.create(connection, checkfirst=True)
+
+
+# Indexes replaced by the current models' indexes
+OBSOLETE_INDEXES = [
+    "idx_created_at",  # By idx_created_at_id (keyset pagination)
+    "ix_bills_created_at",  # Likewise (was Bill.created_at index=True)
+]
+
+
+def _model_indexes(connection: Connection) -> None:
+    """Every index in the current models, on tables created before they were added"""
+    for table in SQLModel.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            connection.execute(CreateIndex(index, if_not_exists=True))
+    for name in OBSOLETE_INDEXES:
+        connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+# (version, name, step)
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline", _baseline),
+    (2, "llm_cache_stats", _llm_cache_stats),
+    (3, "llm_token_buckets", _llm_token_buckets),
+    (4, "model_indexes", _model_indexes),
+]
+HEAD = MIGRATIONS[-1][0]
+
+
+# ===== RUNNER =====
+
+def schema_version() -> int:
+    """Highest applied migration, or 0 for an empty database"""
+    try:
+        with engine.connect() as connection:
+            return connection.execute(text("SELECT max(version) FROM schema_migrations")).scalar() or 0
+    except DBAPIError:
+        return 0  # No schema_migrations table yet
+
+
+def _locked_connection():
+    """Connection holding the migration lock in an open transaction"""
+    if engine.dialect.name == "sqlite":
+        # Autocommit hands transaction control to the explicit BEGIN IMMEDIATE,
+        # which takes the write lock up front (and makes the DDL transactional)
+        connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+    else:
+        connection = engine.connect()
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    return connection
+
+
+def _finish(connection: Connection, commit: bool) -> None:
+    if engine.dialect.name == "sqlite":
+        connection.exec_driver_sql("COMMIT" if commit else "ROLLBACK")
+    elif commit:
+        connection.commit()
+    else:
+        connection.rollback()
+    connection.close()
+
+
+def migrate() -> List[str]:
+    """Apply pending migrations; returns the names applied"""
+    connection = _locked_connection()
+    try:
+        connection.execute(text(CREATE_VERSION_TABLE))
+        # Re-read under the lock: another worker may have just migrated
+        current = connection.execute(text("SELECT max(version) FROM schema_migrations")).scalar() or 0
+        applied = []
+        for version, name, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(connection)
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :at)"),
+                {"version": version, "name": name, "at": datetime.utcnow()},
+            )
+            applied.append(f"{version:04d}_{name}")
+    except BaseException:
+        _finish(connection, commit=False)
+        raise
+    _finish(connection, commit=True)
+    for name in applied:
+        print(f"✅ Applied migration {name}")
+    return applied
+
+
+def ensure_schema() -> None:
+    """Start-up check: the schema is current, migrating first if allowed"""
+    current = schema_version()
+    if current >= HEAD:
+        return
+    if not MIGRATE_ON_STARTUP:
+        raise RuntimeError(f"Database schema is at version {current}, this build needs {HEAD}; "
+                           f"run `python -m src.backend.migrations`")
+    migrate()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--check", action="store_true", help="Only report; exit 1 if migrations are pending")
+    args = parser.parse_args()
+
+    current = schema_version()
+    if args.check:
+        pending = [f"{version:04d}_{name}" for version, name, _ in MIGRATIONS if version > current]
+        print(f"Schema version {current}, head {HEAD}" + (f"; pending: {', '.join(pending)}" if pending else ""))
+        sys.exit(1 if pending else 0)
+    if not migrate():
+        print(f"✅ Schema is current (version {current})")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ SQLModel entities for categories and bills with all required fields per PRD.
 
 from datetime import datetime, date
 from decimal import Decimal
+from enum import Enum
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship, Index
 
@@ -22,6 +23,10 @@ class Category(SQLModel, table=True):
     
     # Relationships
     bills: List["Bill"] = Relationship(back_populates="category")
+    
+    __table_args__ = (
+        Index("idx_categories_created_at_id", "created_at", "id"),  # Keyset pagination
+    )
 
 
 class Bill(SQLModel, table=True):
@@ -54,7 +59,7 @@ class Bill(SQLModel, table=True):
     confidence_score: Optional[float] = Field(default=None)
     
     # Metadata
-    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow)  # Indexed by idx_created_at_id
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
     # Relationships
@@ -64,10 +69,136 @@ class Bill(SQLModel, table=True):
     __table_args__ = (
         Index("idx_category_due_date", "category_id", "due_date"),
         Index("idx_vendor", "vendor"),
-        Index("idx_created_at", "created_at"),
+        Index("idx_created_at_id", "created_at", "id"),  # Keyset pagination
+        Index("idx_category_created_at_id", "category_id", "created_at", "id"),
+        Index("idx_file_path", "file_path"),
+        Index("idx_updated_at", "updated_at"),
+    )
+
+
+class BillFile(SQLModel, table=True):
+    """Content-addressed source file shared by every bill with the same bytes"""
+    __tablename__ = "bill_files"
+    
+    sha256: str = Field(primary_key=True, max_length=64)
+    file_path: str = Field(unique=True, max_length=500)
+    file_type: str = Field(max_length=10)
+    size_bytes: int
+    ref_count: int = Field(default=0)  # Number of bills pointing at this file
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class JobStatus(str, Enum):
+    """Extraction job lifecycle per PRD"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    NEEDS_REVIEW = "needs_review"
+    FAILED = "failed"
+
+
+class Job(SQLModel, table=True):
+    """Extraction job for one uploaded bill file"""
+    __tablename__ = "jobs"
+    
+    id: str = Field(primary_key=True, max_length=36)
+    file_sha256: str = Field(foreign_key="bill_files.sha256", index=True)
+    file_path: str = Field(max_length=500)
+    filename: str = Field(max_length=255)
+    user_id: Optional[str] = Field(default=None, max_length=64)  # Uploader, for per-user updates
+    status: str = Field(default=JobStatus.QUEUED.value, max_length=20)
+    
+    # Retries & recovery
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    lease_expires_at: Optional[datetime] = Field(default=None)
+    error: Optional[str] = Field(default=None, max_length=1000)
+    
+    # Result
+    bill_id: Optional[int] = Field(default=None, foreign_key="bills.id")
+    
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("idx_job_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+
+class LLMCacheEntry(SQLModel, table=True):
+    """Cached LLM response keyed by content hash, model and prompt version"""
+    __tablename__ = "llm_cache"
+    
+    key: str = Field(primary_key=True, max_length=64)
+    call: str = Field(max_length=50)
+    model: str = Field(max_length=100)
+    response: str  # JSON body returned by the model
+    size_bytes: int
+    hit_count: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class LLMCacheStat(SQLModel, table=True):
+    """LLM cache counter (hits, misses, evictions), shared by every worker"""
+    __tablename__ = "llm_cache_stats"
+
+    name: str = Field(primary_key=True, max_length=20)
+    value: int = Field(default=0)
+
+
+class LLMTokenBucket(SQLModel, table=True):
+    """Per-minute LLM token budget shared by every worker process (llm_client.py)"""
+    __tablename__ = "llm_token_buckets"
+
+    name: str = Field(primary_key=True, max_length=50)
+    tokens: float = Field(default=0)
+    updated_at: float = Field(default=0)  # Epoch seconds of the last refill
+
+
+class ExtractionRun(SQLModel, table=True):
+    """Latency and token usage of one job's extraction, per mode"""
+    __tablename__ = "extraction_runs"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_id: str = Field(foreign_key="jobs.id", index=True, max_length=36)
+    mode: str = Field(max_length=20)  # single, batch or two_call
+    model: Optional[str] = Field(default=None, max_length=100)
+    batch_size: int = Field(default=1)
+    llm_calls: int = Field(default=0)  # 0 when served from the cache
+    prompt_tokens: int = Field(default=0)
+    completion_tokens: int = Field(default=0)
+    latency_ms: float = Field(default=0)
+    snippet_chars: int = Field(default=0)
+    agreement: Optional[float] = None  # Share of fields matching the two-call answer
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class SpendingRollup(SQLModel, table=True):
+    """Per-category monthly bill totals, kept in sync by triggers (rollups.py)"""
+    __tablename__ = "spending_rollups"
+
+    category_id: int = Field(foreign_key="categories.id", primary_key=True)
+    year_month: str = Field(primary_key=True, max_length=7)  # YYYY-MM of created_at
+    total_amount: Decimal = Field(default=0, max_digits=14, decimal_places=2)
+    bill_count: int = Field(default=0)
+    max_amount: Decimal = Field(default=0, max_digits=10, decimal_places=2)
+    review_count: int = Field(default=0)
+    usage_total: Decimal = Field(default=0, max_digits=14, decimal_places=3)
+
+    __table_args__ = (
+        Index("idx_rollup_year_month", "year_month"),
     )
 
 
+class CacheGeneration(SQLModel, table=True):
+    """Write counter per data scope ("all" or "category:{id}"), bumped by triggers"""
+    __tablename__ = "cache_generations"
+
+    scope: str = Field(primary_key=True, max_length=32)
+    generation: int = Field(default=0)
+
+
 # Pydantic models for API responses
 class CategoryRead(SQLModel):
     """Category response model"""
@@ -78,6 +209,12 @@ class CategoryRead(SQLModel):
     created_at: datetime
 
 
+class CategoryPage(SQLModel):
+    """One page of categories; pass next_cursor back as ?cursor="""
+    items: List[CategoryRead]
+    next_cursor: Optional[str] = None
+
+
 class CategoryCreate(SQLModel):
     """Category creation model"""
     name: str
@@ -113,6 +250,12 @@ class BillRead(SQLModel):
     category: CategoryRead
 
 
+class BillPage(SQLModel):
+    """One page of bills; pass next_cursor back as ?cursor="""
+    items: List[BillRead]
+    next_cursor: Optional[str] = None
+
+
 class BillCreate(SQLModel):
     """Bill creation model"""
     category_id: int
@@ -144,4 +287,15 @@ class BillUpdate(SQLModel):
     usage_qty: Optional[Decimal] = None
     usage_unit: Optional[str] = None
     tax_total: Optional[Decimal] = None
-    needs_review: Optional[bool] = None 
\ No newline at end of file
+    needs_review: Optional[bool] = None 
+
+class JobRead(SQLModel):
+    """Job response model"""
+    id: str
+    filename: str
+    status: str
+    attempts: int
+    error: Optional[str]
+    bill_id: Optional[int]
+    created_at: datetime
+    updated_at: datetime
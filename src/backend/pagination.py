@@ -0,0 +1,94 @@
+"""
+Keyset Pagination
+
+Cursor-based paging for list endpoints. Each page continues from the last
+row of the previous one with a range condition on the sort key instead of
+OFFSET, so with the sort key indexed (e.g. bills on (created_at, id)) the
+thousandth page costs the same as the first.
+
+Cursors are opaque to clients: urlsafe base64 of the last row's sort key
+values, handed back as `next_cursor` and passed in again as `?cursor=`.
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, tuple_
+from sqlmodel import Session
+
+
+@dataclass
+class SortKey:
+    """One ORDER BY column; the last key must be unique (e.g. the id)"""
+    column: Any
+    descending: bool = False
+    parse: Callable[[Any], Any] = lambda value: value  # Cursor JSON value -> column value
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: List[SortKey]) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError("wrong number of sort values")
+        return [key.parse(value) for key, value in zip(keys, values)]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _after(keys: List[SortKey], values: List[Any]):
+    """Rows that sort after `values`.
+
+    Leading keys that share a direction are compared as one row value,
+    which the database can answer with a single index range scan.
+    """
+    run = 1
+    while run < len(keys) and keys[run].descending == keys[0].descending:
+        run += 1
+    if run == 1:
+        head, bound = keys[0].column, values[0]
+    else:
+        head = tuple_(*[key.column for key in keys[:run]])
+        bound = tuple_(*values[:run])
+    beyond = head < bound if keys[0].descending else head > bound
+    if run == len(keys):
+        return beyond
+    return or_(beyond, and_(head == bound, _after(keys[run:], values[run:])))
+
+
+def paginate(
+    session: Session,
+    query,
+    keys: List[SortKey],
+    cursor: Optional[str],
+    limit: int
+) -> Tuple[List[Any], Optional[str]]:
+    """Run one page of a single-entity select.
+
+    Returns the page's rows and the cursor for the next page (None on the
+    last page).
+    """
+    if cursor:
+        query = query.where(_after(keys, decode_cursor(cursor, keys)))
+    query = query.order_by(*[key.column.desc() if key.descending else key.column for key in keys])
+    # Sort values ride along so the next cursor needs no extra lookups
+    query = query.add_columns(*[key.column for key in keys]).limit(limit + 1)
+
+    rows = session.execute(query).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(rows[-1][1:]))
+    return [row[0] for row in rows], next_cursor
@@ -0,0 +1,517 @@
+"""
+Bill Extraction Pipeline
+
+Hybrid OCR + gpt-4o pipeline per PRD section 6: pre-parse, OCR fallback,
+heuristic field grab, field completion, confidence scoring, normalization
+and persistence. Bills the heuristics extract confidently skip gpt-4o.
+Runs inside job workers; heavy dependencies (pdfplumber, pytesseract,
+Pillow) are imported where they are used so the API process never loads
+them. Page text extraction lives in extraction.py.
+
+Extraction modes (EXTRACTION_MODE):
+- single (default): one structured call returns fields and per-field
+  confidence from a trimmed snippet; small bills can share a batched call
+- two_call: the PRD's field completion call followed by a confidence call
+- compare: single, plus the two-call answer as a shadow run; agreement
+  between the two is stored on the run (see extraction_runs)
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from .database import get_or_create_category
+from .extraction import iter_page_text
+from .heuristics import (
+    FIELD_CUE_PATTERN,
+    HeuristicResult,
+    extract_fields,
+    get_vendor_matcher,
+    grab_heuristic_fields,
+    parse_date,
+    parse_money,
+)
+from .llm_cache import cached_batch_call, cached_call
+from .llm_client import ChatResult, chat_sync
+from .models import Bill, Category, ExtractionRun, Job
+from .storage import acquire_blob
+from .vendor_index import get_vendor_index, observe_bill
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "single")
+CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", 0.9))
+MAX_SNIPPET_CHARS = 32000
+BATCH_MAX_SNIPPET_CHARS = int(os.getenv("BATCH_MAX_SNIPPET_CHARS", 6000))  # Larger bills get their own call
+BOILERPLATE_PAGE_SHARE = 0.5  # Lines on at least this share of pages are header/footer
+
+# Fields requested from the model, with the JSON type it must return
+FIELD_SCHEMA = {
+    "vendor": "string",
+    "category": "string, one of the known categories",
+    "account_number": "string or null",
+    "invoice_number": "string or null",
+    "billing_start": "ISO-8601 date or null",
+    "billing_end": "ISO-8601 date or null",
+    "due_date": "ISO-8601 date or null",
+    "amount_due": "number",
+    "usage_qty": "number or null",
+    "usage_unit": "string or null",
+    "tax_total": "number or null",
+}
+# Cache version: bump PROMPT_VERSION when prompt wording changes; schema
+# changes are picked up through the FIELD_SCHEMA hash
+PROMPT_VERSION = "1"
+SCHEMA_VERSION = hashlib.sha256(json.dumps(FIELD_SCHEMA, sort_keys=True).encode()).hexdigest()[:12]
+CACHE_VERSION = f"{PROMPT_VERSION}/{SCHEMA_VERSION}"
+
+DATE_FIELDS = ("billing_start", "billing_end", "due_date")
+MONEY_FIELDS = ("amount_due", "tax_total")
+
+ProgressCallback = Callable[..., None]  # progress(stage, **detail)
+
+
+def _json_type(description: str) -> Dict[str, Any]:
+    kind = "number" if description.startswith("number") else "string"
+    return {"type": [kind, "null"]} if "or null" in description else {"type": kind}
+
+
+def _strict_object(properties: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+# Structured output schemas for single-call extraction (one bill, or a batch)
+EXTRACTION_PROPERTIES = {
+    "fields": _strict_object({name: _json_type(kind) for name, kind in FIELD_SCHEMA.items()}),
+    "confidence": _strict_object({name: {"type": "number"} for name in FIELD_SCHEMA}),
+}
+EXTRACTION_SCHEMA = _strict_object(EXTRACTION_PROPERTIES)
+BATCH_EXTRACTION_SCHEMA = _strict_object({
+    "bills": {"type": "array", "items": _strict_object({"document": {"type": "integer"}, **EXTRACTION_PROPERTIES})},
+})
+
+
+@dataclass
+class Document:
+    """Parsed bill text with the heuristic pass over it"""
+    text: str
+    snippet: str  # Trimmed text sent to the model in single mode
+    seed: Dict[str, List[str]]
+    heuristic: HeuristicResult
+
+
+@dataclass
+class Extraction:
+    """Model answer for one bill and the runs that produced it"""
+    fields: Dict[str, Any]
+    confidence: Dict[str, float]
+    runs: List[ExtractionRun] = field(default_factory=list)
+
+
+@dataclass
+class LLMUsage:
+    """Model calls made for one extraction (none when served from the cache)"""
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def add(self, result: ChatResult) -> None:
+        self.calls += 1
+        self.prompt_tokens += result.usage.get("prompt_tokens", 0)
+        self.completion_tokens += result.usage.get("completion_tokens", 0)
+
+
+# ===== SNIPPET =====
+
+DIGITS = re.compile(r"\d+")
+
+
+def _boilerplate_key(line: str) -> str:
+    # Ignore numbers so "Page 2 of 5" matches "Page 3 of 5"
+    return DIGITS.sub("#", " ".join(line.lower().split()))
+
+
+def trim_snippet(pages: Dict[int, str], max_chars: int = MAX_SNIPPET_CHARS) -> str:
+    """Prompt text with repeated header/footer lines and irrelevant pages removed.
+
+    Lines found on most pages (letterheads, page numbers, legal footers) are
+    kept once. Pages after the first are kept only if their remaining lines
+    carry a field cue such as a total, due date, account number or usage.
+    """
+    numbers = sorted(pages)
+    page_lines = {
+        number: [line.strip() for line in pages[number].splitlines() if line.strip()]
+        for number in numbers
+    }
+
+    boilerplate = set()
+    if len(numbers) > 1:
+        seen_on = Counter(
+            key for number in numbers for key in {_boilerplate_key(line) for line in page_lines[number]}
+        )
+        min_pages = max(2, math.ceil(len(numbers) * BOILERPLATE_PAGE_SHARE))
+        boilerplate = {key for key, count in seen_on.items() if count >= min_pages}
+
+    kept, emitted = [], set()
+    for number in numbers:
+        body = [line for line in page_lines[number] if _boilerplate_key(line) not in boilerplate]
+        if number != numbers[0] and not any(FIELD_CUE_PATTERN.search(line) for line in body):
+            continue
+        lines = []
+        for line in page_lines[number]:
+            key = _boilerplate_key(line)
+            if key in boilerplate:
+                if key in emitted:
+                    continue
+                emitted.add(key)
+            lines.append(line)
+        kept.append("\n".join(lines))
+    return "\n\n".join(kept)[:max_chars]
+
+
+# ===== GPT-4o CALLS =====
+
+def _chat_json(
+    messages: List[Dict[str, str]],
+    usage: Optional[LLMUsage] = None,
+    schema: Optional[Tuple[str, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    if schema:
+        name, body = schema
+        response_format = {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": body}}
+    else:
+        response_format = {"type": "json_object"}
+    result = chat_sync(LLM_MODEL, messages, response_format=response_format, temperature=0)
+    if usage is not None:
+        usage.add(result)
+    return json.loads(result.content)
+
+
+def complete_fields(
+    text: str, seed: Dict[str, List[str]], categories: List[str], usage: Optional[LLMUsage] = None
+) -> Dict[str, Any]:
+    """gpt-4o call 1: fill every bill field from the document text"""
+    return _chat_json([
+        {"role": "system", "content": "You are an expert bill parser. Reply with JSON only."},
+        {"role": "user", "content": (
+            f"Extract these fields as JSON: {json.dumps(FIELD_SCHEMA)}\n"
+            f"Known categories: {json.dumps(categories)}\n"
+            f"Candidate values found by pattern matching: {json.dumps(seed)}\n\n"
+            f"Bill text:\n{text[:MAX_SNIPPET_CHARS]}"
+        )},
+    ], usage)
+
+
+def score_confidence(text: str, fields: Dict[str, Any], usage: Optional[LLMUsage] = None) -> Dict[str, float]:
+    """gpt-4o call 2: per-field confidence between 0 and 1"""
+    scores = _chat_json([
+        {"role": "system", "content": "You verify extracted bill data. Reply with JSON only."},
+        {"role": "user", "content": (
+            "For each field below, return a JSON object mapping the field name to your "
+            "confidence (0-1) that the value is correct for this bill.\n"
+            f"Fields: {json.dumps(fields)}\n\n"
+            f"Bill text:\n{text[:MAX_SNIPPET_CHARS]}"
+        )},
+    ], usage)
+    return {field: float(scores.get(field, 0)) for field in fields}
+
+
+EXTRACT_SYSTEM_PROMPT = (
+    "You are an expert bill parser. For every field return its value (null when the bill "
+    "does not show it) and your confidence (0-1) that the value is correct for this bill."
+)
+
+
+def extract_with_confidence(
+    snippet: str, seed: Dict[str, List[str]], categories: List[str], usage: Optional[LLMUsage] = None
+) -> Dict[str, Any]:
+    """Single gpt-4o call: fields and per-field confidence together"""
+    return _chat_json([
+        {"role": "system", "content": EXTRACT_SYSTEM_PROMPT},
+        {"role": "user", "content": (
+            f"Fields: {json.dumps(FIELD_SCHEMA)}\n"
+            f"Known categories: {json.dumps(categories)}\n"
+            f"Candidate values found by pattern matching: {json.dumps(seed)}\n\n"
+            f"Bill text:\n{snippet}"
+        )},
+    ], usage, ("bill_extraction", EXTRACTION_SCHEMA))
+
+
+def extract_batch_with_confidence(
+    documents: List[Document], categories: List[str], usage: Optional[LLMUsage] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """Single gpt-4o call for several small bills; None for bills left unanswered"""
+    blocks = "\n\n".join(
+        f"=== Document {number} ===\n"
+        f"Candidate values found by pattern matching: {json.dumps(document.seed)}\n"
+        f"Bill text:\n{document.snippet}"
+        for number, document in enumerate(documents, start=1)
+    )
+    answer = _chat_json([
+        {"role": "system", "content": EXTRACT_SYSTEM_PROMPT + " Answer once per document, by document number."},
+        {"role": "user", "content": (
+            f"Fields: {json.dumps(FIELD_SCHEMA)}\n"
+            f"Known categories: {json.dumps(categories)}\n\n"
+            f"{blocks}"
+        )},
+    ], usage, ("bill_extraction_batch", BATCH_EXTRACTION_SCHEMA))
+    by_number = {bill.get("document"): bill for bill in answer.get("bills", [])}
+    return [
+        {"fields": by_number[number]["fields"], "confidence": by_number[number]["confidence"]}
+        if number in by_number else None
+        for number in range(1, len(documents) + 1)
+    ]
+
+
+# ===== POST-PROCESS =====
+
+def normalize_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize dates to ISO-8601 and currency to cent precision"""
+    normalized = dict(fields)
+    for field in DATE_FIELDS:
+        normalized[field] = parse_date(fields.get(field))
+    for field in MONEY_FIELDS:
+        normalized[field] = parse_money(fields.get(field))
+    usage_qty = fields.get("usage_qty")
+    try:
+        normalized["usage_qty"] = Decimal(str(usage_qty)) if usage_qty not in (None, "") else None
+    except InvalidOperation:
+        normalized["usage_qty"] = None
+    return normalized
+
+
+def _comparable(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return value.normalize()
+    return str(value).strip().lower() if value is not None else None
+
+
+def field_agreement(fields: Dict[str, Any], reference: Dict[str, Any]) -> float:
+    """Share of schema fields whose normalized values match the reference"""
+    fields, reference = normalize_fields(fields), normalize_fields(reference)
+    same = sum(_comparable(fields.get(name)) == _comparable(reference.get(name)) for name in FIELD_SCHEMA)
+    return same / len(FIELD_SCHEMA)
+
+
+# ===== EXTRACTION =====
+
+def active_categories(session: Session) -> List[str]:
+    return sorted(session.exec(select(Category.name).where(Category.active == True)).all())
+
+
+def _run(job: Job, mode: str, usage: LLMUsage, latency: float, snippet_chars: int, batch_size: int = 1) -> ExtractionRun:
+    return ExtractionRun(
+        job_id=job.id,
+        mode=mode,
+        model=LLM_MODEL,
+        batch_size=batch_size,
+        llm_calls=usage.calls,
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        latency_ms=latency * 1000,
+        snippet_chars=snippet_chars,
+    )
+
+
+def _single_answer(answer: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    fields = {name: answer["fields"].get(name) for name in FIELD_SCHEMA}
+    confidence = {name: float(answer["confidence"].get(name) or 0) for name in FIELD_SCHEMA}
+    return fields, confidence
+
+
+def extract_two_call(job: Job, document: Document, categories: List[str]) -> Extraction:
+    """PRD extraction: field completion, then confidence scoring (both cached)"""
+    usage, started = LLMUsage(), time.perf_counter()
+    fields = cached_call(
+        "complete_fields", job.file_sha256, LLM_MODEL, CACHE_VERSION, categories,
+        lambda: complete_fields(document.text, document.seed, categories, usage),
+    )
+    requested = {k: fields.get(k) for k in FIELD_SCHEMA}
+    confidence = cached_call(
+        "score_confidence", job.file_sha256, LLM_MODEL, CACHE_VERSION, requested,
+        lambda: score_confidence(document.text, requested, usage),
+    )
+    latency = time.perf_counter() - started
+    run = _run(job, "two_call", usage, latency, min(len(document.text), MAX_SNIPPET_CHARS))
+    return Extraction(fields, confidence, [run])
+
+
+def extract_single(job: Job, document: Document, categories: List[str]) -> Extraction:
+    """Single structured call on the trimmed snippet (cached)"""
+    usage, started = LLMUsage(), time.perf_counter()
+    answer = cached_call(
+        "extract", job.file_sha256, LLM_MODEL, CACHE_VERSION, categories,
+        lambda: extract_with_confidence(document.snippet, document.seed, categories, usage),
+    )
+    fields, confidence = _single_answer(answer)
+    run = _run(job, "single", usage, time.perf_counter() - started, len(document.snippet))
+    return Extraction(fields, confidence, [run])
+
+
+def _with_shadow(job: Job, document: Document, categories: List[str], extraction: Extraction) -> Extraction:
+    # Compare mode: record the two-call answer next to the single-call one
+    shadow = extract_two_call(job, document, categories)
+    extraction.runs[0].agreement = field_agreement(extraction.fields, shadow.fields)
+    extraction.runs.extend(shadow.runs)
+    return extraction
+
+
+def extract_document(session: Session, job: Job, document: Document) -> Extraction:
+    """Extract one bill with the configured EXTRACTION_MODE"""
+    categories = active_categories(session)
+    if EXTRACTION_MODE == "two_call":
+        return extract_two_call(job, document, categories)
+    extraction = extract_single(job, document, categories)
+    if EXTRACTION_MODE == "compare":
+        extraction = _with_shadow(job, document, categories, extraction)
+    return extraction
+
+
+def extract_documents(session: Session, items: List[Tuple[Job, Document]]) -> Dict[str, Extraction]:
+    """Extract several bills, sharing one model call between the small ones.
+
+    Bills whose snippet exceeds BATCH_MAX_SNIPPET_CHARS, or that the batched
+    answer skipped, fall back to extract_document.
+    """
+    if EXTRACTION_MODE == "two_call":
+        return {job.id: extract_document(session, job, document) for job, document in items}
+
+    categories = active_categories(session)
+    small = [(job, document) for job, document in items if len(document.snippet) <= BATCH_MAX_SNIPPET_CHARS]
+    extractions: Dict[str, Extraction] = {}
+    if len(small) > 1:
+        usage, started, batched = LLMUsage(), time.perf_counter(), []
+
+        def compute(missing: List[int]) -> List[Optional[Dict[str, Any]]]:
+            batched.extend(missing)
+            return extract_batch_with_confidence([small[i][1] for i in missing], categories, usage)
+
+        answers = cached_batch_call(
+            "extract", [job.file_sha256 for job, _ in small], LLM_MODEL, CACHE_VERSION, categories, compute,
+        )
+        latency = time.perf_counter() - started
+        for position, ((job, document), answer) in enumerate(zip(small, answers)):
+            if answer is None:
+                continue
+            # Batched bills split the call's tokens evenly; cache hits cost nothing
+            share = LLMUsage()
+            if position in batched:
+                share = LLMUsage(
+                    calls=1,
+                    prompt_tokens=usage.prompt_tokens // len(batched),
+                    completion_tokens=usage.completion_tokens // len(batched),
+                )
+            run = _run(job, "batch", share, latency, len(document.snippet), batch_size=len(batched) or 1)
+            extraction = Extraction(*_single_answer(answer), [run])
+            if EXTRACTION_MODE == "compare":
+                extraction = _with_shadow(job, document, categories, extraction)
+            extractions[job.id] = extraction
+
+    for job, document in items:
+        if job.id not in extractions:
+            extractions[job.id] = extract_document(session, job, document)
+    return extractions
+
+
+# ===== PERSIST =====
+
+def persist_bill(session: Session, job: Job, fields: Dict[str, Any], confidence: Dict[str, float]) -> Bill:
+    """Add the extracted bill and count its file reference (caller commits)"""
+    # Known vendors resolve from the fingerprint index; otherwise use the model's pick
+    match = get_vendor_index(session).lookup(fields.get("vendor"), fields.get("account_number"))
+    if match:
+        category_id = match.category_id
+    else:
+        # Flushed only: a new category commits with the bill, or not at all
+        category_id = get_or_create_category(session, fields.get("category") or "Uncategorized", commit=False).id
+    score = min(confidence.values()) if confidence else 0.0
+    needs_review = score < CONFIDENCE_THRESHOLD or fields.get("amount_due") is None
+
+    bill = Bill(
+        category_id=category_id,
+        vendor=(fields.get("vendor") or "Unknown vendor")[:200],
+        invoice_number=fields.get("invoice_number"),
+        account_number=fields.get("account_number"),
+        billing_start=fields.get("billing_start"),
+        billing_end=fields.get("billing_end"),
+        due_date=fields.get("due_date"),
+        amount_due=fields.get("amount_due") or Decimal("0.00"),
+        usage_qty=fields.get("usage_qty"),
+        usage_unit=fields.get("usage_unit"),
+        tax_total=fields.get("tax_total"),
+        file_path=job.file_path,
+        needs_review=needs_review,
+        confidence_score=score,
+    )
+    session.add(bill)
+    acquire_blob(session, job.file_path)
+    session.flush()
+    observe_bill(bill)
+    return bill
+
+
+def persist_extraction(session: Session, job: Job, extraction: Extraction) -> Bill:
+    """Persist a model extraction with its run records (caller commits)"""
+    session.add_all(extraction.runs)
+    return persist_bill(session, job, normalize_fields(extraction.fields), extraction.confidence)
+
+
+# ===== JOBS =====
+
+def read_document(session: Session, job: Job, progress: ProgressCallback) -> Document:
+    """Parse a job's file and run the heuristic field grab"""
+    file_type = job.file_path.rsplit(".", 1)[-1]
+
+    # Pages arrive in completion order; seed heuristics as each one lands
+    progress("parse")
+    pages: Dict[int, str] = {}
+    seed = None
+    for page in iter_page_text(job.file_path, file_type):
+        pages[page.number] = page.text
+        seed = grab_heuristic_fields(page.text, seed)
+        progress("parse", page=page.number, pages_done=len(pages), page_count=page.page_count, ocr=page.ocr,
+                 seconds=round(page.seconds, 3))
+    text = "\n\n".join(pages[number] for number in sorted(pages))
+
+    progress("heuristic")
+    return Document(
+        text=text,
+        snippet=trim_snippet(pages),
+        seed=seed or grab_heuristic_fields(""),
+        heuristic=extract_fields(text, get_vendor_matcher(session)),
+    )
+
+
+def persist_heuristic(session: Session, job: Job, document: Document) -> Bill:
+    """Fast path: write confidently extracted heuristic fields (caller commits)"""
+    fields, confidence = document.heuristic.accepted()
+    return persist_bill(session, job, fields, confidence)
+
+
+def process_job(session: Session, job: Job, progress: Optional[ProgressCallback] = None) -> Bill:
+    """Run the full extraction pipeline for a job (caller commits)"""
+    progress = progress or (lambda stage, **detail: None)
+    document = read_document(session, job, progress)
+
+    # Confident heuristics (typically known vendors) skip the LLM
+    if document.heuristic.is_confident():
+        progress("persist")
+        return persist_heuristic(session, job, document)
+
+    progress("llm")
+    extraction = extract_document(session, job, document)
+    progress("persist")
+    return persist_extraction(session, job, extraction)
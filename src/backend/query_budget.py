@@ -0,0 +1,133 @@
+"""
+Query Budget
+
+Counts the SQL statements each API request runs and checks them against
+the ceiling its route declares with @query_budget(n), so N+1 lazy loads
+(e.g. one category query per serialized bill) show up as soon as they
+are introduced.
+
+QUERY_BUDGET_MODE:
+- warn (default): log requests that go over budget
+- strict: fail the request with a 500 listing the statements; use in tests
+- off: don't count
+
+The budget is checked when the response starts, so strict mode works
+under any server. Queries run while a streaming body is sent (exports)
+can only be checked once it is done: strict mode then raises
+QueryBudgetExceeded, which the test client re-raises.
+"""
+
+import os
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+
+from .database import engine, export_engine, read_engine
+
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "warn")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryLog:
+    """Statements run while handling one request"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+_current: ContextVar[Optional[QueryLog]] = ContextVar("query_log", default=None)
+
+
+def _record(conn, cursor, statement, parameters, context, executemany):
+    log = _current.get()
+    if log is not None:
+        log.statements.append(statement)
+
+
+for _engine in (engine, read_engine, export_engine):
+    event.listen(_engine, "before_cursor_execute", _record)
+
+
+def query_budget(limit: int) -> Callable:
+    """Declare the most queries a route may run per request.
+
+    Apply below the @router decorator.
+    """
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.query_budget = limit
+        return endpoint
+    return decorate
+
+
+class QueryBudgetMiddleware:
+    """ASGI middleware enforcing each route's query budget"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or QUERY_BUDGET_MODE == "off":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        reported = False
+        failed = False
+
+        async def send_checked(message):
+            nonlocal reported, failed
+            if failed:
+                return
+            if message["type"] == "http.response.start":
+                report = _over_budget(scope, log)
+                reported = report is not None
+                if report and QUERY_BUDGET_MODE == "strict":
+                    # Replace the response before its headers go out
+                    failed = True
+                    await _send_failure(send, report)
+                    return
+                if report:
+                    print(f"⚠️ Query budget exceeded: {report.splitlines()[0]}")
+            await send(message)
+
+        token = _current.set(log)
+        try:
+            await self.app(scope, receive, send_checked)
+        finally:
+            _current.reset(token)
+
+        # Streaming bodies may run further queries after the headers
+        report = None if reported else _over_budget(scope, log)
+        if report is None:
+            return
+        if QUERY_BUDGET_MODE == "strict":
+            raise QueryBudgetExceeded(report)
+        print(f"⚠️ Query budget exceeded: {report.splitlines()[0]}")
+
+
+def _over_budget(scope, log: QueryLog) -> Optional[str]:
+    """Describe the request's queries if they exceed its route's budget"""
+    # The router leaves the matched endpoint in the scope
+    limit = getattr(scope.get("endpoint"), "query_budget", None)
+    if limit is None or log.count <= limit:
+        return None
+    message = f"{scope['method']} {scope['path']} ran {log.count} queries (budget {limit})"
+    return message + ":\n" + "\n".join(log.statements)
+
+
+async def _send_failure(send, report: str) -> None:
+    body = f"Query budget exceeded: {report}".encode()
+    await send({
+        "type": "http.response.start",
+        "status": 500,
+        "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,206 @@
+"""
+Monthly Spending Rollups
+
+`spending_rollups` holds, per category and calendar month of created_at,
+the bill total, count, largest amount, needs-review count and usage total.
+The analytics endpoints read it instead of re-aggregating `bills`, so
+their cost follows the number of months shown rather than bill history.
+
+Rows are maintained incrementally by database triggers on bill insert,
+update (amount corrections, category moves, review flags) and delete,
+so every write path (API, pipeline, scripts) keeps them current. Only a
+removal of a month's largest bill rescans that one category-month.
+
+Check for drift or rebuild from `bills` (from the repository root):
+    python -m src.backend.rollups verify
+    python -m src.backend.rollups rebuild
+"""
+
+import argparse
+import sys
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from sqlalchemy import Connection, text
+
+from .database import engine
+
+ROLLUP_COLUMNS = "category_id, year_month, total_amount, bill_count, max_amount, review_count, usage_total"
+
+# created_at -> YYYY-MM, per dialect
+MONTH_SQL = {
+    "sqlite": "strftime('%Y-%m', {column})",
+    "postgresql": "to_char({column}, 'YYYY-MM')",
+}
+
+# Remove / add one bill, as SQLite expressions over OLD / NEW
+SQLITE_REMOVE = """
+    UPDATE spending_rollups SET
+        total_amount = total_amount - old.amount_due,
+        bill_count = bill_count - 1,
+        review_count = review_count - old.needs_review,
+        usage_total = usage_total - coalesce(old.usage_qty, 0),
+        max_amount = CASE WHEN old.amount_due < max_amount THEN max_amount ELSE (
+            SELECT coalesce(max(amount_due), 0) FROM bills
+            WHERE category_id = old.category_id
+              AND created_at >= strftime('%Y-%m-01', old.created_at)
+              AND created_at < date(old.created_at, 'start of month', '+1 month')
+        ) END
+    WHERE category_id = old.category_id AND year_month = strftime('%Y-%m', old.created_at);
+    DELETE FROM spending_rollups
+    WHERE category_id = old.category_id AND year_month = strftime('%Y-%m', old.created_at) AND bill_count <= 0;
+"""
+
+SQLITE_ADD = f"""
+    INSERT INTO spending_rollups ({ROLLUP_COLUMNS})
+    VALUES (new.category_id, strftime('%Y-%m', new.created_at), new.amount_due, 1, new.amount_due,
+        new.needs_review, coalesce(new.usage_qty, 0))
+    ON CONFLICT (category_id, year_month) DO UPDATE SET
+        total_amount = total_amount + excluded.total_amount,
+        bill_count = bill_count + 1,
+        max_amount = max(max_amount, excluded.max_amount),
+        review_count = review_count + excluded.review_count,
+        usage_total = usage_total + excluded.usage_total;
+"""
+
+ROLLED_UP_COLUMNS = "category_id, created_at, amount_due, needs_review, usage_qty"
+
+SQLITE_SETUP = [
+    f"CREATE TRIGGER spending_rollup_insert AFTER INSERT ON bills BEGIN {SQLITE_ADD} END",
+    f"""CREATE TRIGGER spending_rollup_update AFTER UPDATE OF {ROLLED_UP_COLUMNS} ON bills BEGIN
+        {SQLITE_REMOVE} {SQLITE_ADD}
+    END""",
+    f"CREATE TRIGGER spending_rollup_delete AFTER DELETE ON bills BEGIN {SQLITE_REMOVE} END",
+]
+
+POSTGRES_SETUP = [
+    f"""CREATE FUNCTION spending_rollup_sync() RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            UPDATE spending_rollups SET
+                total_amount = total_amount - OLD.amount_due,
+                bill_count = bill_count - 1,
+                review_count = review_count - OLD.needs_review::int,
+                usage_total = usage_total - coalesce(OLD.usage_qty, 0),
+                max_amount = CASE WHEN OLD.amount_due < max_amount THEN max_amount ELSE (
+                    SELECT coalesce(max(amount_due), 0) FROM bills
+                    WHERE category_id = OLD.category_id
+                      AND created_at >= date_trunc('month', OLD.created_at)
+                      AND created_at < date_trunc('month', OLD.created_at) + interval '1 month'
+                ) END
+            WHERE category_id = OLD.category_id AND year_month = to_char(OLD.created_at, 'YYYY-MM');
+            DELETE FROM spending_rollups
+            WHERE category_id = OLD.category_id AND year_month = to_char(OLD.created_at, 'YYYY-MM')
+              AND bill_count <= 0;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            INSERT INTO spending_rollups ({ROLLUP_COLUMNS})
+            VALUES (NEW.category_id, to_char(NEW.created_at, 'YYYY-MM'), NEW.amount_due, 1, NEW.amount_due,
+                NEW.needs_review::int, coalesce(NEW.usage_qty, 0))
+            ON CONFLICT (category_id, year_month) DO UPDATE SET
+                total_amount = spending_rollups.total_amount + EXCLUDED.total_amount,
+                bill_count = spending_rollups.bill_count + 1,
+                max_amount = greatest(spending_rollups.max_amount, EXCLUDED.max_amount),
+                review_count = spending_rollups.review_count + EXCLUDED.review_count,
+                usage_total = spending_rollups.usage_total + EXCLUDED.usage_total;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    f"""CREATE TRIGGER spending_rollup_bills
+        AFTER INSERT OR UPDATE OF {ROLLED_UP_COLUMNS} OR DELETE ON bills
+        FOR EACH ROW EXECUTE FUNCTION spending_rollup_sync()""",
+]
+
+
+def _aggregate_sql() -> str:
+    """Rollup rows computed from scratch from bills"""
+    month = MONTH_SQL[engine.dialect.name].format(column="created_at")
+    review = "needs_review::int" if engine.dialect.name == "postgresql" else "needs_review"
+    return f"""
+        SELECT category_id, {month} AS year_month, sum(amount_due), count(*), max(amount_due),
+            sum({review}), coalesce(sum(usage_qty), 0)
+        FROM bills GROUP BY category_id, {month}
+    """
+
+
+def create_rollup_triggers(connection: Connection) -> None:
+    """Create the rollup triggers if missing, filling the table from existing
+    bills; a schema migration step"""
+    if engine.dialect.name == "postgresql":
+        existing = "SELECT count(*) FROM pg_trigger WHERE tgname = 'spending_rollup_bills'"
+        statements = POSTGRES_SETUP
+    else:
+        existing = "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'spending_rollup_insert'"
+        statements = SQLITE_SETUP
+
+    if connection.execute(text(existing)).scalar():
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+    _rebuild(connection)
+    print("✅ Spending rollups created")
+
+
+def _rebuild(connection) -> None:
+    connection.execute(text("DELETE FROM spending_rollups"))
+    connection.execute(text(f"INSERT INTO spending_rollups ({ROLLUP_COLUMNS}) {_aggregate_sql()}"))
+
+
+def rebuild_rollups() -> None:
+    """Recompute every rollup row from bills"""
+    with engine.begin() as connection:
+        _rebuild(connection)
+
+
+RollupKey = Tuple[int, str]
+
+
+def _rows(connection, sql: str) -> Dict[RollupKey, Tuple]:
+    rows = {}
+    for row in connection.execute(text(sql)):
+        # Amounts compared to the cent; SQLite stores them as floats
+        rows[(row[0], row[1])] = (
+            round(Decimal(str(row[2])), 2), row[3], round(Decimal(str(row[4])), 2),
+            row[5], round(Decimal(str(row[6])), 3),
+        )
+    return rows
+
+
+def verify_rollups() -> List[str]:
+    """Compare rollups with a fresh aggregate of bills; returns the differences"""
+    with engine.connect() as connection:
+        expected = _rows(connection, _aggregate_sql())
+        actual = _rows(connection, f"SELECT {ROLLUP_COLUMNS} FROM spending_rollups")
+
+    drift = []
+    for key in sorted(expected.keys() | actual.keys()):
+        if expected.get(key) != actual.get(key):
+            drift.append(f"category {key[0]} {key[1]}: rollup {actual.get(key)} != bills {expected.get(key)}")
+    return drift
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verify or rebuild the monthly spending rollups")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    args = parser.parse_args()
+
+    from .database import create_db_and_tables
+    create_db_and_tables()
+
+    if args.command == "rebuild":
+        rebuild_rollups()
+        print("✅ Spending rollups rebuilt")
+        return
+
+    drift = verify_rollups()
+    for line in drift:
+        print(f"❌ {line}")
+    if drift:
+        print(f"⚠️ {len(drift)} rollup rows drifted; run `python -m src.backend.rollups rebuild`")
+        sys.exit(1)
+    print("✅ Spending rollups match bills")
+
+
+if __name__ == "__main__":
+    main()
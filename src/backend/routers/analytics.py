@@ -2,36 +2,80 @@
 Analytics API Router
 
 Dashboard insights, spending analytics, and chart data.
+
+Totals come from the monthly spending rollups (see rollups.py), so their
+cost follows the months shown rather than the size of the bills table.
+Responses are cached and revalidated with ETags (see analytics_cache.py).
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, date, timedelta
 from decimal import Decimal
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select, func, and_, extract
-from ..database import get_session
-from ..models import Bill, Category
+from fastapi import APIRouter, Depends, Query
+from sqlmodel import Session, select, func
+from ..analytics_cache import CachedRoute, cache_response, stats
+from ..database import get_read_session
+from ..models import Bill, Category, SpendingRollup
+from ..query_budget import query_budget
+
+router = APIRouter(route_class=CachedRoute)
+
+
+def month_starts(count: int, today: Optional[date] = None) -> List[date]:
+    """First day of each of the last `count` calendar months, oldest first"""
+    today = today or date.today()
+    current = today.year * 12 + today.month - 1
+    return [date(index // 12, index % 12 + 1, 1) for index in range(current - count + 1, current + 1)]
+
 
-router = APIRouter()
+def monthly_totals(
+    session: Session,
+    months: List[date],
+    category_id: Optional[int] = None
+) -> List[Tuple[str, float]]:
+    """Amount billed in each calendar month, zero-filled, in one query.
+
+    `months` are consecutive month starts (see month_starts).
+    """
+    query = (
+        select(SpendingRollup.year_month, func.sum(SpendingRollup.total_amount))
+        .where(SpendingRollup.year_month >= months[0].strftime("%Y-%m"))
+        .group_by(SpendingRollup.year_month)
+    )
+    if category_id:
+        query = query.where(SpendingRollup.category_id == category_id)
+    
+    totals = dict(session.exec(query).all())
+    return [
+        (start.strftime("%Y-%m"), float(totals.get(start.strftime("%Y-%m")) or 0))
+        for start in months
+    ]
 
 
 @router.get("/analytics/dashboard/{category_id}")
-async def get_category_dashboard(
+@cache_response
+@query_budget(6)  # Includes the cache generation lookup
+def get_category_dashboard(
     category_id: int,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
-    """Get dashboard data for a specific category"""
+    """Get dashboard data for a specific category.
+
+    Built from a fixed set of aggregate queries, so the cost doesn't grow
+    with the category's history.
+    """
     
     # Get category info
     category = session.get(Category, category_id)
     if not category:
         return {"error": "Category not found"}
     
-    # Get bills for this category
+    # Important documents (last 5); the newest is also the last payment
     bills = session.exec(
         select(Bill)
         .where(Bill.category_id == category_id)
-        .order_by(Bill.created_at.desc())
+        .order_by(Bill.created_at.desc(), Bill.id.desc())
+        .limit(5)
     ).all()
     
     if not bills:
@@ -51,44 +95,38 @@ async def get_category_dashboard(
         }
     
     # Calculate summary metrics
-    current_year = datetime.now().year
-    ytd_total = sum(
-        bill.amount_due for bill in bills 
-        if bill.created_at.year == current_year
-    )
+    today = date.today()
+    ytd_total = session.exec(
+        select(func.sum(SpendingRollup.total_amount)).where(
+            SpendingRollup.category_id == category_id,
+            SpendingRollup.year_month >= f"{today.year}-01",
+            SpendingRollup.year_month <= f"{today.year}-12"
+        )
+    ).one()
     
     # Last payment
     last_payment = {
         "amount": float(bills[0].amount_due),
         "date": bills[0].created_at.date().isoformat(),
         "vendor": bills[0].vendor
-    } if bills else None
-    
-    # Next due date (find earliest due date in future)
-    now = date.today()
-    upcoming_bills = [b for b in bills if b.due_date and b.due_date >= now]
-    next_due = min(upcoming_bills, key=lambda x: x.due_date).due_date.isoformat() if upcoming_bills else None
-    
-    # Payment trends (last 12 months)
-    trends = []
-    for i in range(12):
-        month_date = datetime.now() - timedelta(days=30 * i)
-        month_bills = [
-            b for b in bills 
-            if b.created_at.month == month_date.month and b.created_at.year == month_date.year
-        ]
-        month_total = sum(bill.amount_due for bill in month_bills)
-        
-        trends.append({
-            "date": month_date.strftime("%Y-%m"),
-            "amount": float(month_total)
-        })
+    }
     
-    trends.reverse()  # Chronological order
+    # Next due date (earliest due date from today, via idx_category_due_date)
+    next_due = session.exec(
+        select(func.min(Bill.due_date)).where(
+            Bill.category_id == category_id,
+            Bill.due_date >= today
+        )
+    ).one()
+    
+    # Payment trends (last 12 calendar months)
+    trends = [
+        {"date": month, "amount": amount}
+        for month, amount in monthly_totals(session, month_starts(12, today), category_id)
+    ]
     
-    # Important documents (last 5)
     documents = []
-    for bill in bills[:5]:
+    for bill in bills:
         documents.append({
             "id": bill.id,
             "title": f"{bill.vendor} - {bill.invoice_number or 'Invoice'}",
@@ -105,8 +143,8 @@ async def get_category_dashboard(
         },
         "summary": {
             "last_payment": last_payment,
-            "next_due": next_due,
-            "year_to_date": float(ytd_total)
+            "next_due": next_due.isoformat() if next_due else None,
+            "year_to_date": float(ytd_total or 0)
         },
         "payment_trends": trends,
         "important_documents": documents
@@ -114,9 +152,11 @@ async def get_category_dashboard(
 
 
 @router.get("/analytics/spending/summary")
-async def get_spending_summary(
+@cache_response
+@query_budget(2)
+def get_spending_summary(
     year: Optional[int] = None,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """Get overall spending summary by category"""
     
@@ -124,21 +164,24 @@ async def get_spending_summary(
         year = datetime.now().year
     
     # Get spending by category for the year
+    total_spent = func.sum(SpendingRollup.total_amount)
     query = (
         select(
             Category.id,
             Category.name,
             Category.color_hex,
-            func.sum(Bill.amount_due).label("total_spent"),
-            func.count(Bill.id).label("bill_count"),
-            func.avg(Bill.amount_due).label("avg_amount"),
-            func.max(Bill.amount_due).label("max_amount")
+            total_spent.label("total_spent"),
+            func.sum(SpendingRollup.bill_count).label("bill_count"),
+            func.max(SpendingRollup.max_amount).label("max_amount")
         )
         .select_from(Category)
-        .join(Bill)
-        .where(extract("year", Bill.created_at) == year)
+        .join(SpendingRollup)
+        .where(
+            SpendingRollup.year_month >= f"{year}-01",
+            SpendingRollup.year_month <= f"{year}-12"
+        )
         .group_by(Category.id, Category.name, Category.color_hex)
-        .order_by(func.sum(Bill.amount_due).desc())
+        .order_by(total_spent.desc())
     )
     
     results = session.exec(query).all()
@@ -147,13 +190,14 @@ async def get_spending_summary(
     total_yearly = 0
     
     for result in results:
+        total = float(result.total_spent or 0)
         category_data = {
             "category_id": result.id,
             "category_name": result.name,
             "color_hex": result.color_hex,
-            "total_spent": float(result.total_spent or 0),
-            "bill_count": result.bill_count,
-            "avg_amount": float(result.avg_amount or 0),
+            "total_spent": total,
+            "bill_count": int(result.bill_count),
+            "avg_amount": total / result.bill_count if result.bill_count else 0,
             "max_amount": float(result.max_amount or 0)
         }
         categories.append(category_data)
@@ -167,79 +211,73 @@ async def get_spending_summary(
 
 
 @router.get("/analytics/trends/monthly")
-async def get_monthly_trends(
-    months: int = 12,
+@cache_response
+@query_budget(2)
+def get_monthly_trends(
+    months: int = Query(default=12, ge=1, le=600),
     category_id: Optional[int] = None,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
-    """Get monthly spending trends"""
-    
-    trends = []
-    
-    for i in range(months):
-        month_date = datetime.now() - timedelta(days=30 * i)
-        month = month_date.month
-        year = month_date.year
-        
-        query = select(func.sum(Bill.amount_due)).where(
-            and_(
-                extract("month", Bill.created_at) == month,
-                extract("year", Bill.created_at) == year
-            )
-        )
-        
-        if category_id:
-            query = query.where(Bill.category_id == category_id)
-        
-        result = session.exec(query).first()
-        amount = float(result or 0)
-        
-        trends.append({
-            "month": month_date.strftime("%Y-%m"),
-            "amount": amount
-        })
-    
-    trends.reverse()  # Chronological order
+    """Get monthly spending trends for the last `months` calendar months"""
+    trends = [
+        {"month": month, "amount": amount}
+        for month, amount in monthly_totals(session, month_starts(months), category_id)
+    ]
     return {"trends": trends}
 
 
 @router.get("/analytics/categories/performance")
-async def get_category_performance(
-    session: Session = Depends(get_session)
+@cache_response
+@query_budget(2)
+def get_category_performance(
+    session: Session = Depends(get_read_session)
 ):
     """Get performance metrics for all categories"""
     
-    categories = session.exec(select(Category).where(Category.active == True)).all()
-    performance = []
+    # The trailing 90 days don't align with months, so they come from bills:
+    # one (category_id, created_at) index range per category
+    three_months_ago = datetime.now() - timedelta(days=90)
+    recent_total = (
+        select(func.sum(Bill.amount_due))
+        .where(Bill.category_id == Category.id, Bill.created_at >= three_months_ago)
+        .scalar_subquery()
+    )
+    total_spent = func.sum(SpendingRollup.total_amount)
+    query = (
+        select(
+            Category.id,
+            Category.name,
+            Category.color_hex,
+            func.sum(SpendingRollup.bill_count).label("total_bills"),
+            total_spent.label("total_spent"),
+            recent_total.label("recent_total"),
+            func.sum(SpendingRollup.review_count).label("needs_review_count")
+        )
+        .select_from(Category)
+        .join(SpendingRollup)  # Categories without bills are left out
+        .where(Category.active == True)
+        .group_by(Category.id, Category.name, Category.color_hex)
+        .order_by(total_spent.desc(), Category.id)
+    )
     
-    for category in categories:
-        bills = session.exec(
-            select(Bill).where(Bill.category_id == category.id)
-        ).all()
-        
-        if not bills:
-            continue
-        
-        total_spent = sum(bill.amount_due for bill in bills)
-        avg_amount = total_spent / len(bills) if bills else 0
-        
-        # Get last 3 months trend
-        three_months_ago = datetime.now() - timedelta(days=90)
-        recent_bills = [b for b in bills if b.created_at >= three_months_ago]
-        recent_total = sum(bill.amount_due for bill in recent_bills)
-        
+    performance = []
+    for result in session.exec(query).all():
+        total = float(result.total_spent or 0)
         performance.append({
-            "category_id": category.id,
-            "category_name": category.name,
-            "color_hex": category.color_hex,
-            "total_bills": len(bills),
-            "total_spent": float(total_spent),
-            "avg_amount": float(avg_amount),
-            "recent_3m_total": float(recent_total),
-            "needs_review_count": len([b for b in bills if b.needs_review])
+            "category_id": result.id,
+            "category_name": result.name,
+            "color_hex": result.color_hex,
+            "total_bills": int(result.total_bills),
+            "total_spent": total,
+            "avg_amount": total / result.total_bills,
+            "recent_3m_total": float(result.recent_total or 0),
+            "needs_review_count": int(result.needs_review_count or 0)
         })
     
-    # Sort by total spent descending
-    performance.sort(key=lambda x: x["total_spent"], reverse=True)
-    
-    return {"categories": performance} 
\ No newline at end of file
+    return {"categories": performance}
+
+
+@router.get("/analytics/cache-stats")
+async def get_cache_stats():
+    """Analytics response cache hit rate for this process"""
+    return stats.snapshot()
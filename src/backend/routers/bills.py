@@ -7,102 +7,214 @@ CRUD operations for bills and file upload handling.
 import os
 import uuid
 from typing import List, Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import FileResponse
-from sqlmodel import Session, select, desc
+from datetime import date, datetime, time, timedelta
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import contains_eager, joinedload
+from sqlmodel import Session, select
 from ..database import get_session, get_or_create_category
-from ..models import Bill, BillRead, BillCreate, BillUpdate, Category
+from ..export import (
+    EXPORT_BATCH_SIZE, FORMATS, MAX_EXPORT_BATCH_SIZE, ExportResponse, check_format, export_query, stream_export
+)
+from ..jobs import MAX_QUEUE_DEPTH, create_job, detach_bill, find_pending_job, get_executor, queue_depth
+from ..models import Bill, BillPage, BillRead, BillCreate, BillUpdate, Category
+from ..pagination import SortKey, paginate
+from ..query_budget import query_budget
+from ..search import apply_search
+from ..storage import (
+    BILLS_STORAGE_PATH, StoredUpload, collect_blob, receive_uploads, store_blob, find_bill_for_file, release_blob
+)
+from ..vendor_index import observe_bill
 
 router = APIRouter()
 
-# File storage configuration
-BILLS_STORAGE_PATH = os.getenv("BILLS_STORAGE_PATH", "./Bills")
-MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", 50))
-ALLOWED_FILE_TYPES = os.getenv("ALLOWED_FILE_TYPES", "pdf,png,jpg,jpeg").split(",")
+# Multipart body accepted by the streaming upload endpoint
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}}
+                    }
+                }
+            }
+        }
+    }
+}
 
 
-@router.post("/bills/upload")
+def load_bill(session: Session, bill_id: int) -> Optional[Bill]:
+    """Fetch a bill and its category in one query (BillRead embeds both)"""
+    return session.get(Bill, bill_id, options=[joinedload(Bill.category)], populate_existing=True)
+
+
+@router.post("/bills/upload", status_code=status.HTTP_202_ACCEPTED, openapi_extra=UPLOAD_REQUEST_BODY)
 async def upload_bills(
-    files: List[UploadFile] = File(...),
+    request: Request,
+    user_id: Optional[str] = Header(default=None, alias="X-User-Id", max_length=64),
     session: Session = Depends(get_session)
 ):
-    """Upload bill files for processing"""
-    job_ids = []
+    """Upload bill files for processing.
+
+    Progress for the returned jobs is pushed over the /ws/jobs WebSocket;
+    send X-User-Id to receive it on that user's topic.
+    """
+    # Refuse before reading the body when extraction is backed up
+    if await run_in_threadpool(queue_depth, session) >= MAX_QUEUE_DEPTH:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Extraction queue is full, try again shortly",
+            headers={"Retry-After": "30"}
+        )
     
-    for file in files:
-        # Validate file type
-        file_ext = file.filename.split(".")[-1].lower() if file.filename else ""
-        if file_ext not in ALLOWED_FILE_TYPES:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File type {file_ext} not allowed. Allowed types: {ALLOWED_FILE_TYPES}"
-            )
-        
-        # Check file size
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE_MB * 1024 * 1024:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"File too large. Maximum size: {MAX_FILE_SIZE_MB}MB"
-            )
-        
-        # Generate unique filename and store
-        job_id = str(uuid.uuid4())
-        temp_path = f"{BILLS_STORAGE_PATH}/temp/{job_id}.{file_ext}"
+    # Files are streamed to disk as they arrive and size-capped per file
+    uploads = await receive_uploads(request)
+    if not uploads:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No files uploaded"
+        )
+    
+    # Database work runs off the event loop
+    job_ids, duplicates = await run_in_threadpool(register_uploads, session, uploads, user_id)
+    
+    return {
+        "jobs": job_ids,
+        "duplicates": duplicates,
+        "status": "uploaded",
+        "message": f"Uploaded {len(uploads)} files"
+    }
+
+
+def register_uploads(session: Session, uploads: List[StoredUpload], user_id: Optional[str]):
+    """Store received files and queue a job per new file.
+
+    Returns the new job ids and the duplicates already extracted or queued.
+    """
+    executor = get_executor()
+    job_ids = []
+    duplicates = []
+    for upload in uploads:
+        bill_file, is_new = store_blob(session, upload)
         
-        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
-        with open(temp_path, "wb") as f:
-            f.write(content)
+        # Same bytes already extracted or in flight: hand back that bill or job
+        if not is_new:
+            existing_bill = find_bill_for_file(session, bill_file)
+            if existing_bill:
+                duplicates.append({"filename": upload.filename, "bill_id": existing_bill.id})
+                continue
+            pending_job = find_pending_job(session, bill_file.sha256)
+            if pending_job:
+                duplicates.append({"filename": upload.filename, "job_id": pending_job.id})
+                continue
         
-        job_ids.append(job_id)
-        # TODO: Queue for processing with Celery
+        job = create_job(session, upload, bill_file, user_id)
+        executor.submit(job.id)
+        job_ids.append(job.id)
     
-    return {"jobs": job_ids, "status": "uploaded", "message": f"Uploaded {len(files)} files"}
+    return job_ids, duplicates
 
 
-@router.get("/bills", response_model=List[BillRead])
-async def list_bills(
-    skip: int = 0,
-    limit: int = 20,
+@router.get("/bills", response_model=BillPage)
+@query_budget(1)
+def list_bills(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=100),
     category_id: Optional[int] = None,
     needs_review: Optional[bool] = None,
     search: Optional[str] = None,
     session: Session = Depends(get_session)
 ):
-    """List bills with filtering and pagination"""
-    query = select(Bill).join(Category)
+    """List bills with filtering and cursor pagination.
+
+    Pass the returned next_cursor as ?cursor= with the same filters for the
+    next page; it is null on the last page.
+    """
+    # Categories come from the join, not one lazy load per bill
+    query = select(Bill).join(Category).options(contains_eager(Bill.category))
     
     # Filters
     if category_id:
         query = query.where(Bill.category_id == category_id)
     if needs_review is not None:
         query = query.where(Bill.needs_review == needs_review)
-    if search:
-        search_term = f"%{search}%"
-        query = query.where(
-            Bill.vendor.contains(search_term) |
-            Bill.invoice_number.contains(search_term) |
-            Bill.account_number.contains(search_term)
-        )
-    
-    # Order by most recent first
-    query = query.order_by(desc(Bill.created_at))
     
-    # Pagination
-    query = query.offset(skip).limit(limit)
+    # Most recent first; id breaks ties so every bill has one position
+    keys = [
+        SortKey(Bill.created_at, descending=True, parse=datetime.fromisoformat),
+        SortKey(Bill.id, descending=True),
+    ]
+    if search:
+        # Indexed full-text match, best matches first
+        query, score = apply_search(query, search)
+        if score is not None:
+            keys.insert(0, SortKey(score, parse=float))
     
-    bills = session.exec(query).all()
-    return bills
+    bills, next_cursor = paginate(session, query, keys, cursor, limit)
+    return BillPage(items=bills, next_cursor=next_cursor)
+
+
+@router.get("/bills/export", response_class=StreamingResponse)
+@query_budget(1)
+def export_bills(
+    export_format: str = Query(default="ndjson", alias="format", pattern="^(ndjson|csv|parquet)$"),
+    category_id: Optional[int] = None,
+    needs_review: Optional[bool] = None,
+    search: Optional[str] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    batch_size: int = Query(default=EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE),
+):
+    """Stream every matching bill as NDJSON, CSV or Parquet, newest first.
+
+    Takes the bill list filters plus inclusive created/due date ranges;
+    rows are read and written batch_size at a time (see export.py).
+    Returns 503 while the server is already running its maximum of exports.
+    """
+    check_format(export_format)
+
+    filters = []
+    if category_id:
+        filters.append(Bill.category_id == category_id)
+    if needs_review is not None:
+        filters.append(Bill.needs_review == needs_review)
+    if created_from:
+        filters.append(Bill.created_at >= datetime.combine(created_from, time.min))
+    if created_to:
+        filters.append(Bill.created_at < datetime.combine(created_to + timedelta(days=1), time.min))
+    if due_from:
+        filters.append(Bill.due_date >= due_from)
+    if due_to:
+        filters.append(Bill.due_date <= due_to)
+
+    query = export_query(filters)
+    if search:
+        query, _ = apply_search(query, search)
+
+    media_type, extension = FORMATS[export_format]
+    filename = f"bills-{datetime.utcnow():%Y%m%d-%H%M%S}.{extension}"
+    return ExportResponse(
+        stream_export(query, export_format, batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/bills/{bill_id}", response_model=BillRead)
-async def get_bill(
+@query_budget(1)
+def get_bill(
     bill_id: int,
     session: Session = Depends(get_session)
 ):
     """Get a specific bill"""
-    bill = session.get(Bill, bill_id)
+    bill = load_bill(session, bill_id)
     if not bill:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -112,7 +224,8 @@ async def get_bill(
 
 
 @router.patch("/bills/{bill_id}", response_model=BillRead)
-async def update_bill(
+@query_budget(3)
+def update_bill(
     bill_id: int,
     bill_update: BillUpdate,
     session: Session = Depends(get_session)
@@ -135,12 +248,13 @@ async def update_bill(
     
     session.add(db_bill)
     session.commit()
-    session.refresh(db_bill)
+    db_bill = load_bill(session, bill_id)
+    observe_bill(db_bill)
     return db_bill
 
 
 @router.delete("/bills/{bill_id}")
-async def delete_bill(
+def delete_bill(
     bill_id: int,
     session: Session = Depends(get_session)
 ):
@@ -152,18 +266,20 @@ async def delete_bill(
             detail="Bill not found"
         )
     
-    # Delete file if it exists
-    if os.path.exists(db_bill.file_path):
-        os.remove(db_bill.file_path)
+    # The file goes once the commit has dropped its last bill reference
+    file_path = db_bill.file_path
+    release_blob(session, file_path)
+    detach_bill(session, bill_id)
     
     session.delete(db_bill)
     session.commit()
+    collect_blob(session, file_path)
     
     return {"message": "Bill deleted successfully"}
 
 
 @router.get("/bills/{bill_id}/file")
-async def download_bill_file(
+def download_bill_file(
     bill_id: int,
     session: Session = Depends(get_session)
 ):
@@ -189,7 +305,8 @@ async def download_bill_file(
 
 # Temporary endpoint to create a mock bill for testing
 @router.post("/bills/mock", response_model=BillRead)
-async def create_mock_bill(
+@query_budget(6)
+def create_mock_bill(
     vendor: str = "Test Utility Company",
     amount: float = 125.50,
     category_name: str = "Electricity",
@@ -211,5 +328,6 @@ async def create_mock_bill(
     
     session.add(mock_bill)
     session.commit()
-    session.refresh(mock_bill)
+    mock_bill = load_bill(session, mock_bill.id)
+    observe_bill(mock_bill)
     return mock_bill 
\ No newline at end of file
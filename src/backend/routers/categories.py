@@ -4,34 +4,38 @@ Categories API Router
 CRUD operations for bill categories.
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
 from ..database import get_session
-from ..models import Category, CategoryRead, CategoryCreate, CategoryUpdate
+from ..models import Category, CategoryPage, CategoryRead, CategoryCreate, CategoryUpdate
+from ..pagination import SortKey, paginate
+from ..query_budget import query_budget
 
 router = APIRouter()
 
 
-@router.get("/categories", response_model=List[CategoryRead])
-async def list_categories(
-    skip: int = 0,
-    limit: int = 100,
+@router.get("/categories", response_model=CategoryPage)
+@query_budget(1)
+def list_categories(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=500),
     active_only: bool = True,
     session: Session = Depends(get_session)
 ):
-    """List all categories"""
+    """List categories, oldest first, with cursor pagination"""
     query = select(Category)
     if active_only:
         query = query.where(Category.active == True)
     
-    query = query.offset(skip).limit(limit)
-    categories = session.exec(query).all()
-    return categories
+    keys = [SortKey(Category.created_at, parse=datetime.fromisoformat), SortKey(Category.id)]
+    categories, next_cursor = paginate(session, query, keys, cursor, limit)
+    return CategoryPage(items=categories, next_cursor=next_cursor)
 
 
 @router.get("/categories/{category_id}", response_model=CategoryRead)
-async def get_category(
+def get_category(
     category_id: int,
     session: Session = Depends(get_session)
 ):
@@ -46,7 +50,7 @@ async def get_category(
 
 
 @router.post("/categories", response_model=CategoryRead, status_code=status.HTTP_201_CREATED)
-async def create_category(
+def create_category(
     category: CategoryCreate,
     session: Session = Depends(get_session)
 ):
@@ -70,7 +74,7 @@ async def create_category(
 
 
 @router.patch("/categories/{category_id}", response_model=CategoryRead)
-async def update_category(
+def update_category(
     category_id: int,
     category_update: CategoryUpdate,
     session: Session = Depends(get_session)
@@ -111,7 +115,7 @@ async def update_category(
 
 
 @router.delete("/categories/{category_id}")
-async def archive_category(
+def archive_category(
     category_id: int,
     session: Session = Depends(get_session)
 ):
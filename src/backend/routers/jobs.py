@@ -0,0 +1,75 @@
+"""
+Jobs API Router
+
+Status of bill extraction jobs and per-mode extraction statistics.
+"""
+
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import Session, select, desc, func
+from ..database import get_session
+from ..models import ExtractionRun, Job, JobRead
+
+router = APIRouter()
+
+
+@router.get("/jobs", response_model=List[JobRead])
+def list_jobs(
+    job_status: Optional[str] = Query(default=None, alias="status"),
+    limit: int = 50,
+    session: Session = Depends(get_session)
+):
+    """List recent extraction jobs"""
+    query = select(Job)
+    if job_status:
+        query = query.where(Job.status == job_status)
+    
+    query = query.order_by(desc(Job.created_at)).limit(limit)
+    return session.exec(query).all()
+
+
+@router.get("/jobs/extraction-stats")
+def get_extraction_stats(session: Session = Depends(get_session)):
+    """Compare extraction modes: latency, tokens and agreement per bill"""
+    rows = session.exec(
+        select(
+            ExtractionRun.mode,
+            func.count(ExtractionRun.id),
+            func.sum(ExtractionRun.llm_calls),
+            func.avg(ExtractionRun.latency_ms),
+            func.avg(ExtractionRun.prompt_tokens),
+            func.avg(ExtractionRun.completion_tokens),
+            func.avg(ExtractionRun.snippet_chars),
+            func.avg(ExtractionRun.agreement),
+        )
+        .group_by(ExtractionRun.mode)
+    ).all()
+
+    modes = []
+    for mode, runs, llm_calls, latency, prompt_tokens, completion_tokens, snippet_chars, agreement in rows:
+        modes.append({
+            "mode": mode,
+            "bills": runs,
+            "llm_calls": int(llm_calls or 0),
+            "avg_latency_ms": round(latency or 0, 1),
+            "avg_prompt_tokens": round(prompt_tokens or 0, 1),
+            "avg_completion_tokens": round(completion_tokens or 0, 1),
+            "avg_snippet_chars": round(snippet_chars or 0),
+            "agreement_with_two_call": round(agreement, 4) if agreement is not None else None,
+        })
+    return {"modes": modes}
+
+
+@router.get("/jobs/{job_id}", response_model=JobRead)
+def get_job(
+    job_id: str,
+    session: Session = Depends(get_session)
+):
+    """Get an extraction job's status"""
+    job = session.get(Job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
@@ -0,0 +1,118 @@
+"""
+WebSocket API Router
+
+Real-time job updates on /ws/jobs.
+
+Connect with ?user_id=... to follow every job that user uploads, and/or
+?job_id=... (repeatable) for specific jobs. While connected, send
+{"subscribe": "<job_id>"} or {"unsubscribe": "<job_id>"} to change the
+job set. Each job's current status arrives first as a "snapshot", then
+"status" and "progress" events as they happen, and a "heartbeat" when the
+socket has been idle for WS_HEARTBEAT_SECONDS.
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+from ..database import engine
+from ..events import Subscriber, hub, job_topic, user_topic
+from ..models import Job
+
+router = APIRouter()
+
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", 15))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", 5))
+SLOW_CONSUMER_CLOSE_CODE = 4008
+
+
+def _snapshots(job_ids: List[str]) -> List[Dict[str, Any]]:
+    """Current status of jobs, sent when a client starts following them"""
+    if not job_ids:
+        return []
+    with Session(engine) as session:
+        jobs = session.exec(select(Job).where(Job.id.in_(job_ids))).all()
+    return [
+        {
+            "event": "snapshot",
+            "job_id": job.id,
+            "user_id": job.user_id,
+            "status": job.status,
+            "attempts": job.attempts,
+            "bill_id": job.bill_id,
+            "error": job.error,
+            "at": job.updated_at.isoformat(),
+        }
+        for job in jobs
+    ]
+
+
+async def _send_events(websocket: WebSocket, subscriber: Subscriber) -> None:
+    while True:
+        try:
+            event = await asyncio.wait_for(subscriber.queue.get(), WS_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            event = {"event": "heartbeat", "at": datetime.utcnow().isoformat()}
+
+        # None is queued when the hub dropped this client for falling behind
+        if event is None:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Slow consumer")
+            return
+        try:
+            await asyncio.wait_for(websocket.send_json(event), WS_SEND_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Slow consumer")
+            return
+
+
+async def _receive_commands(websocket: WebSocket, subscriber: Subscriber) -> None:
+    while True:
+        try:
+            command = json.loads(await websocket.receive_text())
+        except ValueError:
+            continue
+        if not isinstance(command, dict):
+            continue
+
+        if command.get("subscribe"):
+            job_id = str(command["subscribe"])
+            hub.add_topic(subscriber, job_topic(job_id))
+            for snapshot in await run_in_threadpool(_snapshots, [job_id]):
+                hub.deliver(subscriber, snapshot)
+        elif command.get("unsubscribe"):
+            hub.remove_topic(subscriber, job_topic(str(command["unsubscribe"])))
+
+
+@router.websocket("/ws/jobs")
+async def job_updates(
+    websocket: WebSocket,
+    user_id: Optional[str] = None,
+    job_id: List[str] = Query(default=[])
+):
+    """Stream job status and progress events"""
+    await websocket.accept()
+    topics = [job_topic(value) for value in job_id]
+    if user_id:
+        topics.append(user_topic(user_id))
+    subscriber = hub.subscribe(topics)
+    for snapshot in await run_in_threadpool(_snapshots, job_id):
+        hub.deliver(subscriber, snapshot)
+
+    tasks = [
+        asyncio.create_task(_send_events(websocket, subscriber)),
+        asyncio.create_task(_receive_commands(websocket, subscriber)),
+    ]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            error = task.exception()
+            if error and not isinstance(error, WebSocketDisconnect):
+                print(f"⚠️ Job updates socket closed: {error}")
+    finally:
+        hub.unsubscribe(subscriber)
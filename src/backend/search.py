@@ -0,0 +1,197 @@
+"""
+Bill Search Index
+
+Global search (PRD F-06, ≤150 ms) over every text-like bill field: vendor,
+category, invoice and account numbers, amounts, usage unit and dates.
+Every search term is prefix-matched and all terms must match; results are
+ranked with vendor and category hits first.
+
+- SQLite: FTS5 table `bills_fts` (rowid = bill id) ranked with bm25
+- PostgreSQL: `bill_search` table with a GIN tsvector index for ranked
+  prefix search plus a pg_trgm index for typo-tolerant matches
+
+Both are kept in sync by database triggers on bill insert/update/delete
+and category rename, so every write path (API, pipeline, scripts) stays
+indexed. If SQLite lacks FTS5, search falls back to LIKE.
+"""
+
+import re
+from typing import List, Optional
+
+from sqlalchemy import Connection, Float, Integer, text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import or_
+
+from .database import engine
+from .models import Bill
+
+SEARCH_TERM = re.compile(r"\w+")
+MAX_SEARCH_TERMS = 8
+
+# bm25 column weights, in bills_fts column order
+FTS_WEIGHTS = {
+    "vendor": 10.0,
+    "category": 5.0,
+    "invoice_number": 4.0,
+    "account_number": 4.0,
+    "amounts": 2.0,
+    "usage_unit": 1.0,
+    "dates": 1.0,
+}
+
+# Indexed row for a bill, as SQLite expressions over NEW/OLD
+SQLITE_DOCUMENT = """
+    {row}.id,
+    {row}.vendor,
+    (SELECT name FROM categories WHERE id = {row}.category_id),
+    coalesce({row}.invoice_number, ''),
+    coalesce({row}.account_number, ''),
+    printf('%.2f', {row}.amount_due) || coalesce(' ' || printf('%.2f', {row}.tax_total), ''),
+    coalesce({row}.usage_unit, ''),
+    trim(coalesce({row}.due_date, '') || ' ' || coalesce({row}.billing_start, '') || ' '
+        || coalesce({row}.billing_end, ''))
+"""
+
+SQLITE_SETUP = [
+    f"""CREATE VIRTUAL TABLE bills_fts USING fts5(
+        {", ".join(FTS_WEIGHTS)}, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER bills_fts_insert AFTER INSERT ON bills BEGIN
+        INSERT INTO bills_fts (rowid, {", ".join(FTS_WEIGHTS)}) VALUES ({SQLITE_DOCUMENT.format(row="new")});
+    END""",
+    f"""CREATE TRIGGER bills_fts_update AFTER UPDATE ON bills BEGIN
+        DELETE FROM bills_fts WHERE rowid = old.id;
+        INSERT INTO bills_fts (rowid, {", ".join(FTS_WEIGHTS)}) VALUES ({SQLITE_DOCUMENT.format(row="new")});
+    END""",
+    """CREATE TRIGGER bills_fts_delete AFTER DELETE ON bills BEGIN
+        DELETE FROM bills_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER bills_fts_category AFTER UPDATE OF name ON categories BEGIN
+        UPDATE bills_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM bills WHERE category_id = new.id);
+    END""",
+    f"""INSERT INTO bills_fts (rowid, {", ".join(FTS_WEIGHTS)})
+        SELECT {SQLITE_DOCUMENT.format(row="bills")} FROM bills""",
+]
+
+POSTGRES_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """CREATE TABLE bill_search (
+        bill_id INTEGER PRIMARY KEY REFERENCES bills (id) ON DELETE CASCADE,
+        document TEXT NOT NULL,
+        vector TSVECTOR NOT NULL
+    )""",
+    "CREATE INDEX idx_bill_search_vector ON bill_search USING GIN (vector)",
+    "CREATE INDEX idx_bill_search_trgm ON bill_search USING GIN (document gin_trgm_ops)",
+    """CREATE FUNCTION bill_search_refresh(target INTEGER) RETURNS VOID AS $$
+        INSERT INTO bill_search (bill_id, document, vector)
+        SELECT b.id, doc.body,
+            setweight(to_tsvector('simple', b.vendor), 'A')
+            || setweight(to_tsvector('simple', c.name), 'A')
+            || setweight(to_tsvector('simple', concat_ws(' ', b.invoice_number, b.account_number)), 'B')
+            || setweight(to_tsvector('simple', concat_ws(' ', b.amount_due, b.tax_total)), 'C')
+            || setweight(to_tsvector('simple', concat_ws(' ', b.usage_unit, b.due_date, b.billing_start, b.billing_end)), 'D')
+        FROM bills b
+        JOIN categories c ON c.id = b.category_id
+        CROSS JOIN LATERAL (SELECT concat_ws(' ', b.vendor, c.name, b.invoice_number, b.account_number,
+            b.amount_due, b.tax_total, b.usage_unit, b.due_date, b.billing_start, b.billing_end) AS body) doc
+        WHERE b.id = target
+        ON CONFLICT (bill_id) DO UPDATE SET document = EXCLUDED.document, vector = EXCLUDED.vector
+    $$ LANGUAGE SQL""",
+    """CREATE FUNCTION bill_search_sync() RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_TABLE_NAME = 'categories' THEN
+            PERFORM bill_search_refresh(id) FROM bills WHERE category_id = NEW.id;
+        ELSE
+            PERFORM bill_search_refresh(NEW.id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER bill_search_bills AFTER INSERT OR UPDATE ON bills
+        FOR EACH ROW EXECUTE FUNCTION bill_search_sync()""",
+    """CREATE TRIGGER bill_search_categories AFTER UPDATE OF name ON categories
+        FOR EACH ROW EXECUTE FUNCTION bill_search_sync()""",
+    "SELECT bill_search_refresh(id) FROM bills",
+]
+
+_fts_available: Optional[bool] = None
+
+
+def _index_exists_sql() -> str:
+    if engine.dialect.name == "postgresql":
+        return "SELECT to_regclass('bill_search') IS NOT NULL"
+    return "SELECT count(*) FROM sqlite_master WHERE name = 'bills_fts'"
+
+
+def create_search_index(connection: Connection) -> None:
+    """Create the search index and its triggers if missing (populates existing
+    bills); a schema migration step"""
+    global _fts_available
+    if connection.execute(text(_index_exists_sql())).scalar():
+        _fts_available = True
+        return
+    statements = POSTGRES_SETUP if engine.dialect.name == "postgresql" else SQLITE_SETUP
+    try:
+        # In a savepoint, so a failure leaves the migration transaction usable
+        with connection.begin_nested():
+            for statement in statements:
+                connection.execute(text(statement))
+    except OperationalError as exc:
+        if engine.dialect.name == "postgresql":
+            raise  # No fallback: the setup itself is broken
+        # SQLite built without FTS5: search falls back to LIKE
+        print(f"⚠️ Search index unavailable, using LIKE: {exc}")
+        _fts_available = False
+        return
+    _fts_available = True
+    print("✅ Search index created")
+
+
+def detect_search_index() -> None:
+    """Check once per process whether the search index exists (start-up)"""
+    global _fts_available
+    with engine.connect() as connection:
+        _fts_available = bool(connection.execute(text(_index_exists_sql())).scalar())
+
+
+def search_terms(search: str) -> List[str]:
+    return SEARCH_TERM.findall(search.lower())[:MAX_SEARCH_TERMS]
+
+
+def apply_search(query, search: str):
+    """Filter a Bill select to search matches.
+
+    Returns the query and a relevance score column (lower is better) for
+    the caller to order by, or None when ranking is unavailable (LIKE).
+    """
+    terms = search_terms(search)
+    if not terms:
+        return query, None
+
+    if not _fts_available:
+        patterns = [f"%{term}%" for term in terms]
+        for pattern in patterns:
+            query = query.where(or_(
+                Bill.vendor.ilike(pattern),
+                Bill.invoice_number.ilike(pattern),
+                Bill.account_number.ilike(pattern),
+            ))
+        return query, None
+
+    if engine.dialect.name == "postgresql":
+        # Negated so that, as with bm25, lower is better
+        matches = text(
+            "SELECT bill_id, -(ts_rank(vector, q) + word_similarity(:raw, document)) AS score "
+            "FROM bill_search, to_tsquery('simple', :terms) AS q "
+            "WHERE vector @@ q OR :raw <% document"
+        ).bindparams(terms=" & ".join(f"{term}:*" for term in terms), raw=" ".join(terms))
+    else:
+        weights = ", ".join(str(weight) for weight in FTS_WEIGHTS.values())
+        # bm25 scores are negative; lower is better
+        matches = text(
+            f"SELECT rowid AS bill_id, bm25(bills_fts, {weights}) AS score "
+            "FROM bills_fts WHERE bills_fts MATCH :terms"
+        ).bindparams(terms=" ".join(f'"{term}"*' for term in terms))
+    matches = matches.columns(bill_id=Integer, score=Float).subquery("matches")
+    return query.join(matches, matches.c.bill_id == Bill.id), matches.c.score
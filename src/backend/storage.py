@@ -0,0 +1,379 @@
+"""
+Bill File Storage
+
+Streaming multipart upload handling. File parts are written to disk chunk by
+chunk as they arrive, hashed and type-sniffed on the fly, and rejected the
+moment they cross the size cap, so upload memory stays flat regardless of
+file or batch size.
+
+Received files are moved into a content-addressed store keyed by SHA-256,
+so the same document uploaded twice is stored (and extracted) once. Files
+are deleted only after the commit that dropped their last reference
+(collect_blob), and sweep_blobs collects files whose extraction never
+produced a bill.
+"""
+
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import BinaryIO, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, delete, select, update
+from starlette.concurrency import run_in_threadpool
+
+from .database import engine
+from .models import Bill, BillFile, ExtractionRun, Job, JobStatus
+
+# File storage configuration
+BILLS_STORAGE_PATH = os.getenv("BILLS_STORAGE_PATH", "./Bills")
+MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", 50))
+ALLOWED_FILE_TYPES = os.getenv("ALLOWED_FILE_TYPES", "pdf,png,jpg,jpeg").split(",")
+BLOB_STORAGE_PATH = f"{BILLS_STORAGE_PATH}/blobs"
+# Unreferenced files younger than this are left alone (their upload may
+# still be queueing a job); older ones are deleted by sweep_blobs
+BLOB_SWEEP_GRACE_SECONDS = int(os.getenv("BLOB_SWEEP_GRACE_SECONDS", 24 * 3600))
+
+PENDING_JOB_STATUSES = (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+
+# Leading magic bytes for each supported file type
+FILE_SIGNATURES = {
+    "pdf": b"%PDF-",
+    "png": b"\x89PNG\r\n\x1a\n",
+    "jpg": b"\xff\xd8\xff",
+}
+SNIFF_BYTES = max(len(signature) for signature in FILE_SIGNATURES.values())
+FILE_TYPE_ALIASES = {"jpeg": "jpg"}
+
+
+@dataclass
+class StoredUpload:
+    """A fully received upload written to temporary storage"""
+    upload_id: str
+    filename: str
+    path: str
+    file_type: str
+    sha256: str
+    size: int
+
+
+@dataclass
+class _FilePart:
+    """In-flight state for one file part of a multipart body"""
+    upload_id: str
+    filename: str
+    file_type: str
+    path: str
+    handle: Optional[BinaryIO] = None
+    hasher: "hashlib._Hash" = field(default_factory=hashlib.sha256)
+    size: int = 0
+    head: bytes = b""
+    sniffed: bool = False
+
+
+def sniff_file_type(head: bytes) -> Optional[str]:
+    """Detect the file type from its leading bytes"""
+    for file_type, signature in FILE_SIGNATURES.items():
+        if head.startswith(signature):
+            return file_type
+    return None
+
+
+def _normalize_file_type(file_type: str) -> str:
+    return FILE_TYPE_ALIASES.get(file_type, file_type)
+
+
+def _write_chunk(part: _FilePart, data: bytes) -> None:
+    """Hash and write a chunk (runs in the threadpool)"""
+    part.hasher.update(data)
+    part.handle.write(data)
+
+
+def _open_part(path: str) -> BinaryIO:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return open(path, "wb")
+
+
+def _discard_part(part: _FilePart) -> None:
+    if part.handle and not part.handle.closed:
+        part.handle.close()
+    if os.path.exists(part.path):
+        os.remove(part.path)
+
+
+class _UploadStreamParser:
+    """Feeds the request body through python-multipart, collecting file events"""
+
+    def __init__(self, boundary: bytes):
+        self.events: List[Tuple[str, _FilePart, bytes]] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._current: Optional[_FilePart] = None
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    def write(self, chunk: bytes) -> None:
+        self._parser.write(chunk)
+
+    def finalize(self) -> None:
+        self._parser.finalize()
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+        self._current = None
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if b"filename" not in options:
+            # Plain form fields are not used by the upload endpoint
+            return
+
+        filename = options[b"filename"].decode("utf-8", errors="replace")
+        file_ext = filename.split(".")[-1].lower() if "." in filename else ""
+        if file_ext not in ALLOWED_FILE_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File type {file_ext} not allowed. Allowed types: {ALLOWED_FILE_TYPES}"
+            )
+
+        upload_id = str(uuid.uuid4())
+        self._current = _FilePart(
+            upload_id=upload_id,
+            filename=filename,
+            file_type=_normalize_file_type(file_ext),
+            path=f"{BILLS_STORAGE_PATH}/temp/{upload_id}.part",
+        )
+        self.events.append(("begin", self._current, b""))
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._current is not None:
+            self.events.append(("data", self._current, data[start:end]))
+
+    def _on_part_end(self) -> None:
+        if self._current is not None:
+            self.events.append(("end", self._current, b""))
+        self._current = None
+
+
+def _check_file_type(part: _FilePart) -> None:
+    """Reject parts whose content does not match their declared type"""
+    part.sniffed = True
+    detected = sniff_file_type(part.head)
+    if detected != part.file_type:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File {part.filename} is not a valid {part.file_type} file"
+        )
+
+
+async def receive_uploads(request: Request) -> List[StoredUpload]:
+    """Stream every file part of a multipart request to temporary storage"""
+    content_type = request.headers.get("content-type", "")
+    media_type, params = parse_options_header(content_type)
+    if media_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a multipart/form-data upload"
+        )
+
+    max_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
+    parser = _UploadStreamParser(params[b"boundary"])
+    parts: List[_FilePart] = []
+    uploads: List[StoredUpload] = []
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event, part, data in parser.events:
+                if event == "begin":
+                    part.handle = await run_in_threadpool(_open_part, part.path)
+                    parts.append(part)
+                elif event == "data":
+                    part.size += len(data)
+                    if part.size > max_bytes:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"File too large. Maximum size: {MAX_FILE_SIZE_MB}MB"
+                        )
+                    if not part.sniffed:
+                        part.head += data[:SNIFF_BYTES - len(part.head)]
+                        if len(part.head) >= SNIFF_BYTES:
+                            _check_file_type(part)
+                    await run_in_threadpool(_write_chunk, part, data)
+                else:
+                    if not part.sniffed:
+                        _check_file_type(part)
+                    await run_in_threadpool(part.handle.close)
+                    final_path = f"{BILLS_STORAGE_PATH}/temp/{part.upload_id}.{part.file_type}"
+                    await run_in_threadpool(os.replace, part.path, final_path)
+                    part.path = final_path
+                    uploads.append(StoredUpload(
+                        upload_id=part.upload_id,
+                        filename=part.filename,
+                        path=final_path,
+                        file_type=part.file_type,
+                        sha256=part.hasher.hexdigest(),
+                        size=part.size,
+                    ))
+            parser.events.clear()
+        parser.finalize()
+    except BaseException:
+        # All-or-nothing: drop every file from a rejected batch
+        for part in parts:
+            await run_in_threadpool(_discard_part, part)
+        raise
+
+    return uploads
+
+
+# ===== CONTENT-ADDRESSED STORE =====
+
+def blob_path(sha256: str, file_type: str) -> str:
+    """Sharded location of a stored file, e.g. blobs/ab/cd/abcd....pdf"""
+    return f"{BLOB_STORAGE_PATH}/{sha256[:2]}/{sha256[2:4]}/{sha256}.{file_type}"
+
+
+def store_blob(session: Session, upload: StoredUpload) -> Tuple[BillFile, bool]:
+    """Move an upload into the content-addressed store.
+
+    Returns the stored file and whether it is new. Duplicate uploads are
+    discarded in favour of the copy already on disk.
+    """
+    existing = session.get(BillFile, upload.sha256)
+    if existing:
+        os.remove(upload.path)
+        return existing, False
+
+    path = blob_path(upload.sha256, upload.file_type)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(upload.path, path)
+
+    bill_file = BillFile(
+        sha256=upload.sha256,
+        file_path=path,
+        file_type=upload.file_type,
+        size_bytes=upload.size,
+    )
+    session.add(bill_file)
+    try:
+        session.commit()
+    except IntegrityError:
+        # A concurrent upload of the same bytes won the insert
+        session.rollback()
+        return session.get(BillFile, upload.sha256), False
+    session.refresh(bill_file)
+    return bill_file, True
+
+
+def find_bill_for_file(session: Session, bill_file: BillFile) -> Optional[Bill]:
+    """Get an existing bill extracted from a stored file"""
+    return session.exec(select(Bill).where(Bill.file_path == bill_file.file_path)).first()
+
+
+def acquire_blob(session: Session, file_path: str) -> None:
+    """Count a new bill reference to a stored file (caller commits)"""
+    session.execute(
+        update(BillFile)
+        .where(BillFile.file_path == file_path)
+        .values(ref_count=BillFile.ref_count + 1)
+    )
+
+
+def release_blob(session: Session, file_path: str) -> None:
+    """Drop a bill reference to a stored file (caller commits).
+
+    The file itself stays until collect_blob runs after the commit, so a
+    rolled-back delete never leaves a bill pointing at a missing file.
+    """
+    session.execute(
+        update(BillFile)
+        .where(BillFile.file_path == file_path)
+        .values(ref_count=BillFile.ref_count - 1)
+    )
+
+
+def _remove_file(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _collect(session: Session, bill_file: BillFile) -> bool:
+    """Delete an unreferenced stored file: its finished jobs and row, then the file.
+
+    Skipped while a bill or a queued/running job still uses it. Commits.
+    """
+    sha256, path = bill_file.sha256, bill_file.file_path
+    finished_jobs = select(Job.id).where(Job.file_sha256 == sha256, Job.status.notin_(PENDING_JOB_STATUSES))
+    pending_job = select(Job.id).where(Job.file_sha256 == sha256, Job.status.in_(PENDING_JOB_STATUSES))
+    try:
+        session.execute(delete(ExtractionRun).where(ExtractionRun.job_id.in_(finished_jobs)))
+        session.execute(delete(Job).where(Job.id.in_(finished_jobs)))
+        # Re-checked in the delete itself: an upload may have just queued a job for it
+        result = session.execute(
+            delete(BillFile).where(BillFile.sha256 == sha256, BillFile.ref_count <= 0, ~pending_job.exists())
+        )
+        if result.rowcount != 1:
+            session.rollback()
+            return False
+        session.commit()
+    except IntegrityError:
+        # A job or bill referencing the file was committed meanwhile
+        session.rollback()
+        return False
+    _remove_file(path)
+    return True
+
+
+def collect_blob(session: Session, file_path: str) -> None:
+    """Delete a released file if nothing references it any more (after the commit)"""
+    bill_file = session.exec(select(BillFile).where(BillFile.file_path == file_path)).first()
+    if bill_file is None:
+        # Files stored outside the content-addressed store belong to their bills only
+        if session.exec(select(Bill.id).where(Bill.file_path == file_path)).first() is None:
+            _remove_file(file_path)
+        return
+    if bill_file.ref_count <= 0:
+        _collect(session, bill_file)
+
+
+def sweep_blobs(grace_seconds: int = BLOB_SWEEP_GRACE_SECONDS) -> int:
+    """Delete stored files no bill references, older than the grace period.
+
+    Catches files whose jobs failed for good and so were never attached to
+    a bill. Returns the number of files deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    swept = 0
+    with Session(engine) as session:
+        candidates = session.exec(
+            select(BillFile).where(BillFile.ref_count <= 0, BillFile.created_at < cutoff)
+        ).all()
+        for bill_file in candidates:
+            swept += _collect(session, bill_file)
+    if swept:
+        print(f"🧹 Deleted {swept} unreferenced bill files")
+    return swept
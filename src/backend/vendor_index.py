@@ -0,0 +1,163 @@
+"""
+Vendor Fingerprint Index
+
+In-memory index mapping vendor fingerprints to categories, built from
+reviewed bills so new bills resolve their category without a database
+round trip or an LLM call (PRD F-04 step 1, vendor-alias lookup).
+
+Lookups try, in order:
+1. Normalized vendor name ("ACME Power Co., Inc." -> "acme power")
+2. Fuzzy character-trigram match on the normalized vendor name
+3. Only for bills without a vendor name: the account number's first
+   ACCOUNT_PREFIX_LENGTH characters, when every account on file with that
+   prefix has the same category (short prefixes such as "0001" are
+   shared by unrelated vendors)
+
+The most recently seen category wins for each fingerprint, so a manual
+correction through update_bill overrides earlier bills. Each process keeps
+its own index: it is updated in place when that process creates or
+corrects a bill, and pulls other processes' changes every
+VENDOR_INDEX_SYNC_SECONDS.
+"""
+
+import os
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from sqlmodel import Session, select
+
+from .models import Bill
+
+VENDOR_INDEX_SYNC_SECONDS = float(os.getenv("VENDOR_INDEX_SYNC_SECONDS", 30))
+FUZZY_MIN_SIMILARITY = float(os.getenv("VENDOR_FUZZY_MIN_SIMILARITY", 0.7))
+ACCOUNT_PREFIX_LENGTH = 8
+
+# Legal suffixes and filler words that vary between bills from one vendor
+VENDOR_STOPWORDS = {"the", "inc", "llc", "ltd", "co", "corp", "corporation", "company", "plc", "of"}
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+@dataclass
+class VendorMatch:
+    """Category resolved for a vendor and how it was found"""
+    category_id: int
+    method: str  # vendor, account_prefix or fuzzy
+    score: float
+
+
+def normalize_vendor(vendor: str) -> str:
+    """Canonical vendor fingerprint: lowercase words without legal suffixes"""
+    words = NON_ALNUM.sub(" ", vendor.lower()).split()
+    return " ".join(word for word in words if word not in VENDOR_STOPWORDS)
+
+
+def account_prefix(account_number: Optional[str]) -> Optional[str]:
+    if not account_number:
+        return None
+    digits = NON_ALNUM.sub("", account_number.lower())
+    return digits[:ACCOUNT_PREFIX_LENGTH] if len(digits) > ACCOUNT_PREFIX_LENGTH else None
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class VendorIndex:
+    """Fingerprint -> category maps with a trigram inverted index"""
+
+    def __init__(self):
+        self.vendors: Dict[str, Tuple[int, datetime]] = {}
+        # Prefix -> normalized account number -> category
+        self.account_prefixes: Dict[str, Dict[str, Tuple[int, datetime]]] = defaultdict(dict)
+        self.trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        self.synced_through = datetime.min
+        self.synced_at = 0.0
+
+    def observe(self, vendor: str, account_number: Optional[str], category_id: int, seen_at: datetime) -> None:
+        """Record a bill's vendor and category (newest observation wins)"""
+        key = normalize_vendor(vendor)
+        if key:
+            self._remember(self.vendors, key, category_id, seen_at)
+            for gram in trigrams(key):
+                self.trigram_index[gram].add(key)
+        prefix = account_prefix(account_number)
+        if prefix:
+            self._remember(self.account_prefixes[prefix], NON_ALNUM.sub("", account_number.lower()),
+                           category_id, seen_at)
+
+    @staticmethod
+    def _remember(mapping: Dict[str, Tuple[int, datetime]], key: str, category_id: int, seen_at: datetime) -> None:
+        current = mapping.get(key)
+        if current is None or seen_at >= current[1]:
+            mapping[key] = (category_id, seen_at)
+
+    def lookup(self, vendor: Optional[str], account_number: Optional[str] = None) -> Optional[VendorMatch]:
+        """Resolve a category for a vendor, or None when nothing is close"""
+        key = normalize_vendor(vendor or "")
+        if key in self.vendors:
+            return VendorMatch(self.vendors[key][0], "vendor", 1.0)
+        if not key:
+            return self._lookup_account(account_number)
+
+        grams = trigrams(key)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self.trigram_index.get(gram, ()):
+                shared[candidate] += 1
+        best_key, best_score = None, 0.0
+        for candidate, count in shared.items():
+            # Dice coefficient over trigram sets
+            score = 2 * count / (len(grams) + len(trigrams(candidate)))
+            if score > best_score:
+                best_key, best_score = candidate, score
+        if best_key and best_score >= FUZZY_MIN_SIMILARITY:
+            return VendorMatch(self.vendors[best_key][0], "fuzzy", best_score)
+        return None
+
+    def _lookup_account(self, account_number: Optional[str]) -> Optional[VendorMatch]:
+        """Category of the accounts sharing this one's prefix, if they agree"""
+        accounts = self.account_prefixes.get(account_prefix(account_number))
+        if not accounts:
+            return None
+        categories = {category_id for category_id, _ in accounts.values()}
+        if len(categories) != 1:
+            return None
+        return VendorMatch(categories.pop(), "account_prefix", 0.9)
+
+    def sync(self, session: Session) -> None:
+        """Pull reviewed bills created or corrected since the last sync"""
+        rows = session.exec(
+            select(Bill.vendor, Bill.account_number, Bill.category_id, Bill.updated_at)
+            .where(Bill.needs_review == False, Bill.updated_at > self.synced_through)
+            .order_by(Bill.updated_at)
+            .execution_options(yield_per=5000)
+        )
+        for vendor, account_number, category_id, updated_at in rows:
+            self.observe(vendor, account_number, category_id, updated_at)
+            self.synced_through = updated_at
+        self.synced_at = time.monotonic()
+
+
+_index: Optional[VendorIndex] = None
+
+
+def get_vendor_index(session: Session) -> VendorIndex:
+    """Process-wide index, built on first use and synced periodically"""
+    global _index
+    if _index is None:
+        _index = VendorIndex()
+        _index.sync(session)
+    elif time.monotonic() - _index.synced_at > VENDOR_INDEX_SYNC_SECONDS:
+        _index.sync(session)
+    return _index
+
+
+def observe_bill(bill: Bill) -> None:
+    """Update this process's index after a bill is created or corrected"""
+    if _index is not None and not bill.needs_review:
+        _index.observe(bill.vendor, bill.account_number, bill.category_id, bill.updated_at)
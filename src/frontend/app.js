@@ -10,6 +10,9 @@ class BillSmithApp {
         this.currentCategory = null;
         this.categories = [];
         this.bills = [];
+        this.userId = this.getUserId();
+        this.jobSocket = null;
+        this.reconnectDelay = 1000;
         
         this.init();
     }
@@ -18,6 +21,7 @@ class BillSmithApp {
         await this.loadCategories();
         this.setupEventListeners();
         this.setupChart();
+        this.connectJobUpdates();
         
         // Select first category by default
         if (this.categories.length > 0) {
@@ -32,6 +36,7 @@ class BillSmithApp {
             const response = await fetch(`${this.apiBase}${endpoint}`, {
                 headers: {
                     'Content-Type': 'application/json',
+                    'X-User-Id': this.userId,
                     ...options.headers
                 },
                 ...options
@@ -51,7 +56,7 @@ class BillSmithApp {
 
     async loadCategories() {
         try {
-            this.categories = await this.fetchAPI('/categories');
+            this.categories = (await this.fetchAPI('/categories')).items;
             this.renderCategories();
         } catch (error) {
             console.error('Failed to load categories:', error);
@@ -70,7 +75,7 @@ class BillSmithApp {
     async loadBills(categoryId = null) {
         try {
             const query = categoryId ? `?category_id=${categoryId}` : '';
-            this.bills = await this.fetchAPI(`/bills${query}`);
+            this.bills = (await this.fetchAPI(`/bills${query}`)).items;
             this.renderDocuments(this.bills);
         } catch (error) {
             console.error('Failed to load bills:', error);
@@ -105,6 +110,56 @@ class BillSmithApp {
         }
     }
 
+    // ===== REAL-TIME JOB UPDATES =====
+
+    getUserId() {
+        // Identifies this browser's uploads until accounts exist (PRD F-10)
+        let userId = localStorage.getItem('billsmith.userId');
+        if (!userId) {
+            userId = crypto.randomUUID();
+            localStorage.setItem('billsmith.userId', userId);
+        }
+        return userId;
+    }
+
+    connectJobUpdates() {
+        const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const url = `${protocol}://${window.location.host}/ws/jobs?user_id=${encodeURIComponent(this.userId)}`;
+        this.jobSocket = new WebSocket(url);
+
+        this.jobSocket.addEventListener('open', () => {
+            this.reconnectDelay = 1000;
+        });
+        this.jobSocket.addEventListener('message', (message) => {
+            this.handleJobEvent(JSON.parse(message.data));
+        });
+        this.jobSocket.addEventListener('close', () => {
+            // Reconnect with backoff (server restarts, or dropped as a slow consumer)
+            setTimeout(() => this.connectJobUpdates(), this.reconnectDelay);
+            this.reconnectDelay = Math.min(this.reconnectDelay * 2, 30000);
+        });
+    }
+
+    async handleJobEvent(event) {
+        if (event.event !== 'status') {
+            return;
+        }
+        if (event.status === 'done') {
+            this.showToast('Bill processed', 'success');
+        } else if (event.status === 'needs_review') {
+            this.showToast('Bill processed - needs review', 'info');
+        } else if (event.status === 'failed') {
+            this.showToast(`Bill processing failed: ${event.error || 'unknown error'}`, 'error');
+        } else {
+            return;
+        }
+
+        // Refresh data
+        if (this.currentCategory) {
+            await this.loadDashboardData(this.currentCategory.id);
+        }
+    }
+
     // ===== UI RENDERING =====
 
     renderCategories() {
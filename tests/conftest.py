@@ -0,0 +1,93 @@
+"""
+Shared test fixtures.
+
+Tests run against a throwaway SQLite database and, for LLM calls, the stub
+OpenAI-compatible server in checkers/stub_llm_server.py started on a free
+port. Settings are read when src.backend modules are imported, so the
+environment is set here, before any test module imports them.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+STUB_SERVER = ROOT / "checkers" / "stub_llm_server.py"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+STUB_PORT = free_port()
+_workdir = tempfile.mkdtemp(prefix="billsmith-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_workdir}/billsmith.db",
+    "BILLS_STORAGE_PATH": f"{_workdir}/Bills",
+    "OPENAI_BASE_URL": f"http://127.0.0.1:{STUB_PORT}/v1",
+    "OPENAI_API_KEY": "stub",
+})
+
+
+def start_stub(port: int, *options: str) -> subprocess.Popen:
+    """Run the stub LLM server and wait until it answers"""
+    process = subprocess.Popen(
+        [sys.executable, str(STUB_SERVER), "--port", str(port), *options],
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats")
+            return process
+        except httpx.TransportError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Stub LLM server did not start")
+
+
+class StubLLM:
+    """A running stub server and the completions it has served"""
+
+    def __init__(self, port: int, process: subprocess.Popen):
+        self.base_url = f"http://127.0.0.1:{port}/v1"
+        self.process = process
+        self._port = port
+
+    def stats(self) -> dict:
+        return httpx.get(f"http://127.0.0.1:{self._port}/stats").json()
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Migrated test database (shared by the session)"""
+    from src.backend.migrations import migrate
+    migrate()
+
+
+@pytest.fixture(scope="session")
+def stub_llm():
+    """Stub server at OPENAI_BASE_URL, used by the process-wide client"""
+    process = start_stub(STUB_PORT)
+    yield StubLLM(STUB_PORT, process)
+    process.terminate()
+    process.wait()
+
+
+@pytest.fixture
+def throttled_stub_llm():
+    """Stub server answering a third of requests with 429 (Retry-After 0.2 s)"""
+    port = free_port()
+    process = start_stub(port, "--throttle-rate", "0.33", "--latency-ms", "20")
+    yield StubLLM(port, process)
+    process.terminate()
+    process.wait()
@@ -0,0 +1,200 @@
+"""Bill export (export.py): contents, filters, bounded concurrency and
+cleanup on disconnect"""
+
+import asyncio
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from src.backend import export
+from src.backend.database import engine, export_engine
+from src.backend.main import app
+from src.backend.models import Bill, Category
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(app)
+    for number in range(20):
+        client.post("/api/v1/bills/mock", params={"vendor": f"Export Test {number}"})
+    return client
+
+
+def test_disconnect_returns_connection(client):
+    """A client leaving mid-download frees its connection and export slot"""
+    free_slots = export._export_slots._value
+    sent = []
+
+    async def download():
+        gone = asyncio.Event()
+
+        async def receive():
+            await gone.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message["type"])
+            if message.get("body"):
+                gone.set()
+                await asyncio.sleep(0.1)
+
+        await app({
+            "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": "/api/v1/bills/export", "raw_path": b"/api/v1/bills/export",
+            "query_string": b"batch_size=2", "root_path": "", "headers": [],
+            "server": ("testserver", 80), "client": ("testclient", 50000),
+        }, receive, send)
+
+    asyncio.run(download())
+
+    assert sent == ["http.response.start", "http.response.body"]  # Cut off after one batch
+    assert export_engine.pool.checkedout() == 0
+    assert export._export_slots._value == free_slots
+
+
+def test_busy_exports_refused(client):
+    for _ in range(export.EXPORT_POOL_SIZE):
+        export._export_slots.acquire()
+    try:
+        response = client.get("/api/v1/bills/export")
+    finally:
+        for _ in range(export.EXPORT_POOL_SIZE):
+            export._export_slots.release()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+    assert client.get("/api/v1/bills/export", params={"format": "csv"}).status_code == 200
+
+
+@pytest.fixture(scope="module")
+def exported(client):
+    """Three bills in a category of their own and one in another, by name"""
+    with Session(engine) as session:
+        category = Category(name=f"Export {uuid.uuid4().hex[:8]}", color_hex="#123456")
+        other = Category(name=f"Export other {uuid.uuid4().hex[:8]}")
+        session.add_all([category, other])
+        session.flush()
+        bills = {
+            "first": Bill(
+                category_id=category.id, vendor="Zephyrine Power", invoice_number="INV-1", account_number="ACC-1",
+                billing_start=date(2026, 2, 1), billing_end=date(2026, 2, 28), due_date=date(2026, 3, 15),
+                amount_due=Decimal("1234.50"), tax_total=Decimal("12.34"), usage_qty=Decimal("512.125"),
+                usage_unit="kWh", file_path="/tmp/first.pdf", confidence_score=0.97,
+                created_at=datetime(2026, 3, 1, 0, 0), updated_at=datetime(2026, 3, 2, 8, 30),
+            ),
+            "last_of_month": Bill(
+                category_id=category.id, vendor="Export Water", amount_due=Decimal("40.00"),
+                file_path="/tmp/water.pdf", needs_review=True, due_date=date(2026, 4, 20),
+                created_at=datetime(2026, 3, 31, 23, 59, 59), updated_at=datetime(2026, 3, 31, 23, 59, 59),
+            ),
+            "next_month": Bill(
+                category_id=category.id, vendor="Export Internet", amount_due=Decimal("55.10"),
+                file_path="/tmp/internet.pdf", created_at=datetime(2026, 4, 1), updated_at=datetime(2026, 4, 1),
+            ),
+            "other_category": Bill(
+                category_id=other.id, vendor="Export Gas", amount_due=Decimal("9.99"),
+                file_path="/tmp/gas.pdf", created_at=datetime(2026, 3, 10), updated_at=datetime(2026, 3, 10),
+            ),
+        }
+        session.add_all(bills.values())
+        session.commit()
+        return category.name, category.id, {name: bill.id for name, bill in bills.items()}
+
+
+def ndjson_rows(client, **params):
+    response = client.get("/api/v1/bills/export", params={"format": "ndjson", **params})
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_ndjson_rows(client, exported):
+    category_name, category_id, ids = exported
+    rows = ndjson_rows(client, category_id=category_id, batch_size=2)
+
+    # Newest first, every column in file order
+    assert [row["id"] for row in rows] == [ids["next_month"], ids["last_of_month"], ids["first"]]
+    assert all(list(row) == export.COLUMN_NAMES for row in rows)
+    assert rows[-1] == {
+        "id": ids["first"], "vendor": "Zephyrine Power", "category": category_name, "category_id": category_id,
+        "invoice_number": "INV-1", "account_number": "ACC-1",
+        "billing_start": "2026-02-01", "billing_end": "2026-02-28", "due_date": "2026-03-15",
+        "amount_due": "1234.50", "tax_total": "12.34", "usage_qty": "512.125", "usage_unit": "kWh",
+        "needs_review": False, "confidence_score": 0.97,
+        "created_at": "2026-03-01T00:00:00", "updated_at": "2026-03-02T08:30:00",
+    }
+
+
+def test_csv_rows(client, exported):
+    category_name, category_id, ids = exported
+    response = client.get("/api/v1/bills/export", params={"format": "csv", "category_id": category_id})
+
+    assert response.headers["content-type"].startswith("text/csv")
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header == export.COLUMN_NAMES
+    assert [int(row[0]) for row in rows] == [ids["next_month"], ids["last_of_month"], ids["first"]]
+    assert rows[-1] == [
+        str(ids["first"]), "Zephyrine Power", category_name, str(category_id), "INV-1", "ACC-1",
+        "2026-02-01", "2026-02-28", "2026-03-15", "1234.50", "12.34", "512.125", "kWh",
+        "False", "0.97", "2026-03-01T00:00:00", "2026-03-02T08:30:00",
+    ]
+    assert rows[0][4] == ""  # Missing values are empty cells
+
+
+def test_created_range_is_inclusive(client, exported):
+    _, category_id, ids = exported
+    rows = ndjson_rows(client, category_id=category_id, created_from="2026-03-01", created_to="2026-03-31")
+
+    assert [row["id"] for row in rows] == [ids["last_of_month"], ids["first"]]
+    rows = ndjson_rows(client, category_id=category_id, due_from="2026-04-20", due_to="2026-04-20")
+    assert [row["id"] for row in rows] == [ids["last_of_month"]]
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({"needs_review": "true"}, ["last_of_month"]),
+    ({"needs_review": "false"}, ["next_month", "first"]),
+    ({"search": "zephyrine"}, ["first"]),
+])
+def test_filters(client, exported, params, expected):
+    _, category_id, ids = exported
+    rows = ndjson_rows(client, category_id=category_id, **params)
+
+    assert [row["id"] for row in rows] == [ids[name] for name in expected]
+
+
+def test_category_filter(client, exported):
+    _, category_id, ids = exported
+    unfiltered = {row["id"] for row in ndjson_rows(client, created_from="2026-03-01", created_to="2026-04-01")}
+    filtered = {row["id"] for row in ndjson_rows(client, category_id=category_id)}
+
+    assert set(ids.values()) <= unfiltered
+    assert ids["other_category"] not in filtered
+
+
+def test_parquet_round_trip(client, exported):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _, category_id, ids = exported
+    response = client.get("/api/v1/bills/export", params={"format": "parquet", "category_id": category_id,
+                                                          "batch_size": 2})
+
+    assert response.status_code == 200
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet.metadata.num_row_groups == 2  # One per batch
+    table = parquet.read()
+    assert table.column_names == export.COLUMN_NAMES
+    rows = table.to_pylist()
+    assert [row["id"] for row in rows] == [ids["next_month"], ids["last_of_month"], ids["first"]]
+    first = rows[-1]
+    assert first["amount_due"] == Decimal("1234.50")
+    assert first["usage_qty"] == Decimal("512.125")
+    assert first["due_date"] == date(2026, 3, 15)
+    assert first["created_at"] == datetime(2026, 3, 1)
+    assert rows[0]["tax_total"] is None
@@ -0,0 +1,37 @@
+"""Heuristic field grab (heuristics.py): known-vendor matching"""
+
+from src.backend.heuristics import (
+    AMBIGUOUS_CONFIDENCE, KNOWN_VALUE_CONFIDENCE, NAME_ONLY_CONFIDENCE, VendorMatcher, VendorProfile, extract_fields,
+)
+
+MATCHER = VendorMatcher([
+    VendorProfile("Metro Water", "Water", {"MW-448812"}),
+    VendorProfile("Gas", "Gas", {"G-1001"}),
+])
+FILLER = "Thank you for your payment.\n" * 30
+
+
+def test_recurring_bill_skips_the_model():
+    text = "Metro Water\nAccount Number: MW-448812\nAmount Due: $42.10\n"
+    result = extract_fields(text, MATCHER)
+
+    assert result.fields["vendor"] == "Metro Water"
+    assert result.confidence["vendor"] == KNOWN_VALUE_CONFIDENCE
+    assert result.is_confident()
+
+
+def test_name_without_account_is_not_enough():
+    result = extract_fields("Metro Water\nAccount Number: MW-000001\nAmount Due: $42.10\n", MATCHER)
+
+    assert result.confidence["vendor"] == NAME_ONLY_CONFIDENCE
+    assert not result.is_confident()
+
+
+def test_generic_name_in_another_bill():
+    # "Gas" mentioned in passing, far below another vendor's header
+    text = "Northwind Energy\nAmount Due: $88.00\n" + FILLER + "Gas usage this period: 31 therms\n"
+    profile, confidence = MATCHER.match(text)
+
+    assert profile.vendor == "Gas"
+    assert confidence == AMBIGUOUS_CONFIDENCE
+    assert not extract_fields(text, MATCHER).is_confident()
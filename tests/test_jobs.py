@@ -0,0 +1,77 @@
+"""Job queue (jobs.py): claims, fencing and backoff"""
+
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import update
+from sqlmodel import Session, func, select
+
+from src.backend import jobs
+from src.backend.database import engine
+from src.backend.models import BillFile, Category, ExtractionRun, Job, JobStatus
+from src.backend.pipeline import Extraction, persist_extraction
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+@pytest.fixture
+def job_id():
+    """A queued job for a fresh (empty) stored file"""
+    sha256 = uuid.uuid4().hex * 2
+    job_id = str(uuid.uuid4())
+    with Session(engine) as session:
+        session.add(BillFile(sha256=sha256, file_path=f"/tmp/{sha256}.pdf", file_type="pdf", size_bytes=0))
+        session.add(Job(id=job_id, file_sha256=sha256, file_path=f"/tmp/{sha256}.pdf", filename="bill.pdf"))
+        session.commit()
+    return job_id
+
+
+def count(model, *conditions) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(model).where(*conditions)).one()
+
+
+def test_taken_over_job_writes_nothing(job_id):
+    """A result finished after another worker took the job over is dropped whole"""
+    category = f"Takeover {job_id[:8]}"
+    assert jobs.claim_job(job_id)
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        claim = jobs._Claim(job)
+        # The lease lapsed and another worker claimed the job
+        session.execute(update(Job).where(Job.id == job_id).values(attempts=Job.attempts + 1))
+        session.commit()
+
+        extraction = Extraction(
+            fields={"vendor": "Takeover Gas Co", "category": category, "amount_due": Decimal("12.00")},
+            confidence={"vendor": 0.9, "amount_due": 0.9},
+            runs=[ExtractionRun(job_id=job_id, mode="single"), ExtractionRun(job_id=job_id, mode="two_call")],
+        )
+        bill = persist_extraction(session, job, extraction)
+        claim.complete(session, bill)
+
+    assert count(Category, Category.name == category) == 0
+    assert count(ExtractionRun, ExtractionRun.job_id == job_id) == 0
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        assert job.bill_id is None
+        assert job.status == JobStatus.RUNNING.value
+
+
+def test_claim_waits_for_backoff(job_id):
+    retry_at = datetime.utcnow() + timedelta(minutes=5)
+    with Session(engine) as session:
+        session.execute(update(Job).where(Job.id == job_id).values(next_attempt_at=retry_at))
+        session.commit()
+
+    assert not jobs.claim_job(job_id)
+    assert jobs.backoff_until(job_id) == retry_at
+    assert (job_id, retry_at) in jobs.queued_jobs()
+
+    with Session(engine) as session:
+        session.execute(update(Job).where(Job.id == job_id).values(next_attempt_at=datetime.utcnow()))
+        session.commit()
+    assert jobs.backoff_until(job_id) is None
+    assert jobs.claim_job(job_id)
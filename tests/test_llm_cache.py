@@ -0,0 +1,101 @@
+"""LLM result cache (llm_cache.py) against the stub LLM server"""
+
+import json
+
+import pytest
+from sqlmodel import Session, delete, select
+
+from src.backend import llm_cache, metrics
+from src.backend.database import engine
+from src.backend.llm_client import chat_sync
+from src.backend.models import LLMCacheEntry, LLMCacheStat
+
+pytestmark = pytest.mark.usefixtures("database", "stub_llm")
+
+MODEL = "gpt-4o"
+VERSION = "1/test"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    with Session(engine) as session:
+        session.execute(delete(LLMCacheEntry))
+        session.commit()
+
+
+def counters():
+    with Session(engine) as session:
+        return dict(session.exec(select(LLMCacheStat.name, LLMCacheStat.value)).all())
+
+
+def extract(content_hash: str, model: str = MODEL, version: str = VERSION):
+    """One cached extraction call, answered by the stub on a miss"""
+    def compute():
+        result = chat_sync(model, [{"role": "user", "content": f"Bill text for {content_hash}"}],
+                           response_format={"type": "json_object"})
+        return json.loads(result.content)
+
+    return llm_cache.cached_call("extract", content_hash, model, version, ["Electricity"], compute)
+
+
+def test_miss_then_hit(stub_llm):
+    before, served = counters(), stub_llm.stats()["completions"]
+
+    first = extract("a" * 64)
+    second = extract("a" * 64)
+
+    assert first == second
+    assert first["vendor"] == "Stub Power & Light"
+    assert stub_llm.stats()["completions"] == served + 1  # The hit made no call
+    after = counters()
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+    with Session(engine) as session:
+        assert session.exec(select(LLMCacheEntry.hit_count)).one() == 1
+
+
+@pytest.mark.parametrize("changed", [
+    {"content_hash": "b" * 64},
+    {"model": "gpt-4o-mini"},
+    {"version": "2/test"},
+])
+def test_key_covers_hash_model_and_prompt_version(stub_llm, changed):
+    base = {"content_hash": "a" * 64, "model": MODEL, "version": VERSION}
+    extract(**base)
+    served = stub_llm.stats()["completions"]
+
+    extract(**{**base, **changed})
+
+    assert stub_llm.stats()["completions"] == served + 1
+    with Session(engine) as session:
+        assert len(session.exec(select(LLMCacheEntry)).all()) == 2
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    extract("1" * 64)
+    with Session(engine) as session:
+        entry_size = session.exec(select(LLMCacheEntry.size_bytes)).one()
+    # Room for two entries
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_MAX_MB", 2.5 * entry_size / (1024 * 1024))
+    before = counters()
+
+    extract("2" * 64)
+    extract("1" * 64)  # Hit: the first entry is now the most recently used
+    extract("3" * 64)  # Over the cap: evicts the second
+
+    with Session(engine) as session:
+        keys = set(session.exec(select(LLMCacheEntry.key)).all())
+    cached = {hash_char for hash_char in "123"
+              if llm_cache.cache_key("extract", hash_char * 64, MODEL, VERSION, ["Electricity"]) in keys}
+    assert cached == {"1", "3"}
+    assert counters()["evictions"] == before["evictions"] + 1
+
+
+def test_counters_are_served_as_metrics():
+    extract("c" * 64)
+    extract("c" * 64)
+
+    text = metrics.render()
+
+    for name, value in counters().items():
+        assert f'billsmith_llm_cache_events_total{{event="{name}"}} {value}' in text
@@ -0,0 +1,74 @@
+"""Shared LLM client (llm_client.py), token budget and model probe against the stub server"""
+
+import asyncio
+import time
+
+import pytest
+
+from checkers.openai_query import print_report, probe
+from src.backend import llm_client
+from src.backend.llm_budget import SharedTokenBudget
+from src.backend.llm_client import LLMClient
+
+MESSAGES = [{"role": "user", "content": "Where did Marc Andreessen (pmarca) go to school?"}]
+
+
+def test_throttled_requests_are_retried(throttled_stub_llm, monkeypatch):
+    monkeypatch.setattr(llm_client, "RETRY_BASE_SECONDS", 0.01)  # Retry-After (0.2 s) sets the pace
+
+    async def run():
+        client = LLMClient(base_url=throttled_stub_llm.base_url, max_concurrency=4, max_retries=10)
+        try:
+            return await asyncio.gather(*(
+                client.chat("gpt-4o", [{"role": "user", "content": f"probe {i}"}]) for i in range(12)
+            ))
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(run())
+
+    stats = throttled_stub_llm.stats()
+    assert stats["throttled"] > 0
+    assert stats["completions"] == 12
+    assert sum(result.attempts for result in results) == 12 + stats["throttled"]
+
+
+def test_identical_concurrent_requests_share_one_call(stub_llm):
+    async def run():
+        client = LLMClient(base_url=stub_llm.base_url)
+        try:
+            return await asyncio.gather(*(client.chat("gpt-4o", MESSAGES) for _ in range(5)))
+        finally:
+            await client.aclose()
+
+    served = stub_llm.stats()["completions"]
+    results = asyncio.run(run())
+
+    assert stub_llm.stats()["completions"] == served + 1
+    assert len({result.content for result in results}) == 1
+
+
+def test_probe_reports_percentiles(stub_llm, capsys):
+    results = asyncio.run(probe(["gpt-4o", "gpt-4o-mini"], 6, stub_llm.base_url, concurrency=4))
+
+    for result in results:
+        assert result["ok"] == 6 and result["errors"] == 0
+        assert 0 < result["p50"] <= result["p95"] <= result["p99"]
+    print_report(results)
+    report = capsys.readouterr().out
+    assert "P50 ms" in report and "P99 ms" in report and "gpt-4o-mini" in report
+
+
+@pytest.mark.usefixtures("database")
+def test_token_budget_is_shared_between_processes():
+    # Two budgets on the same bucket stand in for two worker processes
+    first = SharedTokenBudget(6000, name="test-shared")   # 100 tokens/s
+    second = SharedTokenBudget(6000, name="test-shared")
+
+    async def run():
+        await first.reserve(6000)  # Drains the bucket for both
+        started = time.monotonic()
+        await second.reserve(100)
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.8
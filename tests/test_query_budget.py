@@ -0,0 +1,43 @@
+"""Per-route query budgets (query_budget.py) in strict mode"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.backend import query_budget
+from src.backend.main import app
+from src.backend.models import Bill
+from src.backend.routers import bills
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(query_budget, "QUERY_BUDGET_MODE", "strict")
+    return TestClient(app)
+
+
+@pytest.fixture
+def bill_id(client):
+    response = client.post("/api/v1/bills/mock", params={"vendor": "Budget Test Utility"})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_within_budget(client, bill_id):
+    response = client.get(f"/api/v1/bills/{bill_id}")
+
+    assert response.status_code == 200
+    assert response.json()["category"]["name"] == "Electricity"
+
+
+def test_lazy_load_regression_fails_request(client, bill_id, monkeypatch):
+    # Drop the eager category load: serializing BillRead now lazy-loads it
+    monkeypatch.setattr(bills, "load_bill", lambda session, bill_id: session.get(Bill, bill_id))
+
+    response = client.get(f"/api/v1/bills/{bill_id}")
+
+    # Failed before the 200 headers went out
+    assert response.status_code == 500
+    assert f"GET /api/v1/bills/{bill_id} ran 2 queries (budget 1)" in response.text
+    assert "FROM categories" in response.text
@@ -0,0 +1,18 @@
+"""Benchmark latency reports (benchmarks/report.py)"""
+
+import pytest
+
+from benchmarks.report import percentile, summarize
+
+
+@pytest.mark.parametrize("count, share, expected", [
+    (2, 0.5, 1), (6, 0.5, 3), (10, 0.5, 5), (1, 0.99, 1), (100, 0.95, 95), (100, 0.99, 99), (10, 0.95, 10),
+])
+def test_percentile_is_nearest_rank(count, share, expected):
+    assert percentile(list(range(count, 0, -1)), share) == expected
+
+
+def test_summary_of_100_samples():
+    summary = summarize({"GET /bills": [float(value) for value in range(1, 101)]})
+
+    assert summary["GET /bills"] == {"count": 100, "p50": 50.5, "p95": 95.0, "p99": 99.0}
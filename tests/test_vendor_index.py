@@ -0,0 +1,42 @@
+"""Vendor fingerprint index (vendor_index.py)"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.backend.vendor_index import VendorIndex
+
+SEEN = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def index():
+    index = VendorIndex()
+    index.observe("ACME Power Co., Inc.", "ACC-2A3EC8E05E", 1, SEEN)
+    index.observe("City Water", "0001-2345-678", 2, SEEN)
+    return index
+
+
+def test_vendor_name_then_fuzzy(index):
+    assert index.lookup("Acme Power LLC").method == "vendor"
+    match = index.lookup("Acme Powr")
+    assert (match.category_id, match.method) == (1, "fuzzy")
+
+
+def test_account_never_overrides_an_unknown_vendor(index):
+    # Same leading characters as a known account, but a different vendor
+    assert index.lookup("Northwind Telecom", "ACC-2A3EC8E05F") is None
+
+
+def test_account_prefix_without_vendor(index):
+    assert index.lookup(None, "000123459999").category_id == 2
+    assert index.lookup("", "0001-9999-999") is None  # Only the first 4 characters match
+
+
+def test_ambiguous_account_prefix(index):
+    index.observe("Gas Co", "00012345-999", 3, SEEN)
+    assert index.lookup(None, "000123451111") is None
+
+    # A correction of that account removes the conflict
+    index.observe("Gas Co", "00012345-999", 2, SEEN + timedelta(days=1))
+    assert index.lookup(None, "000123451111").category_id == 2